@@ -0,0 +1 @@
+"""Benchmarks for the SentinelGate detection and serving paths. Run from the project root."""
@@ -0,0 +1,77 @@
+"""
+Batch detection benchmark: items/sec for /scan/batch at batch sizes 1, 100 and 10k.
+
+Inputs are corpus samples made unique with a counter suffix so the verdict
+cache does not flatter the per-item baseline. Three paths are timed:
+
+  chat     one POST /chat/secured per item (the only option before /scan/batch)
+  batch    POST /scan/batch with N items per request
+  engine   scan_batch() directly vs the uncached per-item detectors
+
+Usage (from project root):
+  python -m benchmarks.bench_batch
+  python -m benchmarks.bench_batch --sizes 1 100 10000 --items 20000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import load_app
+from sentinelgate_lab.corpus import BENIGN_SAMPLES, PROMPT_INJECTION_SAMPLES, SQL_INJECTION_SAMPLES
+
+
+def make_items(n, seed):
+    rng = random.Random(seed)
+    base = BENIGN_SAMPLES * 4 + SQL_INJECTION_SAMPLES + PROMPT_INJECTION_SAMPLES
+    return [f"{rng.choice(base)} {i}" for i in range(n)]
+
+
+def rate(n, fn):
+    start = time.perf_counter()
+    fn()
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--items", type=int, default=20_000, help="items per measurement")
+    parser.add_argument("--chat-items", type=int, default=2_000, help="items for the per-request baseline")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    app_module = load_app()
+    client = app_module.app.test_client()
+    items = make_items(args.items, args.seed)
+
+    def per_item_uncached():
+        for text in items:
+            text_lower = text.lower().strip()
+            app_module._detect_sql_injection(text, text_lower)
+            app_module.RULE_PACKS.active.prompt.is_match(text_lower)
+
+    expected = [(app_module.is_sql_injection(t), app_module.is_prompt_injection(t)) for t in items]
+    got = [(r["sql_injection"], r["prompt_injection"]) for r in app_module.scan_batch(items)]
+    if got != expected:
+        raise SystemExit("scan_batch verdicts differ from is_sql_injection / is_prompt_injection")
+
+    print(f"{'path':<8} {'batch':>7} {'items/s':>12}")
+    chat_items = items[:args.chat_items]
+    app_module.VERDICT_CACHE.clear()
+    chat_rate = rate(len(chat_items), lambda: [client.post('/chat/secured', json={"message": t}) for t in chat_items])
+    print(f"{'chat':<8} {1:>7} {chat_rate:>12,.0f}")
+
+    for size in args.sizes:
+        batches = [items[i:i + size] for i in range(0, len(items), size)]
+        if size == 1:
+            batches = batches[:args.chat_items]
+        n = sum(len(b) for b in batches)
+        batch_rate = rate(n, lambda: [client.post('/scan/batch', json=b) for b in batches])
+        print(f"{'batch':<8} {size:>7} {batch_rate:>12,.0f}")
+
+    print(f"{'engine':<8} {'-':>7} {rate(len(items), per_item_uncached):>12,.0f}  per-item detectors")
+    print(f"{'engine':<8} {len(items):>7} {rate(len(items), lambda: app_module.scan_batch(items)):>12,.0f}  scan_batch")
+
+
+if __name__ == "__main__":
+    main()
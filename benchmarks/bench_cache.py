@@ -0,0 +1,80 @@
+"""
+Verdict cache benchmark: replay a skewed (Zipf) input distribution.
+
+A handful of strings (bot probes, UI retries) account for most traffic, with a
+long tail of one-off messages. The replay runs the cached ``is_sql_injection``
++ ``is_prompt_injection`` pair against the uncached detectors and reports the
+cache hit ratio, evictions and throughput.
+
+Usage (from project root):
+  python -m benchmarks.bench_cache
+  python -m benchmarks.bench_cache --distinct 50000 --requests 200000 --zipf 1.2 --cache-size 4096
+"""
+import argparse
+import random
+import time
+
+from sentinelgate_lab import app as app_module
+from sentinelgate_lab.cache import VerdictCache
+from sentinelgate_lab.corpus import BENIGN_SAMPLES, PROMPT_INJECTION_SAMPLES, SQL_INJECTION_SAMPLES
+
+
+def build_inputs(distinct, seed):
+    rng = random.Random(seed)
+    base = BENIGN_SAMPLES + SQL_INJECTION_SAMPLES + PROMPT_INJECTION_SAMPLES
+    inputs = list(base)
+    while len(inputs) < distinct:
+        inputs.append(f"{rng.choice(base)} #{len(inputs)}")
+    rng.shuffle(inputs)
+    return inputs[:distinct]
+
+
+def zipf_stream(inputs, n, s, seed):
+    rng = random.Random(seed)
+    weights = [1.0 / (rank ** s) for rank in range(1, len(inputs) + 1)]
+    return rng.choices(inputs, weights=weights, k=n)
+
+
+def uncached(text):
+    text_lower = text.lower().strip()
+    return (app_module._detect_sql_injection(text, text_lower),
+            app_module.RULE_PACKS.active.prompt.is_match(text_lower))
+
+
+def cached(text):
+    return app_module.is_sql_injection(text), app_module.is_prompt_injection(text)
+
+
+def run(fn, stream):
+    start = time.perf_counter()
+    for text in stream:
+        fn(text)
+    return len(stream) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--distinct", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent (higher = more skewed)")
+    parser.add_argument("--cache-size", type=int, default=app_module.VERDICT_CACHE_SIZE)
+    parser.add_argument("--ttl", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    stream = zipf_stream(build_inputs(args.distinct, args.seed), args.requests, args.zipf, args.seed)
+    app_module.VERDICT_CACHE = VerdictCache(args.cache_size, app_module.VERDICT_CACHE_MAX_BYTES, args.ttl)
+
+    base_rate = run(uncached, stream)
+    cached_rate = run(cached, stream)
+    stats = app_module.VERDICT_CACHE.stats()
+
+    print(f"{args.requests:,} requests over {args.distinct:,} distinct inputs, zipf s={args.zipf}")
+    print(f"  uncached  {base_rate:>12,.0f} req/s")
+    print(f"  cached    {cached_rate:>12,.0f} req/s  ({cached_rate / base_rate:.1f}x)")
+    print(f"  hit ratio {stats['hit_ratio']:.2%}  size {stats['size']}  bytes {stats['bytes']:,}  "
+          f"evictions {stats['evictions']:,}")
+
+
+if __name__ == "__main__":
+    main()
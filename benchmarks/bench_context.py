@@ -0,0 +1,284 @@
+"""
+Shared analysis context benchmark: per-request time and allocations of the chat checks.
+
+Every check on a chat message used to lowercase (and strip) it for itself:
+is_sql_injection, is_prompt_injection, the lookup keyword test (once per
+keyword, inside ``any()``) and get_general_response; the demo server's chat ran
+its SQL check up to three times. With an ``AnalysisContext`` the input is
+normalized once per request and each verdict computed once. Compared per request:
+
+  before    the checks as they were, each normalizing the input itself
+  context   the same checks on one AnalysisContext (chat_secured, demo chat)
+
+for short chat messages, 4 KiB messages and URL/hex-encoded payloads (which
+now also get a scan of their decoded view: more work, more verdicts). Reported
+are microseconds per request (verdict cache cleared every round, so each
+request is a miss), the characters of lowercased copies of the message made
+per request and the tracemalloc peak per request.
+
+Before timing it checks that the context gives the same chat replies with and
+without sharing, the same verdicts as before on inputs with nothing to decode,
+that scan_batch agrees with the per-item checks on encoded inputs, that every
+encoded SQL injection sample is flagged, and that ``cleaned`` is exactly
+``ml.preprocess.clean_text``.
+
+Usage (from project root):
+  python -m benchmarks.bench_context
+  python -m benchmarks.bench_context --inputs 5000 --rounds 9
+"""
+import argparse
+import importlib.util
+import os
+import random
+import time
+import tracemalloc
+from urllib.parse import quote
+
+from benchmarks.common import load_app
+from ml.preprocess import clean_text
+from sentinelgate_lab.analysis import AnalysisContext
+from sentinelgate_lab.corpus import BENIGN_SAMPLES, PROMPT_INJECTION_SAMPLES, SQL_INJECTION_SAMPLES
+from sentinelgate_lab.detection import ScanBudgetExceeded
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NOISE = ["please", "thanks", "asap", "hello", "Admin", "get", "100 percent", "'", "bye", "\t", "  "]
+
+
+def load_demo():
+    """demo-test/server.py as a module (its directory name is not importable)."""
+    spec = importlib.util.spec_from_file_location("demo_server", os.path.join(ROOT, "demo-test", "server.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# -- before: the checks as they were -------------------------------------------------
+
+def legacy_verdict(app_module, kind, text):
+    try:
+        app_module.SCAN_BUDGET.check_length(text)
+    except ScanBudgetExceeded as e:
+        return app_module._over_budget(e.reason)
+    text_lower = text.lower().strip()
+    key = (kind, text_lower)
+    pack = app_module.RULE_PACKS.active
+    generation = app_module._rules_generation(pack)
+    verdict = app_module.VERDICT_CACHE.get(key, generation)
+    if verdict is None:
+        if kind == 'sql':
+            verdict = app_module._detect_sql_injection(text, text_lower, pack)
+        else:
+            verdict = pack.prompt.is_match(text_lower, app_module.SCAN_BUDGET)
+        app_module.VERDICT_CACHE.put(key, verdict, generation)
+    return verdict
+
+
+def legacy_chat(app_module, text):
+    sql = legacy_verdict(app_module, 'sql', text)
+    prompt = not sql and legacy_verdict(app_module, 'prompt', text)
+    if sql or prompt:
+        return sql, prompt, None
+    lookup = any(kw in text.lower() for kw in app_module.LOOKUP_KEYWORDS) or \
+        any(name in text for name in app_module.KNOWN_USERS) or (text.isalnum() and text in app_module.KNOWN_USERS)
+    # get_general_response normalized once, as it still does without a context
+    return sql, prompt, 'lookup' if lookup else app_module.get_general_response(text)
+
+
+def legacy_demo_sql(demo, t):
+    t = t.lower().strip()
+    if demo.DEMO_SQL_DETECTOR.is_match(t):
+        return True
+    return ("'" in t or '"' in t) and any(k in t for k in ['or', 'and', 'select', 'union'])
+
+
+def legacy_demo_chat(demo, msg):
+    is_lookup = any(k in msg.lower() for k in ['get', 'find', 'show', 'data', 'password']) or \
+        any(n in msg for n in ['Admin', 'CEO', 'CTO', 'HR', 'Developer']) or legacy_demo_sql(demo, msg)
+    if not is_lookup:
+        return False, None
+    injection = legacy_demo_sql(demo, msg)
+    qin = msg if injection else legacy_demo_extract(msg)
+    if injection or qin in ['Admin', 'CEO', 'CTO', 'HR', 'Developer']:
+        # The query found rows: checked a third time before appending it to the reply
+        injection = legacy_demo_sql(demo, msg)
+    return injection, qin
+
+
+def legacy_demo_extract(t):
+    for u in ['Admin', 'CEO', 'CTO', 'HR', 'Developer']:
+        if u.lower() in t.lower():
+            return u
+    return t.strip()
+
+
+# -- context: the same checks on one AnalysisContext --------------------------------
+
+def context_chat(app_module, text):
+    ctx = AnalysisContext(text)
+    sql = app_module.is_sql_injection(text, ctx)
+    prompt = not sql and app_module.is_prompt_injection(text, ctx)
+    if sql or prompt:
+        return sql, prompt, None
+    lookup = app_module.is_lookup_request(text, ctx) or (text.isalnum() and text in app_module.KNOWN_USERS)
+    return sql, prompt, 'lookup' if lookup else app_module.get_general_response(text, ctx)
+
+
+def context_demo_chat(demo, msg):
+    ctx = AnalysisContext(msg)
+    injection = demo.is_sql_injection(msg, ctx)
+    is_lookup = ctx.contains_any(['get', 'find', 'show', 'data', 'password']) or \
+        any(n in msg for n in ['Admin', 'CEO', 'CTO', 'HR', 'Developer']) or injection
+    if not is_lookup:
+        return False, None
+    return injection, msg if injection else demo.extract_user(msg, ctx)
+
+
+# -- inputs ---------------------------------------------------------------------------
+
+def chat_inputs(n, seed=11):
+    rng = random.Random(seed)
+    out = []
+    while len(out) < n:
+        words = rng.choice(BENIGN_SAMPLES).split()
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(NOISE))
+        text = ' '.join(words) + f" #{len(out)}"
+        out.append(text.upper() if rng.random() < 0.2 else text)
+    return out
+
+
+def long_inputs(n, size=4096, seed=12):
+    return [(text + ' ') * (size // (len(text) + 1)) + text[:8] for text in chat_inputs(n, seed)]
+
+
+def encoded_inputs(n, seed=13):
+    rng = random.Random(seed)
+    samples = SQL_INJECTION_SAMPLES + PROMPT_INJECTION_SAMPLES
+    out = []
+    while len(out) < n:
+        text = rng.choice(samples)
+        if rng.random() < 0.5:
+            text = quote(text, safe='')
+        else:
+            text = text.replace('1', '0x1').replace(' ', '%20')
+        out.append(text + f"%20{len(out)}")
+    return out
+
+
+# -- checks -----------------------------------------------------------------------------
+
+def _reply(app_module, text, ctx):
+    detection = app_module.run_detection(text, 'regex', context=ctx)
+    detection.pop("timings_ms")
+    return detection, app_module.chat_secured_reply(text, detection, ctx)
+
+
+def check(app_module, demo, plain, encoded):
+    for text in plain + encoded:
+        app_module.VERDICT_CACHE.clear()
+        shared = _reply(app_module, text, AnalysisContext(text))
+        app_module.VERDICT_CACHE.clear()
+        assert shared == _reply(app_module, text, None), f"shared context changes the reply to {text!r}"
+        ctx = AnalysisContext(text)
+        assert ctx.cleaned == clean_text(text), f"cleaned view differs from clean_text for {text!r}"
+    for text in plain:
+        if AnalysisContext(text).encoded:
+            continue
+        app_module.VERDICT_CACHE.clear()
+        before = legacy_chat(app_module, text)
+        app_module.VERDICT_CACHE.clear()
+        assert context_chat(app_module, text) == before, f"verdicts changed for {text!r}"
+        assert context_demo_chat(demo, text) == legacy_demo_chat(demo, text), f"demo verdicts changed for {text!r}"
+
+    app_module.VERDICT_CACHE.clear()
+    expected = [(app_module.is_sql_injection(t), app_module.is_prompt_injection(t)) for t in plain + encoded]
+    got = [(r["sql_injection"], r["prompt_injection"]) for r in app_module.scan_batch(plain + encoded)]
+    assert got == expected, "scan_batch differs from is_sql_injection / is_prompt_injection"
+
+    missed = [t for t in SQL_INJECTION_SAMPLES if not app_module.is_sql_injection(quote(t, safe=''))]
+    assert not missed, f"URL-encoded SQL injection samples not flagged: {missed[:3]}"
+    app_module.VERDICT_CACHE.clear()
+    return sum(legacy_verdict(app_module, 'sql', quote(t, safe='')) for t in SQL_INJECTION_SAMPLES)
+
+
+# -- measurements ---------------------------------------------------------------------
+
+class CountedStr(str):
+    """A message that tallies the characters of every lowercased copy made of it."""
+
+    lowered = 0
+
+    def lower(self):
+        CountedStr.lowered += len(self)
+        return str.lower(self)
+
+
+def per_request_us(app_module, fns, texts, rounds):
+    """Best time per request of each of ``fns``, their rounds interleaved so drift hits all alike."""
+    best = [float('inf')] * len(fns)
+    for _ in range(rounds):
+        for i, fn in enumerate(fns):
+            app_module.VERDICT_CACHE.clear()
+            start = time.perf_counter()
+            for text in texts:
+                fn(text)
+            best[i] = min(best[i], time.perf_counter() - start)
+    return [b / len(texts) * 1e6 for b in best]
+
+
+def allocations(app_module, fn, texts):
+    """(characters lowercased, mean tracemalloc peak in bytes) per request."""
+    app_module.VERDICT_CACHE.clear()
+    CountedStr.lowered = 0
+    for text in texts:
+        fn(CountedStr(text))
+    lowered = CountedStr.lowered / len(texts)
+
+    app_module.VERDICT_CACHE.clear()
+    peaks = 0
+    tracemalloc.start()
+    for text in texts:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn(text)
+        peaks += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return lowered, peaks / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--inputs", type=int, default=2000, help="requests per input set")
+    parser.add_argument("--rounds", type=int, default=5, help="timing rounds (best is reported)")
+    args = parser.parse_args()
+
+    app_module = load_app()
+    demo = load_demo()
+    sets = {
+        "chat": chat_inputs(args.inputs),
+        "4 KiB": long_inputs(max(1, args.inputs // 10)),
+        "encoded": encoded_inputs(args.inputs),
+    }
+    flagged_before = check(app_module, demo, sets["chat"] + sets["4 KiB"], sets["encoded"])
+    print(f"checks passed (URL-encoded SQL injection samples flagged: {flagged_before}/{len(SQL_INJECTION_SAMPLES)} "
+          f"before, {len(SQL_INJECTION_SAMPLES)}/{len(SQL_INJECTION_SAMPLES)} with the decoded view)\n")
+
+    paths = (
+        ("chat_secured", lambda t: legacy_chat(app_module, t), lambda t: context_chat(app_module, t)),
+        ("demo chat", lambda t: legacy_demo_chat(demo, t), lambda t: context_demo_chat(demo, t)),
+    )
+    print(f"{'path':<13} {'input':<8} {'before us':>10} {'context us':>11} {'speedup':>8} "
+          f"{'lowered':>10} {'->':>7} {'peak B':>8} {'->':>7}")
+    for path, before, after in paths:
+        for name, texts in sets.items():
+            old_us, new_us = per_request_us(app_module, (before, after), texts, args.rounds)
+            old_lowered, old_peak = allocations(app_module, before, texts)
+            new_lowered, new_peak = allocations(app_module, after, texts)
+            print(f"{path:<13} {name:<8} {old_us:>10.2f} {new_us:>11.2f} {old_us / new_us:>7.2f}x "
+                  f"{old_lowered:>10,.0f} {new_lowered:>7,.0f} {old_peak:>8,.0f} {new_peak:>7,.0f}")
+    print("\n(lowered: characters of lowercased copies of the message per request; "
+          "peak B: tracemalloc peak per request)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Endpoint latency with and without persistent per-thread SQLite connections.
+
+Drives /query/secure, /query/vulnerable and /chat/unsecured through the Flask
+test client, once opening a connection per call (the old behaviour) and once
+with the connection pool, and reports p50/p99 latency per endpoint.
+
+Usage (from project root):
+  python -m benchmarks.bench_db
+  python -m benchmarks.bench_db --requests 5000
+"""
+import argparse
+import time
+
+from benchmarks.common import load_app, summarize
+
+REQUESTS = [
+    ("/query/secure", {"chat_input": "Admin", "table": "secrets"}),
+    ("/query/vulnerable", {"chat_input": "CEO", "table": "secrets"}),
+    ("/chat/unsecured", {"message": "get Developer data"}),
+]
+
+
+def measure(app_module, path, payload, n):
+    client = app_module.app.test_client()
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        resp = client.post(path, json=payload)
+        samples.append(time.perf_counter() - start)
+        assert resp.status_code == 200, (path, resp.status_code, resp.get_data(as_text=True))
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    app_module = load_app()
+    from sentinelgate_lab.db import ConnectionPool
+
+    results = {}
+    for label, enabled in (("per-call connect", False), ("pooled", True)):
+        app_module.DB_POOL = ConnectionPool(app_module._db_path, enabled=enabled)
+        for path, payload in REQUESTS:
+            measure(app_module, path, payload, 50)  # warm-up
+            results[(label, path)] = measure(app_module, path, payload, args.requests)
+
+    print(f"{'endpoint':<20} {'mode':<18} {'p50 ms':>8} {'p99 ms':>8}")
+    for path, _ in REQUESTS:
+        for label in ("per-call connect", "pooled"):
+            r = results[(label, path)]
+            print(f"{path:<20} {label:<18} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
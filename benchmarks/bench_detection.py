@@ -0,0 +1,77 @@
+"""
+Micro-benchmark for the compiled detectors.
+
+Times the compiled PatternSet engine against the original per-pattern
+``re.search`` loop on benign and malicious input. That both give the same
+verdicts is checked by tests/test_detection.py, which uses the legacy loops
+defined here as its reference.
+
+Usage (from project root):
+  python -m benchmarks.bench_detection
+  python -m benchmarks.bench_detection --rounds 2000
+"""
+import argparse
+import re
+import timeit
+
+from sentinelgate_lab.app import _detect_sql_injection
+from sentinelgate_lab.rules import (
+    PROMPT_DETECTOR, PROMPT_INJECTION_PATTERNS, SQL_DETECTOR, SQL_INJECTION_PATTERNS,
+)
+from sentinelgate_lab.corpus import BENIGN_SAMPLES, PROMPT_INJECTION_SAMPLES, SQL_INJECTION_SAMPLES
+
+
+def legacy_is_sql_injection(text):
+    text_lower = text.lower().strip()
+    for pattern in SQL_INJECTION_PATTERNS:
+        if re.search(pattern, text_lower, re.IGNORECASE):
+            return True
+    if "'" in text or '"' in text and any(kw in text_lower for kw in ['or', 'and', 'select', 'union', 'drop']):
+        return True
+    return False
+
+
+def legacy_is_prompt_injection(text):
+    text_lower = text.lower().strip()
+    for pattern in PROMPT_INJECTION_PATTERNS:
+        if re.search(pattern, text_lower):
+            return True
+    return False
+
+
+# Uncached detector paths, so repeated rounds measure detection rather than cache hits
+def compiled_is_sql_injection(text):
+    return _detect_sql_injection(text, text.lower().strip())
+
+
+def compiled_is_prompt_injection(text):
+    return PROMPT_DETECTOR.is_match(text.lower().strip())
+
+
+def bench(fn, inputs, rounds):
+    elapsed = timeit.timeit(lambda: [fn(t) for t in inputs], number=rounds)
+    return rounds * len(inputs) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'input set':<12} {'detector':<8} {'legacy/s':>12} {'compiled/s':>12} {'speedup':>8}")
+    for name, inputs in (("benign", BENIGN_SAMPLES), ("malicious", SQL_INJECTION_SAMPLES + PROMPT_INJECTION_SAMPLES)):
+        for det, legacy, new in (
+            ("sql", legacy_is_sql_injection, compiled_is_sql_injection),
+            ("prompt", legacy_is_prompt_injection, compiled_is_prompt_injection),
+        ):
+            old_rate = bench(legacy, inputs, args.rounds)
+            new_rate = bench(new, inputs, args.rounds)
+            print(f"{name:<12} {det:<8} {old_rate:>12,.0f} {new_rate:>12,.0f} {new_rate / old_rate:>7.1f}x")
+
+    print("\nPrefilter counters:")
+    for det, detector in (("sql", SQL_DETECTOR), ("prompt", PROMPT_DETECTOR)):
+        print(f"  {det:<8} {detector.prefilter_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Request instrumentation benchmark: cost of stage timing, Server-Timing and /metrics histograms.
+
+1. Micro: the instrumentation of one /chat/unsecured-like request (a
+   RequestTiming, four timed stages, detector timings added and the record
+   into the histograms) around no-op stages, against the same loop without
+   it; then the same with the opt-in Server-Timing header. Also the record
+   and the header on their own. This is the number to go by.
+2. Flask: POST /chat/secured, /chat/unsecured (lookup) and /query/secure
+   through the test client with METRICS_ENABLED on and off, alternating
+   rounds. The test client's own round-to-round noise is larger than the
+   instrumentation, so the spread of the per-round differences is printed
+   with their median.
+
+Before timing it checks that the header (when enabled) lists the stages, and
+that /metrics counts every request, with cumulative buckets ending at the count.
+
+Usage (from project root):
+  python -m benchmarks.bench_metrics
+  python -m benchmarks.bench_metrics --requests 20000 --rounds 5
+"""
+import argparse
+import re
+import statistics
+import time
+
+from benchmarks.common import load_app
+from sentinelgate_lab.metrics import Metrics, RequestTiming, current_timing, finish_request, stage, start_request
+
+STAGES = ('json', 'db_ready', 'sqlite', 'response')
+DETECTION_MS = {'regex': 0.04, 'total': 0.05}
+REQUESTS = [
+    ('/chat/secured', {"message": "hello, can you help me with my order?"}),
+    ('/chat/unsecured', {"message": "show me the password for alice"}),
+    ('/query/secure', {"chat_input": "alice", "table": "secrets"}),
+]
+
+
+def instrumented_request(metrics, header=False):
+    start_request('chat_unsecured')
+    for name in STAGES:
+        with stage(name):
+            pass
+    timing = current_timing()
+    for name, ms in DETECTION_MS.items():
+        if name != 'total':
+            timing.add(name, ms / 1000)
+    timing = finish_request()
+    total = timing.elapsed()
+    metrics.record(timing, 200, total)
+    if header:
+        return timing.server_timing(total)
+
+
+class _Plain:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def plain_request(_):
+    for _name in STAGES:
+        with _Plain():
+            pass
+
+
+def per_call_us(fn, arg, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn(arg)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def check(app_module):
+    client = app_module.app.test_client()
+    app_module.METRICS.reset()
+    assert 'Server-Timing' not in client.post(REQUESTS[0][0], json=REQUESTS[0][1]).headers
+    app_module.METRICS.reset()
+    app_module.SERVER_TIMING = True
+    for path, doc in REQUESTS:
+        header = client.post(path, json=doc).headers.get('Server-Timing', '')
+        for name in ('json', 'response', 'total'):
+            assert f"{name};dur=" in header, (path, header)
+    lookup = client.post('/chat/unsecured', json=REQUESTS[1][1]).headers['Server-Timing']
+    assert all(f"{name};dur=" in lookup for name in ('db_ready', 'regex', 'sqlite')), lookup
+
+    text = client.get('/metrics').get_data(as_text=True)
+    counts = {m[0]: int(m[1]) for m in re.findall(r'sentinelgate_request_duration_seconds_count\{endpoint="(\w+)"\} (\d+)', text)}
+    assert counts == {'chat_secured': 1, 'chat_unsecured': 2, 'query_secure': 1}, counts
+    buckets = [int(v) for v in re.findall(r'request_duration_seconds_bucket\{endpoint="chat_unsecured",le="[^"]+"\} (\d+)', text)]
+    assert buckets == sorted(buckets) and buckets[-1] == 2, buckets
+    assert 'sentinelgate_stage_duration_seconds_count{endpoint="chat_unsecured",stage="sqlite"} 2' in text
+    app_module.SERVER_TIMING = False
+    app_module.METRICS.reset()
+
+
+def bench_flask(app_module, n, rounds):
+    client = app_module.app.test_client()
+    results = {True: [], False: []}
+    for _ in range(rounds):
+        for enabled in (False, True):
+            app_module.METRICS_ENABLED = enabled
+            start = time.perf_counter()
+            for i in range(n):
+                path, doc = REQUESTS[i % len(REQUESTS)]
+                client.post(path, json=doc)
+            results[enabled].append((time.perf_counter() - start) / n * 1e6)
+    app_module.METRICS_ENABLED = True
+    return results[False], results[True]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200_000, help="calls per micro-benchmark")
+    parser.add_argument("--requests", type=int, default=3000, help="requests per Flask round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    app_module = load_app()
+    check(app_module)
+    print("behaviour checks passed\n")
+
+    metrics = Metrics()
+    base = per_call_us(plain_request, None, args.calls)
+    full = per_call_us(instrumented_request, metrics, args.calls)
+    with_header = per_call_us(lambda m: instrumented_request(m, header=True), metrics, args.calls)
+    timing = RequestTiming('chat_unsecured')
+    for name in STAGES:
+        timing.add(name, 0.0001)
+    record = per_call_us(lambda t: metrics.record(t, 200, 0.0005), timing, args.calls)
+    header = per_call_us(lambda t: t.server_timing(0.0005), timing, args.calls)
+    print(f"instrumentation per request (4 stages + detector timings): {full - base:6.2f} us")
+    print(f"  with the Server-Timing header:                           {with_header - base:6.2f} us")
+    print(f"  record into histograms:                                  {record:6.2f} us")
+    print(f"  Server-Timing header:                                    {header:6.2f} us\n")
+
+    off, on = bench_flask(app_module, args.requests, args.rounds)
+    diffs = sorted(b - a for a, b in zip(off, on))
+    print(f"Flask test client, chat/query mix: {statistics.median(off):7.1f} us/request without, "
+          f"{statistics.median(on):7.1f} us with ({statistics.median(diffs):+.1f} us median of {args.rounds} rounds, "
+          f"per-round {diffs[0]:+.1f} to {diffs[-1]:+.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Gate middleware benchmark: per-request overhead of SentinelGate in front of a trivial app.
+
+A hello-world WSGI app (it reads the request body, like any app that parses
+one) is called directly, without a server, bare and behind ``SentinelGate``;
+the same is done for ``SentinelGateASGI`` around a hello-world ASGI app on
+one event loop. Each scenario reports requests per second and the added
+microseconds per request, with the detector's verdict cache disabled (every
+value is new, the worst case) and enabled (the same request repeated, as for
+a User-Agent header or a common field value):
+
+  plain GET        no query string, default headers
+  allowed path     a path configured as 'allow' (path matching only)
+  query (8)        eight query parameters
+  form (16)        url-encoded body with sixteen fields
+  json 1 KB        small JSON body
+  json 64 KB       JSON array of records
+  blocked query    malicious query parameter (answered 403 by the gate)
+
+Before timing it checks behaviour: block/tag/allow/deny per path, findings in
+``environ``/``scope`` and the X-SentinelGate header, bodies that pass reaching
+the app byte for byte (also through Flask's request.form / get_json), a
+blocked body not being read past the malicious value, and ASGI bodies sent
+without Content-Length or Transfer-Encoding (as over HTTP/2) being inspected.
+
+Usage (from project root):
+  python -m benchmarks.bench_middleware
+  python -m benchmarks.bench_middleware --seconds 2
+"""
+import argparse
+import asyncio
+import io
+import json
+import time
+from urllib.parse import urlencode
+
+from sentinelgate_lab.middleware import FINDINGS_KEY, SentinelGate, SentinelGateASGI, rule_detector
+
+MALICIOUS = "1' OR '1'='1' --"
+PATHS = [('/static/*', 'allow'), ('/admin/*', 'deny'), ('/search', 'tag')]
+HEADERS = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) Firefox/131.0', 'Referer': 'https://example.com/shop'}
+
+
+def hello_wsgi(environ, start_response):
+    length = environ.get('CONTENT_LENGTH')
+    body = environ['wsgi.input'].read(int(length)) if length else b''
+    start_response('200 OK', [('Content-Type', 'text/plain'), ('Content-Length', str(len(body)))])
+    return [body]
+
+
+async def hello_asgi(scope, receive, send):
+    body, more = b'', True
+    while more:
+        message = await receive()
+        body += message.get('body', b'')
+        more = message.get('more_body', False)
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'text/plain'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def make_request(path='/', query='', body=b'', content_type=None):
+    """One request as (path, query, body, content_type); turned into an environ or scope per call."""
+    return path, query, body, content_type
+
+
+def environ_for(request):
+    path, query, body, content_type = request
+    environ = {'REQUEST_METHOD': 'POST' if body else 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+               'CONTENT_LENGTH': str(len(body)) if body else '', 'wsgi.input': io.BytesIO(body)}
+    if content_type:
+        environ['CONTENT_TYPE'] = content_type
+    for name, value in HEADERS.items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    return environ
+
+
+def scope_for(request, content_length=True):
+    path, query, body, content_type = request
+    headers = [(name.lower().encode(), value.encode()) for name, value in HEADERS.items()]
+    if body and content_length:
+        headers.append((b'content-length', str(len(body)).encode()))
+    if content_type:
+        headers.append((b'content-type', content_type.encode()))
+    return {'type': 'http', 'method': 'POST' if body else 'GET', 'path': path,
+            'query_string': query.encode(), 'headers': headers}
+
+
+def call_wsgi(app, request):
+    result = {}
+
+    def start_response(status, headers, exc_info=None):
+        result['status'], result['headers'] = int(status.split()[0]), dict(headers)
+    environ = environ_for(request)
+    result['body'] = b''.join(app(environ, start_response))
+    result['environ'] = environ
+    return result
+
+
+async def call_asgi(app, request, chunk=64 * 1024, content_length=True):
+    body = request[2]
+    messages = [{'type': 'http.request', 'body': body[i:i + chunk], 'more_body': i + chunk < len(body)}
+                for i in range(0, max(len(body), 1), chunk)]
+    result = {'body': b''}
+    scope = scope_for(request, content_length)
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            result['status'], result['headers'] = message['status'], dict(message['headers'])
+        else:
+            result['body'] += message.get('body', b'')
+    await app(scope, receive, send)
+    result['scope'] = scope
+    return result
+
+
+def scenarios():
+    query = urlencode({f"p{i}": f"value {i} & more" for i in range(8)})
+    form = urlencode({f"field{i}": f"some text for field {i}" for i in range(16)}).encode()
+    small = json.dumps({"user": {"name": "Ada", "email": "ada@example.com"},
+                        "items": [{"sku": f"A-{i}", "note": "gift wrap please"} for i in range(12)]}).encode()
+    large = json.dumps([{"id": i, "note": f"order {i} shipped to Berlin", "tags": ["a", "b"]}
+                        for i in range(1100)]).encode()
+    return [
+        ("plain GET", make_request('/')),
+        ("allowed path", make_request('/static/app.js', query=urlencode({"q": MALICIOUS}))),
+        ("query (8)", make_request('/search', query=query)),
+        ("form (16)", make_request('/submit', body=form, content_type='application/x-www-form-urlencoded')),
+        ("json 1 KB", make_request('/api/orders', body=small, content_type='application/json')),
+        ("json 64 KB", make_request('/api/orders', body=large, content_type='application/json')),
+        ("blocked query", make_request('/api/orders', query=urlencode({"id": MALICIOUS}))),
+    ]
+
+
+def check_behaviour():
+    gate = SentinelGate(hello_wsgi, paths=PATHS)
+    bad_query = urlencode({"q": MALICIOUS})
+    assert call_wsgi(gate, make_request('/', query='q=shoes'))['status'] == 200
+    r = call_wsgi(gate, make_request('/', query=bad_query))
+    assert r['status'] == 403 and json.loads(r['body'])['field'] == 'q', r
+    r = call_wsgi(gate, make_request('/search', query=bad_query))
+    assert r['status'] == 200 and 'X-SentinelGate' in r['headers'] and r['environ'][FINDINGS_KEY], r
+    assert call_wsgi(gate, make_request('/static/x.js', query=bad_query))['status'] == 200
+    assert call_wsgi(gate, make_request('/admin/users'))['status'] == 403
+
+    request = make_request('/', query='a=1')
+    environ = environ_for(request)
+    environ['HTTP_USER_AGENT'] = MALICIOUS
+    statuses = []
+    gate(environ, lambda status, headers: statuses.append(status))
+    assert statuses[0].startswith('403'), statuses
+
+    for name, request in scenarios():
+        if request[2]:
+            r = call_wsgi(gate, request)
+            assert r['status'] == 200 and r['body'] == request[2], f"{name}: body changed"
+            r = asyncio.run(call_asgi(SentinelGateASGI(hello_asgi, paths=PATHS), request, chunk=997))
+            assert r['status'] == 200 and r['body'] == request[2], f"{name}: body changed (ASGI)"
+            r = asyncio.run(call_asgi(SentinelGateASGI(hello_asgi, paths=PATHS), request, 997, content_length=False))
+            assert r['status'] == 200 and r['body'] == request[2], f"{name}: body changed (ASGI, no Content-Length)"
+
+    form = urlencode({"name": "Ada", "bio": MALICIOUS}).encode()
+    r = call_wsgi(gate, make_request('/', body=form, content_type='application/x-www-form-urlencoded'))
+    assert r['status'] == 403 and json.loads(r['body'])['field'] == 'bio', r
+    bad_json = json.dumps({"items": [{"note": "fine"}, {"note": MALICIOUS}]}).encode()
+    r = call_wsgi(gate, make_request('/', body=bad_json, content_type='application/json'))
+    assert r['status'] == 403 and json.loads(r['body'])['field'] == '$.items[1].note', r
+    r = call_wsgi(gate, make_request('/', body=b'{"a": ', content_type='application/json'))
+    assert r['status'] == 400, r
+
+    # A malicious value at the start of a large body ends the request without reading the rest
+    big = json.dumps({"q": MALICIOUS, "rest": ["x" * 100] * 100_000}).encode()
+    environ = environ_for(make_request('/', body=big, content_type='application/json'))
+    gate(environ, lambda status, headers: None)
+    assert environ['wsgi.input'].tell() <= gate.chunk_size, environ['wsgi.input'].tell()
+
+    asgi = SentinelGateASGI(hello_asgi, paths=PATHS)
+    r = asyncio.run(call_asgi(asgi, make_request('/', query=bad_query)))
+    assert r['status'] == 403, r
+    r = asyncio.run(call_asgi(asgi, make_request('/search', body=bad_json, content_type='application/json'), 7))
+    assert r['status'] == 200 and r['body'] == bad_json and b'x-sentinelgate' in r['headers'], r
+    assert r['scope'][FINDINGS_KEY][0][1] == '$.items[1].note', r['scope'][FINDINGS_KEY]
+    r = asyncio.run(call_asgi(asgi, make_request('/', body=bad_json, content_type='application/json'), 7))
+    assert r['status'] == 403, r
+    assert asyncio.run(call_asgi(asgi, make_request('/admin/x')))['status'] == 403
+    # HTTP/2: neither Content-Length nor Transfer-Encoding, the body is inspected all the same
+    r = asyncio.run(call_asgi(asgi, make_request('/', body=json.dumps({"q": MALICIOUS}).encode(),
+                                                 content_type='application/json'), content_length=False))
+    assert r['status'] == 403, r
+    r = asyncio.run(call_asgi(asgi, make_request('/', body=form, content_type='application/x-www-form-urlencoded'),
+                              7, content_length=False))
+    assert r['status'] == 403 and json.loads(r['body'])['field'] == 'bio', r
+    r = asyncio.run(call_asgi(asgi, make_request('/', body=bad_json, content_type='application/json'),
+                              7, content_length=False))
+    assert r['status'] == 403, r
+    r = asyncio.run(call_asgi(asgi, make_request('/', content_type='application/json'), content_length=False))
+    assert r['status'] == 200 and r['body'] == b'', r
+
+    from flask import Flask, jsonify, request as flask_request  # pyright: ignore[reportMissingImports]
+    flask_app = Flask(__name__)
+
+    @flask_app.route('/form', methods=['POST'])
+    def form_view():
+        return jsonify(dict(flask_request.form))
+
+    @flask_app.route('/json', methods=['POST'])
+    def json_view():
+        return jsonify(flask_request.get_json())
+    flask_app.wsgi_app = SentinelGate(flask_app.wsgi_app, spool_bytes=4096)
+    client = flask_app.test_client()
+    fields = {f"f{i}": f"value {i} " * 40 for i in range(30)}
+    assert client.post('/form', data=fields).get_json() == fields
+    doc = {"records": [{"id": i, "note": f"note {i}"} for i in range(500)]}
+    assert client.post('/json', json=doc).get_json() == doc
+    assert client.post('/json', json={"q": MALICIOUS}).status_code == 403
+
+
+def bench_wsgi(app, request, seconds):
+    n, start = 0, time.perf_counter()
+    deadline = start + seconds
+    while True:
+        for _ in range(200):
+            call_wsgi(app, request)
+        n += 200
+        now = time.perf_counter()
+        if now >= deadline:
+            return n / (now - start)
+
+
+def bench_asgi(app, request, seconds):
+    async def run():
+        n, start = 0, time.perf_counter()
+        deadline = start + seconds
+        while True:
+            for _ in range(200):
+                await call_asgi(app, request)
+            n += 200
+            now = time.perf_counter()
+            if now >= deadline:
+                return n / (now - start)
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="time per scenario and variant")
+    args = parser.parse_args()
+
+    check_behaviour()
+    print("behaviour checks passed\n")
+    variants = [("WSGI", bench_wsgi, hello_wsgi, SentinelGate), ("ASGI", bench_asgi, hello_asgi, SentinelGateASGI)]
+    print(f"{'':<5} {'scenario':<15} {'bare req/s':>11} {'cold req/s':>11} {'cold us':>8} "
+          f"{'cached req/s':>13} {'cached us':>10}")
+    for label, bench, bare, gate in variants:
+        cold = gate(bare, detect=rule_detector(cache=False), paths=PATHS)
+        cached = gate(bare, paths=PATHS)
+        for name, request in scenarios():
+            bare_rps = bench(bare, request, args.seconds)
+            cold_rps = bench(cold, request, args.seconds)
+            cached_rps = bench(cached, request, args.seconds)
+            print(f"{label:<5} {name:<15} {bare_rps:>11,.0f} {cold_rps:>11,.0f} {(1 / cold_rps - 1 / bare_rps) * 1e6:>8.1f} "
+                  f"{cached_rps:>13,.0f} {(1 / cached_rps - 1 / bare_rps) * 1e6:>10.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
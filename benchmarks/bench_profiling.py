@@ -0,0 +1,146 @@
+"""
+Rule profiler benchmark: verdict parity, and the cost of the profiler when off and on.
+
+Checks, on the sample corpus plus random variants of it, that the detectors
+give the same verdicts and matched rule IDs with the profiler attached, and
+that detaching leaves no trace on the PatternSet. With a ScanBudget, a
+profiled input that runs out of time gets the same verdict (or the same
+ScanBudgetExceeded) as without the profiler, and a backtracking rule the set
+lists as ``unguarded`` is not run on an input its literals rule out. Replay
+profiles an input with escapes on both its lowered and its decoded view.
+Then times ``SQL_DETECTOR.is_match`` per input:
+
+  never attached     the detector as shipped
+  detached           after profiling was switched on and off again (should equal the above)
+  profiling 1/10     attached, every tenth input run through every rule
+  profiling 1/1      attached, every input run through every rule
+
+Usage (from project root):
+  python -m benchmarks.bench_profiling
+  python -m benchmarks.bench_profiling --inputs 20000 --rounds 5
+"""
+import argparse
+import random
+import re
+import time
+
+from sentinelgate_lab.corpus import BENIGN_SAMPLES, PROMPT_INJECTION_SAMPLES, SQL_INJECTION_SAMPLES
+from sentinelgate_lab.detection import PatternSet, ScanBudget, ScanBudgetExceeded
+from sentinelgate_lab.profiling import RuleProfiler, replay
+from sentinelgate_lab.rulepacks import builtin_pack
+
+NOISE = ["please", "asap", "--", "'", "1=1", "select", "union all", "/* x */", "order by 2", "0x27", ";"]
+
+
+def inputs(n, seed=5):
+    rng = random.Random(seed)
+    samples = BENIGN_SAMPLES + SQL_INJECTION_SAMPLES + PROMPT_INJECTION_SAMPLES
+    out = [s.lower().strip() for s in samples]
+    while len(out) < n:
+        words = rng.choice(samples).split()
+        words.insert(rng.randrange(len(words) + 1), rng.choice(NOISE))
+        out.append(' '.join(words).lower() + f" {len(out)}")
+    return out
+
+
+def check(pack, texts):
+    detectors = (('sql', pack.sql), ('prompt', pack.prompt))
+    expected = {kind: ([d.is_match(t) for t in texts], [d.scan(t) for t in texts], d.scan_many(texts))
+                for kind, d in detectors}
+    profiler = RuleProfiler()
+    profiler.follow(pack)
+    for kind, d in detectors:
+        got = ([d.is_match(t) for t in texts], [d.scan(t) for t in texts], d.scan_many(texts))
+        assert got == expected[kind], f"{kind}: verdicts differ with the profiler attached"
+    rows = profiler.report('hits')
+    assert sum(r['evaluations'] for r in rows if r['kind'] == 'sql') == len(pack.sql) * len(texts) * 2 + \
+        len(pack.sql) * len(set(texts)), "every rule runs on every profiled input"
+    assert all(r['hits'] >= r['first_hits'] for r in rows)
+    profiler.detach()
+    for _, d in detectors:
+        assert not {'is_match', 'scan', 'scan_many'} & set(vars(d)), "detach left a profiled method behind"
+    return profiler
+
+
+def outcome(detector, text, budget):
+    try:
+        return detector.is_match(text, budget), detector.scan(text, budget)
+    except ScanBudgetExceeded as e:
+        return e.reason
+
+
+def check_budget(pack, texts):
+    # Out of time before the first rule: profiling stops, the verdict is the detector's own
+    budget = ScanBudget(max_ms=0)
+    expected = [outcome(pack.sql, t, budget) for t in texts]
+    profiler = RuleProfiler()
+    profiler.attach('sql', pack.sql)
+    try:
+        assert [outcome(pack.sql, t, budget) for t in texts] == expected, "verdicts differ once the budget runs out"
+    finally:
+        profiler.detach()
+    assert profiler.cut_short['sql'] and not profiler.profiled_inputs['sql'], profiler.stats()
+
+    # (a+)+ backtracks exponentially and cannot run as a SegmentChain; its literal 'z9q' keeps it off this input
+    detector = PatternSet([r"union\s+select", r"(a+)+z9q"], re.IGNORECASE)
+    assert detector.unguarded == ('rule-002',)
+    profiler = RuleProfiler()
+    profiler.attach('sql', detector)
+    try:
+        start = time.perf_counter()
+        assert not detector.is_match('a' * 40 + '!', ScanBudget(max_ms=50))
+        assert time.perf_counter() - start < 1, "an unguarded rule ran outside the prefilter"
+    finally:
+        profiler.detach()
+    assert {r['rule_id']: r['evaluations'] for r in profiler.report()} == {'rule-001': 1, 'rule-002': 0}
+
+
+def check_replay(pack):
+    profiler = RuleProfiler()
+    assert replay(["1%27%20UNION%20SELECT%20password%20FROM%20users--", "hello there"], pack, profiler) == 2
+    assert profiler.profiled_inputs == {'sql': 3, 'prompt': 3}, "the decoded view was not profiled"
+    assert any(r['hits'] for r in profiler.report(kind='sql')), "the decoded view's SQL hits were not counted"
+
+
+def per_input_us(detector, texts, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for t in texts:
+            detector.is_match(t)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--inputs", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5, help="timing rounds (best is reported)")
+    args = parser.parse_args()
+
+    pack = builtin_pack()
+    texts = inputs(args.inputs)
+    check(pack, texts)
+    check_budget(pack, texts[:500])
+    check_replay(pack)
+    print("parity checks passed\n")
+
+    detector = pack.sql
+    baseline = per_input_us(detector, texts, args.rounds)
+    profiler = RuleProfiler()
+    profiler.attach('sql', detector)
+    profiler.detach()
+    detached = per_input_us(detector, texts, args.rounds)
+    results = [("never attached", baseline), ("detached", detached)]
+    for sample_every in (10, 1):
+        profiler = RuleProfiler(sample_every=sample_every)
+        profiler.attach('sql', detector)
+        results.append((f"profiling 1/{sample_every}", per_input_us(detector, texts, args.rounds)))
+        profiler.detach()
+    print(f"{'SQL_DETECTOR.is_match':<22} {'us/input':>9} {'vs shipped':>11}")
+    for label, us in results:
+        print(f"{label:<22} {us:>9.2f} {us / baseline:>10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
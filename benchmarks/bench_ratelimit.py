@@ -0,0 +1,93 @@
+"""
+In-memory rate limiter benchmark: list-rebuild limiter vs ring-buffer limiter.
+
+Simulates traffic from many distinct client IPs (default 100k) plus a few hot
+IPs that sit at the limit, with a simulated clock so idle keys age out. Reports
+checks/sec, tracked keys and memory (tracemalloc) for both implementations,
+and checks that both make identical allow/deny decisions.
+
+Usage (from project root):
+  python -m benchmarks.bench_ratelimit
+  python -m benchmarks.bench_ratelimit --ips 100000 --requests 500000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from sentinelgate_lab.ratelimit import MemoryBackend
+
+LIMIT = 100
+WINDOW = 60.0
+
+
+class ListLimiter:
+    """The original limiter: a timestamp list per IP, rebuilt on every request, never evicted."""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.counts = {}
+
+    def hit(self, key, now):
+        counts = self.counts.setdefault(key, [])
+        counts[:] = [t for t in counts if now - t < self.window]
+        if len(counts) >= self.limit:
+            return False
+        counts.append(now)
+        return True
+
+
+def traffic(ips, n, seed):
+    """(key, now) pairs at ~2k req/s: 20% from 10 hot IPs at the limit, the rest from
+    ``ips`` distinct clients that arrive over time, each active for a short while."""
+    rng = random.Random(seed)
+    now = 0.0
+    out = []
+    for j in range(n):
+        now += rng.expovariate(2000)
+        if rng.random() < 0.2:
+            key = f"198.51.100.{rng.randint(1, 10)}"
+        else:
+            i = min(ips - 1, int(j / n * ips) + rng.randrange(500))
+            key = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+        out.append((key, now))
+    return out
+
+
+def run(limiter, stream):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    decisions = [limiter.hit(k, now) for k, now in stream]
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return decisions, len(stream) / elapsed, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ips", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=300_000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    stream = traffic(args.ips, args.requests, args.seed)
+    span = stream[-1][1]
+    print(f"{args.requests:,} requests from up to {args.ips:,} IPs over {span:.0f} simulated seconds\n")
+
+    old, new = ListLimiter(LIMIT, WINDOW), MemoryBackend(LIMIT, WINDOW)
+    old_dec, old_rate, old_mem, old_peak = run(old, stream)
+    new_dec, new_rate, new_mem, new_peak = run(new, stream)
+    if old_dec != new_dec:
+        raise SystemExit("decision mismatch between the list limiter and the ring limiter")
+
+    print(f"{'limiter':<8} {'checks/s':>12} {'keys':>9} {'mem MB':>8} {'peak MB':>8}")
+    print(f"{'list':<8} {old_rate:>12,.0f} {len(old.counts):>9,} {old_mem / 1e6:>8.1f} {old_peak / 1e6:>8.1f}")
+    print(f"{'ring':<8} {new_rate:>12,.0f} {new.stats()['keys']:>9,} {new_mem / 1e6:>8.1f} {new_peak / 1e6:>8.1f}")
+    print(f"\nring limiter stats: {new.stats()}")
+    print(f"denied: {new_dec.count(False):,} (identical decisions)")
+
+
+if __name__ == "__main__":
+    main()
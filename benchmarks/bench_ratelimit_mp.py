@@ -0,0 +1,148 @@
+"""
+Multi-process load test for the shared (SQLite) rate-limit backend.
+
+1. Correctness: N processes hammer the *same* key concurrently; across all of
+   them exactly ``limit`` requests may be allowed within the window.
+2. Scaling: N processes each use their own keys; aggregate checks/sec is
+   reported for 1, 2, 4... processes.
+3. With --http: the app runs under ``gunicorn -w N`` with the sqlite backend
+   and client processes POST /chat/secured from one IP. Exactly ``limit``
+   requests must get a 200 across all workers; req/s is reported per N.
+
+Usage (from project root):
+  python -m benchmarks.bench_ratelimit_mp
+  python -m benchmarks.bench_ratelimit_mp --procs 1 2 4 8 --per-proc 5000
+  python -m benchmarks.bench_ratelimit_mp --http --procs 1 2 4
+"""
+import argparse
+import http.client
+import json
+import multiprocessing as mp
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from sentinelgate_lab.ratelimit import SQLiteBackend
+
+LIMIT = 100
+WINDOW = 60
+
+
+def _same_key(path, n, start_evt, out):
+    backend = SQLiteBackend(LIMIT, WINDOW, path)
+    start_evt.wait()
+    out.put(sum(backend.hit("203.0.113.7") for _ in range(n)))
+
+
+def _own_keys(path, n, worker, start_evt, out):
+    backend = SQLiteBackend(LIMIT, WINDOW, path)
+    start_evt.wait()
+    t0 = time.perf_counter()
+    for i in range(n):
+        backend.hit(f"10.{worker}.{i % 250}.{i % 200}")
+    out.put(time.perf_counter() - t0)
+
+
+def _http_client(port, n, start_evt, out):
+    body = json.dumps({"message": "hello"})
+    codes = {}
+    start_evt.wait()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        conn.request("POST", "/chat/secured", body, {"Content-Type": "application/json"})
+        status = conn.getresponse().status
+        conn.close()
+        codes[status] = codes.get(status, 0) + 1
+    out.put((codes, time.perf_counter() - t0))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(port, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"server on port {port} did not start")
+
+
+def http_load(workers, clients, per_client, tmp):
+    port = _free_port()
+    env = {**os.environ, "RATE_LIMIT_BACKEND": "sqlite", "RATE_LIMIT_DB": os.path.join(tmp, f"http-{workers}.db")}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "-b", f"127.0.0.1:{port}", "app:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for(port)
+        results = run(_http_client, clients, lambda w: (port, per_client))
+    finally:
+        server.terminate()
+        server.wait()
+    codes = {}
+    for c, _ in results:
+        for k, v in c.items():
+            codes[k] = codes.get(k, 0) + v
+    return codes, clients * per_client / max(e for _, e in results)
+
+
+def run(target, procs, make_args):
+    start_evt = mp.Event()
+    out = mp.Queue()
+    workers = [mp.Process(target=target, args=(*make_args(w), start_evt, out)) for w in range(procs)]
+    for w in workers:
+        w.start()
+    time.sleep(0.2)
+    start_evt.set()
+    results = [out.get() for _ in workers]
+    for w in workers:
+        w.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--procs", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--per-proc", type=int, default=2000)
+    parser.add_argument("--http", action="store_true", help="Load-test gunicorn with N workers instead")
+    parser.add_argument("--clients", type=int, default=8, help="Client processes for --http")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.http:
+            for workers in args.procs:
+                codes, rate = http_load(workers, args.clients, args.per_proc // args.clients, tmp)
+                ok = codes.get(200, 0)
+                status = "OK" if ok == LIMIT else "VIOLATED"
+                print(f"gunicorn -w {workers}: {rate:>8,.0f} req/s  responses {dict(sorted(codes.items()))}  {status}")
+            return
+
+        for procs in args.procs:
+            path = os.path.join(tmp, f"same-{procs}.db")
+            SQLiteBackend(LIMIT, WINDOW, path)  # create schema before the race
+            allowed = sum(run(_same_key, procs, lambda w: (path, args.per_proc)))
+            status = "OK" if allowed == LIMIT else "VIOLATED"
+            print(f"same key, {procs} procs x {args.per_proc}: allowed {allowed} (limit {LIMIT}) {status}")
+
+        print()
+        for procs in args.procs:
+            path = os.path.join(tmp, f"own-{procs}.db")
+            SQLiteBackend(LIMIT, WINDOW, path)
+            elapsed = run(_own_keys, procs, lambda w: (path, args.per_proc, w))
+            total = procs * args.per_proc
+            print(f"own keys, {procs} procs: {total / max(elapsed):>10,.0f} checks/s aggregate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Adversarial (ReDoS) benchmark: worst-case detection latency as crafted input grows from 1 KB to 1 MB.
+
+Each input family is built to get past the literal prefilter and make one of
+the backtracking SQL rules (``.*`` followed by more pattern) retry from every
+start and split:
+
+  union-spaces    'union select ' + spaces                     sql-011, cubic on re
+  comment-runs    'select ' + '/**/' * n                       sql-088, cubic on re
+  hex-runs        'or ' + '0x1 ' * n                           sql-031, quadratic on re
+  insert-spaces   'values( insert into' + spaces               sql-042
+  select-parens   'select(' * n                                sql-076
+  nul-runs        'select ' + '%00 ' * n                       sql-079
+
+Columns, the worst family at each size:
+
+  re, every rule     each rule's own compiled regex, as the engine ran a rule before
+                     (stopped for a family once one call takes over --legacy-limit s;
+                     '> N' then means at least N ms)
+  engine scan        SQL_DETECTOR.scan, no budget: backtracking rules on the linear path
+  is_sql_injection   the app's check with its scan budget (SENTINELGATE_SCAN_MAX_CHARS,
+                     SENTINELGATE_SCAN_BUDGET_MS): longer inputs fail closed at once
+
+Before timing it checks that the linear path gives the regex's verdict on
+single-line inputs (also where a segment matches wider than its minimum, as
+UNION ALL SELECT does) and never misses a match on multi-line ones, and that
+inputs over the length or time budget are flagged and not cached.
+
+Usage (from project root):
+  python -m benchmarks.bench_redos
+  python -m benchmarks.bench_redos --max-kib 256 --repeat 5 --detail
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import load_app
+from sentinelgate_lab.corpus import BENIGN_SAMPLES, PROMPT_INJECTION_SAMPLES, SQL_INJECTION_SAMPLES
+from sentinelgate_lab.detection import ScanBudget
+from sentinelgate_lab.rules import SQL_DETECTOR
+
+
+def _fill(prefix, unit, n):
+    return (prefix + unit * (n // len(unit) + 1))[:n]
+
+
+FAMILIES = {
+    'union-spaces': lambda n: _fill('union select ', ' ', n),
+    'comment-runs': lambda n: _fill('select ', '/**/', n),
+    'hex-runs': lambda n: _fill('or ', '0x1 ', n),
+    'insert-spaces': lambda n: _fill('values( insert into', ' ', n),
+    'select-parens': lambda n: _fill('', 'select(', n),
+    'nul-runs': lambda n: _fill('select ', '%00 ', n),
+}
+TOKENS = ["union", "select", "all", "from", " ", "  ", "\t", "0x1f", "or", "insert", "into", "values", "(", ")",
+          "/*", "*/", "%00", "\\x00", "drop", "delete", "'", "x", "1=1", "--"]
+# A segment matched wider than its minimum width: the next segment must not start inside it
+WIDE = ["union all select from", "union  all  select  from", "union all  select from x", "union all select  from",
+        "insert  into values(", "insert into  values (", "select  (select", "select ( select"]
+
+
+def _variants(n, newlines, seed=3):
+    rng = random.Random(seed)
+    tokens = TOKENS + ["\n"] if newlines else TOKENS
+    return [''.join(rng.choice(tokens) for _ in range(rng.randint(1, 14))) for _ in range(n)]
+
+
+def check(app_module, fuzz):
+    chained = SQL_DETECTOR._chained
+    assert chained, "no rule runs on the linear path"
+    corpus = [t.lower().strip() for t in BENIGN_SAMPLES + SQL_INJECTION_SAMPLES + PROMPT_INJECTION_SAMPLES]
+    single_line = corpus + WIDE + _variants(fuzz, newlines=False)
+    multi_line = _variants(fuzz, newlines=True, seed=4)
+    for i in chained:
+        regex, linear = SQL_DETECTOR.compiled[i], SQL_DETECTOR.matchers[i]
+        for text in single_line:
+            assert bool(linear(text)) == (regex.search(text) is not None), (SQL_DETECTOR.ids[i], text)
+        for text in multi_line:
+            assert linear(text) or regex.search(text) is None, f"{SQL_DETECTOR.ids[i]} missed {text!r}"
+
+    budget = app_module.SCAN_BUDGET
+    over = 'hello ' * (budget.max_chars // 6 + 1)
+    counts = dict(app_module.SCAN_OVER_BUDGET)
+    assert app_module.is_sql_injection(over) and app_module.is_prompt_injection(over)
+    assert app_module.SCAN_OVER_BUDGET['length'] == counts['length'] + 2
+    assert SQL_DETECTOR.scan_many(['hello', over], budget) == [(), None]
+    results = app_module.scan_batch(['hello', over])
+    assert results[1]["matched"] == ['scan-budget'] and not results[0]["sql_injection"]
+
+    app_module.VERDICT_CACHE.clear()
+    app_module.SCAN_BUDGET = ScanBudget(budget.max_chars, 0.000001)
+    try:
+        assert app_module.is_sql_injection("union select name from users")
+    finally:
+        app_module.SCAN_BUDGET = budget
+    assert app_module.SCAN_OVER_BUDGET['time'] == counts['time'] + 1
+    assert len(app_module.VERDICT_CACHE) == 0, "a fail-closed verdict was cached"
+    return len(chained)
+
+
+def timed(fn, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def every_rule(text):
+    return [regex.search(text) for regex in SQL_DETECTOR.compiled]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-kib", type=int, default=1024, help="largest input (KiB)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per cell (best is reported)")
+    parser.add_argument("--legacy-limit", type=float, default=1.0, help="seconds after which re stops for a family")
+    parser.add_argument("--fuzz", type=int, default=5000, help="random inputs for the parity checks")
+    parser.add_argument("--detail", action="store_true", help="also print every family")
+    args = parser.parse_args()
+
+    app_module = load_app()
+    chained = check(app_module, args.fuzz)
+    budget = app_module.SCAN_BUDGET
+    print(f"checks passed ({chained} SQL rules on the linear path; scan budget "
+          f"{budget.max_chars} chars, {budget.max_ms} ms)\n")
+
+    def budgeted(text):
+        app_module.VERDICT_CACHE.clear()
+        return app_module.is_sql_injection(text)
+
+    sizes = []
+    kib = 1
+    while kib <= args.max_kib:
+        sizes.append(kib * 1024)
+        kib *= 4
+    stopped = set()
+    rows = []
+    for size in sizes:
+        cells = {}
+        for family, build in FAMILIES.items():
+            text = build(size)
+            legacy = None
+            if family not in stopped:
+                legacy = timed(every_rule, text, 1)
+                if legacy > args.legacy_limit:
+                    stopped.add(family)
+            cells[family] = (legacy, timed(SQL_DETECTOR.scan, text, args.repeat),
+                             timed(budgeted, text, args.repeat), budgeted(text))
+        rows.append((size, cells))
+
+    def ms(seconds):
+        return f"{seconds * 1000:>12.2f}" if seconds is not None else f"{'-':>12}"
+
+    print(f"{'input':>8} {'re, every rule':>16} {'engine scan':>12} {'is_sql_injection':>17}   worst family (ms)")
+    for size, cells in rows:
+        legacy = [c[0] for c in cells.values() if c[0] is not None]
+        if len(legacy) < len(cells):
+            # Some family was stopped: it would take longer than the limit
+            worst_legacy = f"> {max(legacy + [args.legacy_limit]) * 1000:.0f}"
+        else:
+            worst_legacy = ms(max(legacy)).strip()
+        print(f"{size // 1024:>6} K {worst_legacy:>16} {ms(max(c[1] for c in cells.values()))} "
+              f"{ms(max(c[2] for c in cells.values())):>17}")
+    if stopped:
+        print(f"\nre was stopped for {', '.join(sorted(stopped))} after one call took over {args.legacy_limit} s")
+    if args.detail:
+        print(f"\n{'family':<14} {'input':>8} {'re':>12} {'scan':>12} {'budgeted':>12}  verdict")
+        for size, cells in rows:
+            for family, (legacy, scan, budgeted_s, verdict) in cells.items():
+                print(f"{family:<14} {size // 1024:>6} K {ms(legacy)} {ms(scan)} {ms(budgeted_s)}  "
+                      f"{'flagged' if verdict else 'clean'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Rule pack hot-reload benchmark: swap rules under traffic instead of restarting the worker.
+
+Serves the built-in rules from a pack file, then - while requests keep
+flowing - rewrites the file with a new version carrying an extra signature,
+then with a broken pack (bad regex), one whose regex raises OverflowError
+rather than re.error (huge repeat count) and one that fails the golden corpus
+(flags a benign sample). Checks that no request failed, that the new
+signature takes effect (even for an input whose old verdict was cached), that
+all three bad packs are rejected while the good one stays active, and that each
+pack was compiled once, not per request. Reports the swap delay, request latency around the
+swaps and, for comparison, what a restart costs (fresh app import).
+
+Usage (from project root):
+  python -m benchmarks.bench_rulepack
+  python -m benchmarks.bench_rulepack --requests 3000 --poll 0.05
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import load_app, summarize
+from sentinelgate_lab import rulepacks
+from sentinelgate_lab.corpus import BENIGN_SAMPLES, SQL_INJECTION_SAMPLES
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NEW_SIGNATURE = r"\bsg_canary_sig\b"
+CANARY = "please run sg_canary_sig for me"
+
+
+def write_pack(path, doc):
+    # Write then rename, so a poll never sees a half-written file
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(doc, f)
+    os.replace(tmp, path)
+
+
+def restart_ms():
+    code = "import time; s = time.perf_counter(); import sentinelgate_lab.app; print((time.perf_counter() - s) * 1000)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.split()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per phase")
+    parser.add_argument("--poll", type=float, default=0.05, help="SENTINELGATE_RULE_PACK_POLL seconds")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sg-rulepack-")
+    pack_path = os.path.join(workdir, "rules.json")
+    rulepacks.export_builtin(pack_path)
+    with open(pack_path, encoding='utf-8') as f:
+        base = json.load(f)
+    os.environ['SENTINELGATE_RULE_PACK'] = pack_path
+    os.environ['SENTINELGATE_RULE_PACK_POLL'] = str(args.poll)
+
+    app_module = load_app()
+    manager = app_module.RULE_PACKS
+    client = app_module.app.test_client()
+    samples = BENIGN_SAMPLES + SQL_INJECTION_SAMPLES + [CANARY]
+    loads = []
+    original_load = rulepacks.load_pack
+
+    def counting_load(path):
+        loads.append(path)
+        return original_load(path)
+    rulepacks.load_pack = counting_load
+
+    def phase(name, n, change=None, expect_version=None):
+        latencies, errors = [], 0
+        changed_at = swapped_after = None
+        for i in range(n):
+            if change is not None and i == n // 4:
+                change()
+                changed_at = time.perf_counter()
+            start = time.perf_counter()
+            resp = client.post('/chat/secured', json={"message": f"{samples[i % len(samples)]}"})
+            latencies.append(time.perf_counter() - start)
+            errors += resp.status_code >= 500
+            if changed_at and swapped_after is None and manager.active.version == expect_version:
+                swapped_after = time.perf_counter() - changed_at
+        s = summarize(latencies)
+        swap = f"{swapped_after * 1000:.1f} ms" if swapped_after is not None else "-"
+        print(f"{name:<16} {manager.active.version:<10} {s['p50_ms']:>8.3f} {s['p99_ms']:>8.3f} "
+              f"{max(latencies) * 1000:>8.2f} {errors:>6} {swap:>10}")
+        if errors:
+            raise SystemExit(f"{errors} failed requests during '{name}'")
+        return swapped_after
+
+    def flagged(text):
+        resp = client.post('/chat/secured', json={"message": text})
+        # The JSON body inspector answers with the view's own refusal, X-Detection header included
+        return "injection=true" in resp.headers.get("X-Detection", "")
+
+    print(f"pack {pack_path}, poll every {args.poll}s, {args.requests:,} requests per phase\n")
+    print(f"{'phase':<16} {'active':<10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>6} {'swap after':>10}")
+    phase("steady", args.requests)
+    if flagged(CANARY):
+        raise SystemExit("canary flagged before its rule exists")
+
+    good = dict(base, version="v2", sql=base["sql"] + [
+        {"id": "sql-canary", "pattern": NEW_SIGNATURE, "category": "custom", "severity": "high"}])
+    if phase("swap v2", args.requests, lambda: write_pack(pack_path, good), "v2") is None:
+        raise SystemExit("the new pack never became active")
+    time.sleep(args.poll * 2)
+    if not flagged(CANARY):
+        raise SystemExit("new signature not applied (stale verdict cache?)")
+
+    broken = dict(good, version="v3-broken", sql=good["sql"] + [{"pattern": "(unclosed"}])
+    phase("broken regex", args.requests, lambda: write_pack(pack_path, broken))
+    manager._thread and manager._thread.join()
+    overflow = dict(good, version="v3-overflow", sql=good["sql"] + [{"pattern": "a{99999999999}"}])
+    phase("overflow", args.requests, lambda: write_pack(pack_path, overflow))
+    manager._thread and manager._thread.join()
+    noisy = dict(good, version="v4-noisy", prompt=good["prompt"] + [{"pattern": "hello"}])
+    phase("golden failure", args.requests, lambda: write_pack(pack_path, noisy))
+    manager._thread and manager._thread.join()
+
+    stats = manager.stats()
+    if manager.active.version != "v2" or stats["rejected"] != 3:
+        raise SystemExit(f"bad packs not rejected: {stats}")
+    if len(loads) != 4:
+        raise SystemExit(f"expected one compile per file change, got {len(loads)}")
+    print(f"\ncompiles: {len(loads)} for 4 file changes; rejected: {stats['rejected']}")
+    print(f"last error: {stats['last_error'][:100]}")
+    print(f"active: {manager.active.info()}")
+    print(f"\nfor comparison, a worker restart (fresh app import): {restart_ms():.0f} ms before serving again")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Rule registry benchmark: startup compile cost.
+
+Startup: times each step of building the shared rule registry
+(``sentinelgate_lab.rules``) from scratch - compiling every pattern, the
+combined alternation, the literal-prefilter analysis - and the import of the
+module and of the app in fresh interpreters.
+
+That the request path compiles no regex, and that the built-in and loaded
+rule packs pass the golden corpus (also on hot reload), is checked by
+tests/test_rules.py.
+
+Usage (from project root):
+  python -m benchmarks.bench_rules
+  python -m benchmarks.bench_rules --repeat 20
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+from sentinelgate_lab import rules
+from sentinelgate_lab.detection import combine_patterns, required_literals
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RULE_LISTS = (
+    ("sql", rules.SQL_INJECTION_PATTERNS, re.IGNORECASE),
+    ("prompt", rules.PROMPT_INJECTION_PATTERNS, 0),
+    ("demo-sql", [r.pattern for r in rules.DEMO_SQL_RULES], re.IGNORECASE),
+)
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        re.purge()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def fresh_import_ms(module, repeat):
+    code = f"import time; s = time.perf_counter(); import {module}; print((time.perf_counter() - s) * 1000)"
+    runs = [float(subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True,
+                                 text=True, check=True).stdout.split()[-1]) for _ in range(repeat)]
+    return min(runs)
+
+
+def startup(repeat):
+    print(f"{'step':<34} {'ms':>8}   (best of {repeat}, re cache purged)")
+    total = 0.0
+    for name, patterns, flags in RULE_LISTS:
+        steps = (
+            ("compile patterns", lambda: [re.compile(p, flags) for p in patterns]),
+            ("compile combined", lambda: re.compile(combine_patterns(patterns), flags)),
+            ("prefilter analysis", lambda: [required_literals(p, flags) for p in patterns]),
+        )
+        for step, fn in steps:
+            ms = best_of(repeat, fn)
+            total += ms
+            print(f"{name + ': ' + step:<34} {ms:>8.2f}")
+    print(f"{'total':<34} {total:>8.2f}")
+    print(f"{'import sentinelgate_lab.rules':<34} {fresh_import_ms('sentinelgate_lab.rules', 3):>8.2f}   fresh interpreter")
+    print(f"{'import sentinelgate_lab.app':<34} {fresh_import_ms('sentinelgate_lab.app', 3):>8.2f}   fresh interpreter")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="timing repetitions per startup step")
+    args = parser.parse_args()
+
+    startup(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+cipher-shield.js serving benchmark: per-request read + replace vs the memoized handler.
+
+Drives both handlers through the Flask test client with a mix of first visits
+(no validator) and revisits (If-None-Match with the ETag from the first
+response), for clients with and without gzip/brotli support. Reports
+requests/sec and body bytes sent per request, then the same for a client
+sending a new Host header on every request (each one a cache miss: the
+handler must stay close to the legacy cost, not compress at best level).
+
+Usage (from project root):
+  python -m benchmarks.bench_shield
+  python -m benchmarks.bench_shield --requests 5000 --revisit 0.8
+"""
+import argparse
+import gzip
+import os
+import random
+import time
+
+from flask import Response, request
+
+from benchmarks.common import load_app
+
+ENCODINGS = ["", "gzip, deflate", "gzip, deflate, br"]
+
+
+def legacy_handler(app):
+    """The original handler: open, read and rewrite the file on every request."""
+    def serve():
+        path = os.path.join(app.static_folder, 'cipher-shield.js')
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        base = request.url_root.rstrip('/')
+        if request.headers.get('X-Forwarded-Proto') == 'https':
+            base = base.replace('http://', 'https://', 1)
+        content = content.replace('https://your-domain.com', base, 1)
+        resp = Response(content, mimetype='application/javascript')
+        resp.headers['Cache-Control'] = 'public, max-age=3600'
+        resp.headers['X-Content-Type-Options'] = 'nosniff'
+        return resp
+    return serve
+
+
+def workload(n, revisit, seed):
+    rng = random.Random(seed)
+    return [(rng.choice(ENCODINGS), rng.random() < revisit) for _ in range(n)]
+
+
+def run(client, url, plan):
+    etags = {}
+    sent = 0
+    start = time.perf_counter()
+    for encoding, revisit in plan:
+        headers = {"Accept-Encoding": encoding} if encoding else {}
+        if revisit and encoding in etags:
+            headers["If-None-Match"] = etags[encoding]
+        resp = client.get(url, headers=headers)
+        sent += len(resp.get_data())
+        if resp.headers.get("ETag"):
+            etags[encoding] = resp.headers["ETag"]
+    elapsed = time.perf_counter() - start
+    return len(plan) / elapsed, sent / len(plan)
+
+
+def run_rotating(client, url, n):
+    """First visits from gzip clients, each with a Host never seen before."""
+    sent = 0
+    start = time.perf_counter()
+    for i in range(n):
+        resp = client.get(url, headers={"Accept-Encoding": "gzip, deflate", "Host": f"h{i}.example.test"})
+        sent += len(resp.get_data())
+    return n / (time.perf_counter() - start), sent / n
+
+
+def check_pinned(app_module):
+    """Pinned bases are fully compressed up front; other bases compress lazily, to the same content."""
+    from sentinelgate_lab.assets import RenderedScript
+
+    script = RenderedScript(app_module.SHIELD_SCRIPT.path, 'https://your-domain.com', max_variants=2,
+                            pinned=['https://pinned.example.test'])
+    pinned = script.render('https://pinned.example.test')
+    assert set(pinned.bodies) == set(pinned.etags), "pinned rendering not compressed up front"
+    other = script.render('https://other.example.test')
+    assert set(other.bodies) == {'identity'}, "unpinned rendering compressed before any request asked"
+    assert gzip.decompress(other.body('gzip')) == other.bodies['identity']
+    for i in range(5):
+        script.render(f"https://h{i}.example.test")
+    assert script.render('https://pinned.example.test') is pinned, "pinned rendering evicted"
+
+
+def run_handler(app, view, n):
+    """Call the view directly inside a request context: handler cost without the WSGI round trip."""
+    with app.test_request_context('/cipher-shield.js', headers={"Accept-Encoding": "gzip"}):
+        start = time.perf_counter()
+        for _ in range(n):
+            view()
+        return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--revisit", type=float, default=0.7, help="share of requests carrying If-None-Match")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    app_module = load_app()
+    app_module.app.add_url_rule('/_bench/legacy-cipher-shield.js', 'legacy_cipher_shield',
+                                legacy_handler(app_module.app))
+    client = app_module.app.test_client()
+
+    legacy = client.get('/_bench/legacy-cipher-shield.js').get_data()
+    current = client.get('/cipher-shield.js', headers={"Accept-Encoding": ""}).get_data()
+    if legacy != current:
+        raise SystemExit("rendered script differs from the legacy handler's output")
+
+    check_pinned(app_module)
+    plan = workload(args.requests, args.revisit, args.seed)
+    print(f"{args.requests:,} requests, {args.revisit:.0%} revisits, encodings {ENCODINGS}")
+    print(f"brotli available: {app_module.SHIELD_SCRIPT.stats()['brotli']}\n")
+    print(f"{'handler':<10} {'req/s':>10} {'bytes/req':>10} {'handler-only/s':>15}")
+    for name, url, view in (
+        ("legacy", '/_bench/legacy-cipher-shield.js', app_module.app.view_functions['legacy_cipher_shield']),
+        ("memoized", '/cipher-shield.js', app_module.serve_sentinel_script),
+    ):
+        rate, per_req = run(client, url, plan)
+        handler_rate = run_handler(app_module.app, view, args.requests)
+        print(f"{name:<10} {rate:>10,.0f} {per_req:>10,.0f} {handler_rate:>15,.0f}")
+    print(f"\nscript cache: {app_module.SHIELD_SCRIPT.stats()}")
+
+    print(f"\nrotating Host headers ({args.requests:,} first visits, gzip clients)")
+    print(f"{'handler':<10} {'req/s':>10} {'bytes/req':>10}")
+    for name, url in (("legacy", '/_bench/legacy-cipher-shield.js'), ("memoized", '/cipher-shield.js')):
+        rate, per_req = run_rotating(client, url, args.requests)
+        print(f"{name:<10} {rate:>10,.0f} {per_req:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Shared helpers for the benchmark scripts."""
+import logging
+import math
+
+
+def percentile(sorted_samples, q):
+    """Nearest-rank percentile of an already sorted list (q in 0..100)."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+
+def summarize(samples):
+    """p50/p95/p99/mean of latency samples in seconds, reported in milliseconds."""
+    s = sorted(samples)
+    return {
+        "n": len(s),
+        "mean_ms": sum(s) / len(s) * 1000 if s else 0.0,
+        "p50_ms": percentile(s, 50) * 1000,
+        "p95_ms": percentile(s, 95) * 1000,
+        "p99_ms": percentile(s, 99) * 1000,
+    }
+
+
+class UnlimitedBackend:
+    """Rate-limit backend stand-in that allows everything (load generation from one IP)."""
+
+    name = "unlimited"
+
+    def hit(self, key, now=None):
+        return True
+
+    async def ahit(self, key, executor=None):
+        return True
+
+    def reset(self):
+        pass
+
+    def stats(self):
+        return {"backend": self.name}
+
+
+def load_app():
+    """Import the Flask app quietly and lift the per-IP rate limit for load generation."""
+    logging.getLogger("sentinelgate_lab.app").setLevel(logging.ERROR)
+    from sentinelgate_lab import app as app_module
+    app_module.app.logger.setLevel(logging.ERROR)
+    app_module.RATE_LIMITER = UnlimitedBackend()
+    return app_module
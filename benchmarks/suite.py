@@ -0,0 +1,329 @@
+"""
+Benchmark suite: latency, throughput and peak RSS of the main paths, as JSON.
+
+Each benchmark runs in a fresh interpreter (so its peak RSS, VmHWM, is its
+own) for --seconds, timing every call:
+
+  micro.is_sql_injection      app.is_sql_injection on corpus samples (unique texts, no verdict cache hits)
+  micro.is_prompt_injection   app.is_prompt_injection, same inputs
+  micro.clean_text            ml/preprocess.clean_text
+  micro.predict               ml/predict.predict, one text per call
+  micro.predict_batch         ml/predict.predict_batch, --batch texts per call
+  flask.<endpoint>            Flask test client: POST /chat/secured, /chat/unsecured
+                              (a user lookup), /query/secure; GET /cipher-shield.js
+  gunicorn.<endpoint>         the same requests over HTTP to ``gunicorn --preload app:app``
+                              (--workers) from --clients client threads; peak RSS is the server's
+
+For each one the result has p50/p95/p99/mean latency in ms, ``ops_per_s``
+(calls per second; ``items_per_s`` counts texts for predict_batch) and
+``peak_rss_mib``. ``compare`` flags a regression when latency or peak RSS grew,
+or throughput fell, by more than --threshold (default 10%), and exits with 1.
+
+Usage (from project root):
+  python -m benchmarks.suite run --out results.json
+  python -m benchmarks.suite run --only micro --seconds 1
+  python -m benchmarks.suite run --only gunicorn.chat_secured flask --out new.json
+  python -m benchmarks.suite compare results.json new.json --threshold 0.15
+  python -m benchmarks.suite list
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.common import summarize
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ML_DIR = os.path.join(PROJECT_ROOT, 'ml')
+
+ENDPOINTS = {
+    'chat_secured': ('POST', '/chat/secured', {"message": "hello, can you help me with my order?"}),
+    'chat_unsecured': ('POST', '/chat/unsecured', {"message": "show me the password for alice"}),
+    'query_secure': ('POST', '/query/secure', {"chat_input": "alice", "table": "secrets"}),
+    'shield_js': ('GET', '/cipher-shield.js', None),
+}
+# Metrics where a larger value is worse, and where a smaller one is (items_per_s moves with ops_per_s)
+LOWER_IS_BETTER = ('p50_ms', 'p95_ms', 'p99_ms', 'peak_rss_mib')
+HIGHER_IS_BETTER = ('ops_per_s',)
+
+
+def peak_rss_mib(pid='self'):
+    with open(f'/proc/{pid}/status') as f:
+        return int(re.search(r"VmHWM:\s+(\d+)", f.read()).group(1)) / 1024
+
+
+def _corpus_inputs(n):
+    """``n`` distinct texts cycling through the sample corpus, so every call misses the verdict cache."""
+    from sentinelgate_lab.corpus import BENIGN_SAMPLES, PROMPT_INJECTION_SAMPLES, SQL_INJECTION_SAMPLES
+    samples = BENIGN_SAMPLES + SQL_INJECTION_SAMPLES + PROMPT_INJECTION_SAMPLES
+    return [f"{samples[i % len(samples)]} {i}" for i in range(n)]
+
+
+def _timed(fn, inputs, seconds):
+    """Call ``fn`` on ``inputs`` in turn for ``seconds``; per-call latencies and wall time."""
+    latencies = []
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    deadline = start + seconds
+    i = 0
+    while True:
+        t0 = perf_counter()
+        fn(inputs[i % len(inputs)])
+        t1 = perf_counter()
+        latencies.append(t1 - t0)
+        i += 1
+        if t1 >= deadline:
+            return latencies, t1 - start
+
+
+def _quiet_app():
+    from benchmarks.common import load_app
+    return load_app()
+
+
+def _ml_module(name):
+    # The ml/ scripts import each other by module name, as when run from ml/
+    sys.path.insert(0, ML_DIR)
+    return __import__(name)
+
+
+def micro_is_sql_injection(args):
+    app_module = _quiet_app()
+    return _timed(app_module.is_sql_injection, _corpus_inputs(200_000), args.seconds)
+
+
+def micro_is_prompt_injection(args):
+    app_module = _quiet_app()
+    return _timed(app_module.is_prompt_injection, _corpus_inputs(200_000), args.seconds)
+
+
+def micro_clean_text(args):
+    return _timed(_ml_module('preprocess').clean_text, _corpus_inputs(200_000), args.seconds)
+
+
+def micro_predict(args):
+    predict = _ml_module('predict')
+    predict.load_model()
+    return _timed(predict.predict, _corpus_inputs(50_000), args.seconds)
+
+
+def micro_predict_batch(args):
+    predict = _ml_module('predict')
+    predict.load_model()
+    texts = _corpus_inputs(args.batch * 8)
+    batches = [texts[i:i + args.batch] for i in range(0, len(texts), args.batch)]
+    latencies, elapsed = _timed(predict.predict_batch, batches, args.seconds)
+    return latencies, elapsed, args.batch
+
+
+def _flask(endpoint):
+    def run(args):
+        client = _quiet_app().app.test_client()
+        method, path, doc = ENDPOINTS[endpoint]
+
+        def call(_):
+            response = client.open(path, method=method, json=doc)
+            if response.status_code != 200:
+                raise SystemExit(f"{method} {path}: HTTP {response.status_code}")
+            response.close()
+        return _timed(call, [None], args.seconds)
+    return run
+
+
+def _server_pids(master):
+    pids = [master]
+    for pid in pids:
+        try:
+            for task in os.listdir(f'/proc/{pid}/task'):
+                with open(f'/proc/{pid}/task/{task}/children') as f:
+                    pids += [int(child) for child in f.read().split()]
+        except OSError:
+            pass
+    return pids
+
+
+def _gunicorn(endpoint):
+    def run(args):
+        from benchmarks.bench_ratelimit_mp import _free_port, _wait_for
+        method, path, doc = ENDPOINTS[endpoint]
+        body = json.dumps(doc) if doc is not None else None
+        headers = {"Content-Type": "application/json"} if doc is not None else {}
+        port = _free_port()
+        env = {**os.environ, "RATE_LIMIT": "1000000000", "SECRET_KEY": os.environ.get("SECRET_KEY", "bench-suite")}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "--preload", "-w", str(args.workers), "-b", f"127.0.0.1:{port}", "app:app"],
+            cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_for(port)
+            per_client, errors = [], []
+
+            def request(_):
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                conn.request(method, path, body, headers)
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                if response.status != 200:
+                    errors.append(response.status)
+
+            def client():
+                per_client.append(_timed(request, [None], args.seconds))
+            request(None)   # warm up
+            threads = [threading.Thread(target=client) for _ in range(args.clients)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            rss = sum(peak_rss_mib(pid) for pid in _server_pids(server.pid))
+        finally:
+            server.terminate()
+            server.wait()
+        if errors:
+            raise SystemExit(f"{method} {path}: {len(errors)} non-200 responses, e.g. HTTP {errors[0]}")
+        latencies = [s for samples, _ in per_client for s in samples]
+        return latencies, max(elapsed for _, elapsed in per_client), 1, rss
+    return run
+
+
+BENCHMARKS = {
+    'micro.is_sql_injection': micro_is_sql_injection,
+    'micro.is_prompt_injection': micro_is_prompt_injection,
+    'micro.clean_text': micro_clean_text,
+    'micro.predict': micro_predict,
+    'micro.predict_batch': micro_predict_batch,
+    **{f'flask.{name}': _flask(name) for name in ENDPOINTS},
+    **{f'gunicorn.{name}': _gunicorn(name) for name in ENDPOINTS},
+}
+
+
+def child(name, args):
+    """Run one benchmark in this (fresh) process and print its result as JSON.
+
+    A benchmark returns (latencies, elapsed[, items per call[, peak RSS of the server]]).
+    """
+    logging.disable(logging.WARNING)
+    outcome = BENCHMARKS[name](args)
+    latencies, elapsed = outcome[:2]
+    items = outcome[2] if len(outcome) > 2 else 1
+    result = summarize(latencies)
+    result.update({
+        "ops_per_s": len(latencies) / elapsed,
+        "items_per_s": len(latencies) * items / elapsed,
+        "peak_rss_mib": outcome[3] if len(outcome) > 3 else peak_rss_mib(),
+    })
+    print(json.dumps(result))
+
+
+def selected(only):
+    if not only:
+        return list(BENCHMARKS)
+    names = [name for name in BENCHMARKS if any(name == o or name.startswith(o + '.') for o in only)]
+    if not names:
+        raise SystemExit(f"no benchmark matches {only}; see `python -m benchmarks.suite list`")
+    return names
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    results = {}
+    for name in selected(args.only):
+        command = [sys.executable, "-m", "benchmarks.suite", "--child", name, "--seconds", str(args.seconds),
+                   "--batch", str(args.batch), "--workers", str(args.workers), "--clients", str(args.clients)]
+        out = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True)
+        if out.returncode != 0:
+            raise SystemExit(f"{name} failed:\n{out.stderr or out.stdout}")
+        results[name] = json.loads(out.stdout.strip().splitlines()[-1])
+        r = results[name]
+        print(f"{name:<28} p50 {r['p50_ms']:>8.3f} ms  p95 {r['p95_ms']:>8.3f} ms  p99 {r['p99_ms']:>8.3f} ms  "
+              f"{r['ops_per_s']:>10,.0f} ops/s  {r['peak_rss_mib']:>6.0f} MiB", file=sys.stderr)
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": {"seconds": args.seconds, "batch": args.batch, "workers": args.workers, "clients": args.clients},
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def compare(args):
+    with open(args.base) as f:
+        base = json.load(f)["results"]
+    with open(args.new) as f:
+        new = json.load(f)["results"]
+    regressions = 0
+    print(f"{'benchmark':<28} {'metric':<13} {'base':>12} {'new':>12} {'change':>8}")
+    for name in sorted(set(base) | set(new)):
+        if name not in base or name not in new:
+            print(f"{name:<28} {'(only in ' + ('base' if name in base else 'new') + ')':<13}")
+            continue
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            old_value, new_value = base[name][metric], new[name][metric]
+            change = (new_value - old_value) / old_value if old_value else 0.0
+            worse = change > args.threshold if metric in LOWER_IS_BETTER else change < -args.threshold
+            regressions += worse
+            if worse or args.all:
+                print(f"{name:<28} {metric:<13} {old_value:>12,.3f} {new_value:>12,.3f} {change:>+8.1%}"
+                      f"{'  REGRESSION' if worse else ''}")
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    settings = argparse.ArgumentParser(add_help=False)
+    settings.add_argument("--seconds", type=float, default=2.0, help="time per benchmark")
+    settings.add_argument("--batch", type=int, default=1000, help="texts per predict_batch call")
+    settings.add_argument("--workers", type=int, default=1, help="gunicorn workers")
+    settings.add_argument("--clients", type=int, default=4, help="client threads against gunicorn")
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0], parents=[settings])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    commands = parser.add_subparsers(dest="command")
+    run_parser = commands.add_parser("run", parents=[settings], help="run benchmarks and write results as JSON")
+    run_parser.add_argument("--only", nargs="+", help="benchmark names or groups (micro, flask, gunicorn)")
+    run_parser.add_argument("--out", help="result file (default: stdout)")
+    compare_parser = commands.add_parser("compare", help="flag regressions between two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="relative change that counts (0.10 = 10%%)")
+    compare_parser.add_argument("--all", action="store_true", help="show every metric, not only regressions")
+    commands.add_parser("list", help="list benchmark names")
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args)
+    elif args.command == "run":
+        run(args)
+    elif args.command == "compare":
+        sys.exit(compare(args))
+    elif args.command == "list":
+        print("\n".join(BENCHMARKS))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
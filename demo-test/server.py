@@ -4,11 +4,15 @@ Run from demo-test folder: python server.py
 Then open http://localhost:5050
 """
 import os
-import re
 import sqlite3
+import sys
 from flask import Flask, jsonify, request, send_from_directory
 
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Shared rule registry (compiled once); the project root is not on sys.path when run from demo-test
+sys.path.insert(0, os.path.dirname(THIS_DIR))
+from sentinelgate_lab.analysis import AnalysisContext  # noqa: E402
+from sentinelgate_lab.rules import DEMO_SQL_DETECTOR  # noqa: E402
 DB_PATH = os.path.join(THIS_DIR, 'demo.db')
 # Prefer script inside demo-test so demo works regardless of cwd
 SCRIPT_LOCAL = os.path.join(THIS_DIR, 'cipher-shield.js')
@@ -39,21 +43,21 @@ def init_db():
         ])
         c.commit()
 
-SQL_PATTERNS = [
-    r"\bOR\s+1\s*=\s*1\b", r"\bOR\s+'1'\s*=\s*'1'", r"\bUNION\s+SELECT\b",
-    r"'\s*OR\s+", r"'\s*;\s*--", r"\bDROP\s+TABLE\b", r"\bUNION\s+SELECT\s+\*",
-]
-def is_sql_injection(t):
-    t = t.lower().strip()
-    for p in SQL_PATTERNS:
-        if re.search(p, t, re.I): return True
+def _matches(t):
+    if DEMO_SQL_DETECTOR.is_match(t): return True
     if ("'" in t or '"' in t) and any(k in t for k in ['or', 'and', 'select', 'union']):
         return True
     return False
 
-def extract_user(t):
+def is_sql_injection(t, ctx=None):
+    # Lowercased input, then its URL/hex-decoded form (%27 -> '); computed once per context
+    return (ctx or AnalysisContext(t)).verdict(
+        'sql', lambda c: _matches(c.lower) or (c.encoded and _matches(c.decoded)))
+
+def extract_user(t, ctx=None):
+    t_lower = (ctx or AnalysisContext(t)).lower
     for u in ['Admin', 'CEO', 'CTO', 'HR', 'Developer']:
-        if u.lower() in t.lower(): return u
+        if u.lower() in t_lower: return u
     return t.strip()
 
 @app.route('/')
@@ -78,11 +82,14 @@ def chat():
     if not msg:
         return jsonify({"status": "error", "message": "Empty message"}), 400
 
-    is_lookup = any(k in msg.lower() for k in ['get', 'find', 'show', 'data', 'password']) or \
-        any(n in msg for n in ['Admin', 'CEO', 'CTO', 'HR', 'Developer']) or is_sql_injection(msg)
+    # One context per message: lowercased/decoded once, SQL verdict computed once
+    ctx = AnalysisContext(msg)
+    injection = is_sql_injection(msg, ctx)
+    is_lookup = ctx.contains_any(['get', 'find', 'show', 'data', 'password']) or \
+        any(n in msg for n in ['Admin', 'CEO', 'CTO', 'HR', 'Developer']) or injection
 
     if is_lookup:
-        qin = msg if is_sql_injection(msg) else extract_user(msg)
+        qin = msg if injection else extract_user(msg, ctx)
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
@@ -91,7 +98,7 @@ def chat():
                 rows = [dict(r) for r in cursor.fetchall()]
                 if rows:
                     resp = "Here is the data:\n" + "\n".join(f"- {r['name']}: {r['data']}" for r in rows)
-                    if is_sql_injection(msg):
+                    if injection:
                         resp += f"\n\n[Query: {q}]"
                     return jsonify({"status": "success", "response": resp, "is_injection": True})
                 return jsonify({"status": "success", "response": f"No record for '{qin}'."})
@@ -0,0 +1,108 @@
+"""
+Benchmark: pickled sklearn pipeline vs the compact NumPy export.
+
+Each format is loaded in a fresh subprocess to measure cold start (imports +
+model load + first prediction) and resident memory; predictions/sec are then measured
+for single inputs and batches, and the compact model's probabilities are
+checked against the pickle's.
+
+Usage:
+  cd ml
+  python compact.py            # export models/classifier.npz first, if missing
+  python bench_compact.py
+  python bench_compact.py --rows 50000 --tolerance 1e-9
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from bench_predict import synthetic_inputs
+from compact import COMPACT_MODEL_PATH
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PICKLE_PATH = os.path.join(BASE_DIR, "models", "classifier.pkl")
+
+# Runs in a fresh interpreter: time from first import to first prediction, then RSS.
+# (ru_maxrss would include the parent's peak, since it survives fork + exec on Linux.)
+_COLD_START = """
+import json, resource, sys, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+from predict import load_model, predict
+load_model(sys.argv[1])
+predict("SELECT * FROM users")
+elapsed = time.perf_counter() - start
+try:
+    with open("/proc/self/status") as f:
+        rss_kib = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+except OSError:
+    rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"cold_start_s": elapsed, "rss_mib": rss_kib / 1024,
+                  "sklearn": "sklearn" in sys.modules, "pandas": "pandas" in sys.modules}))
+"""
+
+
+def cold_start(model_path):
+    out = subprocess.run([sys.executable, "-c", _COLD_START, model_path], cwd=BASE_DIR,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def load(path):
+    import warnings
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if path.endswith(".npz"):
+            from compact import CompactModel
+            return CompactModel(path)
+        import pickle
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def rate(n, fn):
+    start = time.perf_counter()
+    fn()
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--single", type=int, default=2_000, help="inputs for the one-at-a-time measurement")
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not os.path.exists(COMPACT_MODEL_PATH):
+        raise SystemExit(f"{COMPACT_MODEL_PATH} not found; run `python compact.py` first")
+
+    from preprocess import clean_text
+    texts = [clean_text(t) for t in synthetic_inputs(args.rows, args.seed)]
+    models = {"pickle": load(PICKLE_PATH), "compact": load(COMPACT_MODEL_PATH)}
+
+    diff = np.abs(models["pickle"].predict_proba(texts) - models["compact"].predict_proba(texts)).max()
+    if diff > args.tolerance:
+        raise SystemExit(f"compact probabilities differ from the pickle by {diff:g} (> {args.tolerance:g})")
+    print(f"{args.rows:,} inputs, max |probability difference| = {diff:.2e}\n")
+
+    print(f"{'format':<8} {'file KiB':>9} {'cold start s':>13} {'RSS MiB':>13} "
+          f"{'single/s':>9} {'batch/s':>9}  imports")
+    for name, path in (("pickle", PICKLE_PATH), ("compact", COMPACT_MODEL_PATH)):
+        model = models[name]
+        cold = cold_start(path)
+        single = texts[:args.single]
+        single_rate = rate(len(single), lambda: [model.predict_proba([t]) for t in single])
+        batch_rate = rate(len(texts), lambda: model.predict_proba(texts))
+        imports = ", ".join(m for m in ("sklearn", "pandas") if cold[m]) or "numpy only"
+        print(f"{name:<8} {os.path.getsize(path) / 1024:>9,.0f} {cold['cold_start_s']:>13.2f} "
+              f"{cold['rss_mib']:>13.1f} {single_rate:>9,.0f} {batch_rate:>9,.0f}  {imports}")
+
+
+if __name__ == "__main__":
+    main()
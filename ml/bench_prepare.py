@@ -0,0 +1,150 @@
+"""
+Benchmark: whole-file prepare vs streaming prepare (chunks, optional workers).
+
+Writes a messy synthetic Kaggle-style CSV (mixed label spellings, missing
+values, duplicates, odd whitespace, quotes and newlines inside fields), runs
+the original whole-file implementation and the streaming ``prepare`` with
+several --chunksize/--workers settings, checks the outputs are byte-identical,
+and reports time and peak RSS of each run (fresh subprocess per run). A small
+file whose first chunks hold only numbers and blanks in the text column is
+checked the same way at --chunksize 3 (pandas types each chunk on its own).
+
+Usage:
+  cd ml
+  python bench_prepare.py
+  python bench_prepare.py --rows 1000000 --chunksize 100000 --workers 1 2 4
+"""
+import argparse
+import csv
+import filecmp
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from bench_predict import BENIGN, MALICIOUS
+from prepare_data import LABEL_COLUMNS, TEXT_COLUMNS, clean_text, find_column, normalize_label
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def legacy_prepare(in_path, out_path, text_col=None, label_col=None, default_label=None):
+    """The original prepare(): whole file in memory, row-by-row apply, one drop_duplicates."""
+    df = pd.read_csv(in_path)
+    df.columns = [c.strip() for c in df.columns]
+    query_col = text_col or find_column(df, TEXT_COLUMNS)
+    label_col = label_col or find_column(df, LABEL_COLUMNS)
+    out_df = pd.DataFrame()
+    out_df["query"] = df[query_col].fillna("").astype(str).apply(clean_text)
+    if label_col:
+        labels = df[label_col]
+    else:
+        labels = pd.Series(default_label, index=df.index)
+    out_df["label"] = labels.apply(normalize_label)
+    out_df = out_df[out_df["query"].str.len() >= 2].drop_duplicates(subset=["query"])
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    out_df.to_csv(out_path, index=False)
+
+
+# Runs one implementation in a fresh interpreter and prints its peak RSS (VmHWM)
+_RUN = """
+import contextlib, io, json, sys
+mode, in_path, out_path, chunksize, workers = json.load(sys.stdin)
+with contextlib.redirect_stdout(io.StringIO()):
+    if mode == "legacy":
+        from bench_prepare import legacy_prepare
+        legacy_prepare(in_path, out_path)
+    else:
+        from prepare_data import prepare
+        prepare(in_path, out_path, chunksize=chunksize, workers=workers)
+with open("/proc/self/status") as f:
+    print(next(line for line in f if line.startswith("VmHWM:")))
+"""
+
+
+def write_dataset(path, rows, seed):
+    rng = random.Random(seed)
+    labels = [0, 1, "1", "0", "yes", "no", "Malicious", "benign", "TRUE", "", "jailbreak"]
+    noise = ["", "  ", "\t", "\n", " \"quoted\" ", ", comma", "  spaced   out  "]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([" Prompt ", "Is_Injection", "source"])
+        for i in range(rows):
+            if rng.random() < 0.02:
+                text = rng.choice(["", "x", "  "])
+            else:
+                text = rng.choice(MALICIOUS + BENIGN).format(n=rng.randint(1, 5000 if i % 3 else 50))
+                text = f"{rng.choice(noise)}{text}{rng.choice(noise)}"
+                if rng.random() < 0.3:
+                    text = text.upper()
+            writer.writerow([text, rng.choice(labels), f"src{i % 7}"])
+
+
+def write_numeric_chunks(path):
+    """Text column with a numbers-only stretch (whole chunks at chunksize 3), then mixed rows."""
+    rows = [["123", 1], ["", 0], ["4567", "0"], ["0042", 1], ["1e5", 0], ["", 1], ["99", "yes"],
+            ["3.50", 0], ["123", 0]]
+    rows += [[text, i % 2] for i, text in enumerate(["hello 123", "123", "select 1", " 88 ", "x y", "77"])]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([" Prompt ", "Is_Injection"])
+        writer.writerows(rows)
+
+
+def run(mode, in_path, out_path, chunksize=0, workers=1):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", _RUN], cwd=BASE_DIR, capture_output=True, text=True, check=True,
+                         input=json.dumps([mode, in_path, out_path, chunksize, workers])).stdout
+    elapsed = time.perf_counter() - start
+    return elapsed, int(re.search(r"VmHWM:\s+(\d+)", out).group(1)) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--chunksize", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--seed", type=int, default=17)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        in_path = os.path.join(workdir, "raw.csv")
+        write_dataset(in_path, args.rows, args.seed)
+        legacy_out = os.path.join(workdir, "legacy.csv")
+        elapsed, peak = run("legacy", in_path, legacy_out)
+        print(f"{args.rows:,} input rows ({os.path.getsize(in_path) / 2 ** 20:.1f} MiB), "
+              f"{sum(1 for _ in open(legacy_out, encoding='utf-8')) - 1:,} rows after cleaning\n")
+        print(f"{'mode':<10} {'chunksize':>10} {'workers':>8} {'time s':>8} {'peak MiB':>9}  output")
+        print(f"{'legacy':<10} {'-':>10} {'-':>8} {elapsed:>8.2f} {peak:>9.0f}  reference")
+        mismatches = 0
+        for chunksize in args.chunksize:
+            for workers in args.workers:
+                out_path = os.path.join(workdir, f"stream_{chunksize}_{workers}.csv")
+                elapsed, peak = run("streaming", in_path, out_path, chunksize, workers)
+                same = filecmp.cmp(legacy_out, out_path, shallow=False)
+                mismatches += not same
+                print(f"{'streaming':<10} {chunksize:>10,} {workers:>8} {elapsed:>8.2f} {peak:>9.0f}  "
+                      f"{'identical' if same else 'DIFFERENT'}")
+
+        numeric_in = os.path.join(workdir, "numeric.csv")
+        write_numeric_chunks(numeric_in)
+        numeric_legacy = os.path.join(workdir, "numeric_legacy.csv")
+        run("legacy", numeric_in, numeric_legacy)
+        for workers in (1, 2):
+            out_path = os.path.join(workdir, f"numeric_{workers}.csv")
+            run("streaming", numeric_in, out_path, 3, workers)
+            same = filecmp.cmp(numeric_legacy, out_path, shallow=False)
+            mismatches += not same
+            print(f"{'numeric':<10} {3:>10,} {workers:>8} {'':>8} {'':>9}  {'identical' if same else 'DIFFERENT'}")
+        if mismatches:
+            raise SystemExit(f"{mismatches} streaming outputs differ from the whole-file output")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Benchmark: row-by-row clean_text vs the batch cleaners clean_series / clean_texts.
+
+Times the three over a synthetic query column. That both batch cleaners
+return exactly what clean_text does is checked by tests/test_ml_preprocess.py.
+
+Usage:
+  cd ml
+  python bench_preprocess.py
+  python bench_preprocess.py --rows 500000
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from bench_predict import synthetic_inputs
+from preprocess import clean_series, clean_text, clean_texts
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    column = pd.Series(synthetic_inputs(args.rows, args.seed), name="query")
+    texts = column.tolist()
+    print(f"{args.rows:,} rows")
+    print(f"{'method':<22} {'seconds':>8} {'rows/s':>12}")
+    for name, fn in (
+        ("apply(clean_text)", lambda: column.apply(clean_text)),
+        ("clean_series", lambda: clean_series(column)),
+        ("clean_texts", lambda: clean_texts(texts)),
+    ):
+        seconds = timed(fn)
+        print(f"{name:<22} {seconds:>8.2f} {args.rows / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
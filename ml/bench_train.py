@@ -0,0 +1,86 @@
+"""
+Benchmark: in-memory TF-IDF training vs streaming (hashing + SGD) training.
+
+Writes synthetic labelled datasets at several multiples of a base sample
+size, runs ``train.py`` on each in a fresh subprocess and reports wall time,
+peak RSS and held-out accuracy. The streaming mode's peak memory should stay
+flat as the dataset grows.
+
+Usage:
+  cd ml
+  python bench_train.py
+  python bench_train.py --base-rows 1000 --scales 10 100 1000 --modes streaming
+"""
+import argparse
+import csv
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_predict import BENIGN, MALICIOUS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs train.py as __main__ and prints the peak RSS of that process (VmHWM) at exit
+_RUN = """
+import runpy, sys
+sys.argv = ["train.py"] + sys.argv[1:]
+runpy.run_path("train.py", run_name="__main__")
+with open("/proc/self/status") as f:
+    print(next(line for line in f if line.startswith("VmHWM:")))
+"""
+
+
+def write_dataset(path, rows, seed):
+    rng = random.Random(seed)
+    fillers = ["please", "asap", "thanks", "now", "ok", "for my report", "again"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["query", "label"])
+        for i in range(rows):
+            label = 1 if rng.random() < 0.3 else 0
+            text = rng.choice(MALICIOUS if label else BENIGN).format(n=rng.randint(1, 99999))
+            writer.writerow([f"{text} {rng.choice(fillers)} {i % 997}", label])
+
+
+def run_train(data_path, mode, workdir):
+    args = ["--data", data_path, "--model", os.path.join(workdir, f"{mode}.pkl"), "--compact", ""]
+    if mode == "streaming":
+        args.append("--streaming")
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", _RUN, *args], cwd=BASE_DIR,
+                         capture_output=True, text=True, check=True).stdout
+    elapsed = time.perf_counter() - start
+    peak_kib = int(re.search(r"VmHWM:\s+(\d+)", out).group(1))
+    accuracy = float(re.search(r"Accuracy: ([0-9.]+)", out).group(1))
+    return elapsed, peak_kib / 1024, accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-rows", type=int, default=500, help="rows in the 1x sample")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--modes", nargs="+", default=["tfidf", "streaming"], choices=["tfidf", "streaming"])
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'rows':>10} {'CSV MiB':>8}  {'mode':<10} {'time s':>8} {'peak MiB':>9} {'accuracy':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in args.scales:
+            rows = args.base_rows * scale
+            data_path = os.path.join(workdir, f"dataset_{scale}x.csv")
+            write_dataset(data_path, rows, args.seed)
+            size_mib = os.path.getsize(data_path) / 2 ** 20
+            for mode in args.modes:
+                elapsed, peak_mib, accuracy = run_train(data_path, mode, workdir)
+                print(f"{scale:>5}x {rows:>10,} {size_mib:>8.1f}  {mode:<10} {elapsed:>8.1f} "
+                      f"{peak_mib:>9.0f} {accuracy:>9.4f}", flush=True)
+            os.remove(data_path)
+
+
+if __name__ == "__main__":
+    main()
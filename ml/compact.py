@@ -0,0 +1,159 @@
+"""
+Compact, pickle-free export of the trained classifier, scored with NumPy only.
+
+The sklearn pipeline (TfidfVectorizer char_wb n-grams + LogisticRegression)
+is reduced to what inference needs, stored in an uncompressed ``.npz``:
+
+    vocab        sorted array of the n-gram features ('<U4'); a feature's
+                 column is its position in this array
+    idf, coef    float64 vectors in the same column order
+    intercept    LogisticRegression intercept
+    ngram_range, sublinear_tf, lowercase   vectorizer settings
+
+Loading it needs neither sklearn nor pickle, and there is no Python dict of
+the vocabulary: n-grams are looked up with ``np.searchsorted``. Probabilities
+match the pickled pipeline's ``predict_proba`` to float rounding.
+
+Export an existing pickle:
+  cd ml
+  python compact.py --model models/classifier.pkl --out models/classifier.npz
+"""
+import argparse
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPACT_MODEL_PATH = os.path.join(BASE_DIR, "models", "classifier.npz")
+
+
+def export_compact(pipeline, out_path: str = COMPACT_MODEL_PATH) -> str:
+    """Write the compact artifact for a fitted TF-IDF + LogisticRegression pipeline."""
+    vectorizer = pipeline.steps[0][1]
+    clf = pipeline.steps[-1][1]
+    params = vectorizer.get_params()
+    supported = {
+        "analyzer": "char_wb", "binary": False, "norm": "l2", "use_idf": True,
+        "preprocessor": None, "strip_accents": None,
+    }
+    for name, expected in supported.items():
+        if params[name] != expected:
+            raise ValueError(f"Compact export supports {name}={expected!r} only, got {params[name]!r}")
+    if list(clf.classes_) != [0, 1]:
+        raise ValueError(f"Compact export supports binary 0/1 labels only, got {list(clf.classes_)}")
+
+    terms = sorted(vectorizer.vocabulary_)
+    if any("\x00" in t for t in terms):
+        raise ValueError("Vocabulary contains NUL characters, which NumPy string arrays cannot hold")
+    columns = np.array([vectorizer.vocabulary_[t] for t in terms])
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    np.savez(
+        out_path,
+        format_version=np.int64(FORMAT_VERSION),
+        vocab=np.array(terms),
+        idf=vectorizer.idf_[columns].astype(np.float64),
+        coef=clf.coef_[0][columns].astype(np.float64),
+        intercept=np.float64(clf.intercept_[0]),
+        ngram_range=np.array(vectorizer.ngram_range, dtype=np.int64),
+        sublinear_tf=np.bool_(params["sublinear_tf"]),
+        lowercase=np.bool_(params["lowercase"]),
+    )
+    return out_path
+
+
+class CompactModel:
+    """Scores text from a compact artifact; ``predict_proba`` mirrors the sklearn pipeline's."""
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, path: str = COMPACT_MODEL_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data["format_version"])
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported compact model format {version} (expected {FORMAT_VERSION})")
+            self.vocab = data["vocab"]
+            self.idf = data["idf"]
+            self.coef = data["coef"]
+            self.intercept = float(data["intercept"])
+            self.min_n, self.max_n = (int(n) for n in data["ngram_range"])
+            self.sublinear_tf = bool(data["sublinear_tf"])
+            self.lowercase = bool(data["lowercase"])
+        self.path = path
+
+    def _ngrams(self, text: str) -> list:
+        """Same n-grams as sklearn's char_wb analyzer."""
+        if self.lowercase:
+            text = text.lower()
+        min_n, max_n = self.min_n, self.max_n
+        ngrams = []
+        append = ngrams.append
+        for w in text.split():
+            w = " " + w + " "
+            w_len = len(w)
+            for n in range(min_n, max_n + 1):
+                offset = 0
+                append(w[offset:offset + n])
+                while offset + n < w_len:
+                    offset += 1
+                    append(w[offset:offset + n])
+                if offset == 0:  # a short word counts once
+                    break
+        return ngrams
+
+    def decision_function(self, texts) -> np.ndarray:
+        n_docs = len(texts)
+        grams, lengths = [], []
+        for text in texts:
+            doc_grams = self._ngrams(text)
+            if "\x00" in text:
+                # NumPy strings drop trailing NULs; such n-grams are never in the vocabulary
+                doc_grams = [g for g in doc_grams if "\x00" not in g]
+            grams.extend(doc_grams)
+            lengths.append(len(doc_grams))
+        scores = np.full(n_docs, self.intercept)
+        if not grams:
+            return scores
+
+        # Vocabulary lookup for the whole batch at once
+        grams = np.array(grams, dtype=self.vocab.dtype)
+        pos = np.searchsorted(self.vocab, grams)
+        np.minimum(pos, len(self.vocab) - 1, out=pos)
+        known = self.vocab[pos] == grams
+        docs = np.repeat(np.arange(n_docs), lengths)[known]
+        cols = pos[known]
+        if not cols.size:
+            return scores
+
+        # Term counts per (document, feature), then tf-idf, l2 norm and the linear model
+        n_features = len(self.vocab)
+        keys, counts = np.unique(docs * n_features + cols, return_counts=True)
+        docs, cols = keys // n_features, keys % n_features
+        tf = counts.astype(np.float64)
+        if self.sublinear_tf:
+            tf = np.log(tf) + 1
+        weights = tf * self.idf[cols]
+        norms = np.sqrt(np.bincount(docs, weights * weights, minlength=n_docs))
+        dots = np.bincount(docs, weights * self.coef[cols], minlength=n_docs)
+        np.divide(dots, norms, out=dots, where=norms > 0)
+        return scores + dots
+
+    def predict_proba(self, texts) -> np.ndarray:
+        with np.errstate(over="ignore"):
+            p = 1.0 / (1.0 + np.exp(-self.decision_function(texts)))
+        return np.column_stack((1.0 - p, p))
+
+
+if __name__ == "__main__":
+    import pickle
+
+    parser = argparse.ArgumentParser(description="Export a pickled classifier to the compact .npz format")
+    parser.add_argument("--model", default=os.path.join(BASE_DIR, "models", "classifier.pkl"))
+    parser.add_argument("--out", default=COMPACT_MODEL_PATH)
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        pipeline = pickle.load(f)
+    print(f"Compact model saved to: {export_compact(pipeline, args.out)}")
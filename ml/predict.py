@@ -1,7 +1,11 @@
+from __future__ import annotations
+
 import os
 import pickle
+from itertools import islice
 
-from preprocess import clean_text
+from compact import COMPACT_MODEL_PATH, CompactModel
+from preprocess import clean_texts
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, "models", "classifier.pkl")
@@ -9,19 +13,50 @@ MODEL_PATH = os.path.join(BASE_DIR, "models", "classifier.pkl")
 _model = None
 
 
-def load_model(model_path: str = MODEL_PATH):
-    """Load the trained model (cached after first load)."""
+def load_model(model_path: str | None = None):
+    """
+    Load the trained model (cached after first load).
+
+    By default the compact NumPy export (models/classifier.npz) is used when
+    it exists, which avoids importing sklearn; otherwise the pickled pipeline.
+    Pass a .npz or .pkl path to choose explicitly.
+    """
     global _model
     if _model is None:
+        if model_path is None:
+            model_path = COMPACT_MODEL_PATH if os.path.exists(COMPACT_MODEL_PATH) else MODEL_PATH
         if not os.path.exists(model_path):
             raise FileNotFoundError(
                 f"Model not found at {model_path}. Run train.py first."
             )
-        with open(model_path, "rb") as f:
-            _model = pickle.load(f)
+        if model_path.endswith(".npz"):
+            _model = CompactModel(model_path)
+        else:
+            with open(model_path, "rb") as f:
+                _model = pickle.load(f)
     return _model
 
 
+def _results(probabilities, threshold: float) -> list:
+    """Build result dicts from the malicious-class column of predict_proba."""
+    return [
+        {
+            "label": "malicious" if p >= threshold else "safe",
+            "confidence": round(p, 4),
+            "flagged": p >= threshold
+        }
+        for p in probabilities
+    ]
+
+
+def _predict_chunk(texts: list, threshold: float) -> list:
+    if not texts:
+        return []
+    model = load_model()
+    proba = model.predict_proba(clean_texts(texts))
+    return _results(proba[:, 1].tolist(), threshold)
+
+
 def predict(text: str, threshold: float = 0.5) -> dict:
     """
     Predict whether a text input is a prompt/SQL injection.
@@ -36,22 +71,42 @@ def predict(text: str, threshold: float = 0.5) -> dict:
             - confidence: float between 0 and 1
             - flagged: bool
     """
-    model = load_model()
-    cleaned = clean_text(text)
+    return _predict_chunk([text], threshold)[0]
 
-    proba = model.predict_proba([cleaned])[0]
-    malicious_confidence = float(proba[1])
 
-    return {
-        "label": "malicious" if malicious_confidence >= threshold else "safe",
-        "confidence": round(malicious_confidence, 4),
-        "flagged": malicious_confidence >= threshold
-    }
+def iter_predictions(texts, threshold: float = 0.5, chunk_size: int = 10_000):
+    """
+    Yield one prediction per input, transforming ``chunk_size`` inputs at a time.
+
+    Works on any iterable (e.g. lines of a file), so memory stays bounded by
+    the chunk size rather than the number of inputs.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    it = iter(texts)
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        yield from _predict_chunk(chunk, threshold)
+
+
+def predict_batch(texts: list, threshold: float = 0.5, chunk_size: int | None = None) -> list:
+    """
+    Run prediction on a list of inputs with one vectorized predict_proba call.
 
+    Args:
+        texts: Raw user input strings
+        threshold: Confidence threshold to flag as malicious (default 0.5)
+        chunk_size: If set, process this many inputs per predict_proba call to
+            bound memory on very large lists
 
-def predict_batch(texts: list, threshold: float = 0.5) -> list:
-    """Run prediction on a list of inputs."""
-    return [predict(t, threshold) for t in texts]
+    Returns:
+        list of dicts in the same format as predict(), in input order
+    """
+    if chunk_size is None:
+        return _predict_chunk(list(texts), threshold)
+    return list(iter_predictions(texts, threshold, chunk_size))
 
 
 if __name__ == "__main__":
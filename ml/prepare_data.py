@@ -9,12 +9,23 @@ Usage:
 
   # Or with custom input/output
   python prepare_data.py path/to/downloaded.csv --out data/raw/dataset.csv
+
+  # Large dumps: stream in chunks and clean on several cores (same output)
+  python prepare_data.py big.csv --chunksize 200000 --workers 4
 """
+from __future__ import annotations
+
 import os
-import re
 import argparse
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 
+from preprocess import WHITESPACE  # precompiled, from the shared rule registry
+
 # Column mapping: dataset column name -> our name
 TEXT_COLUMNS = ("query", "text", "prompt", "content", "input", "message", "sentence")
 LABEL_COLUMNS = ("label", "is_injection", "is_jailbreak", "target", "attack", "class", "category")
@@ -49,53 +60,123 @@ def clean_text(text: str) -> str:
     if not isinstance(text, str):
         text = str(text)
     text = text.lower().strip()
-    text = re.sub(r"\s+", " ", text)
+    text = WHITESPACE.sub(" ", text)
     return text
 
 
+def clean_series(texts: pd.Series) -> pd.Series:
+    """
+    clean_text for a whole column in one pass. Splitting on whitespace and
+    joining with single spaces is the same as strip() + collapsing \\s+ runs
+    (str.split, str.strip and re's \\s share one definition of whitespace),
+    without a regex call per row.
+    """
+    return pd.Series([" ".join(t.lower().split()) for t in texts.tolist()], index=texts.index, dtype=object)
+
+
+def normalize_labels(labels: pd.Series) -> np.ndarray:
+    """normalize_label for a whole column, calling it once per distinct value."""
+    codes, uniques = pd.factorize(labels)
+    # Missing values get code -1, which picks the trailing 0
+    mapped = np.array([normalize_label(v) for v in uniques] + [0], dtype=np.int64)
+    return mapped[codes]
+
+
+def _clean_chunk(job):
+    """Cleaned query/label rows of one input chunk, before de-duplication, and their query digests."""
+    chunk, query_col, label_col, default_label = job
+    chunk.columns = [c.strip() for c in chunk.columns]
+    out_df = pd.DataFrame()
+    out_df["query"] = clean_series(chunk[query_col].fillna("").astype(str))
+    if label_col:
+        out_df["label"] = normalize_labels(chunk[label_col])
+    else:
+        # No label column present; fall back to a constant label
+        out_df["label"] = normalize_label(default_label)
+    # Drop empty rows
+    out_df = out_df[out_df["query"].str.len() >= 2]
+    digests = [hashlib.blake2b(q.encode("utf-8"), digest_size=16).digest() for q in out_df["query"].tolist()]
+    return out_df, digests
+
+
+def _map_ordered(fn, jobs, workers: int):
+    """map(fn, jobs) on ``workers`` processes, in order, with at most 2 * workers chunks in flight."""
+    if workers <= 1:
+        yield from map(fn, jobs)
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for job in jobs:
+            pending.append(executor.submit(fn, job))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 def prepare(
     in_path: str,
     out_path: str = DEFAULT_OUT,
     text_col: str = None,
     label_col: str = None,
     default_label: int | None = None,
+    chunksize: int = 100_000,
+    workers: int = 1,
 ) -> None:
-    df = pd.read_csv(in_path)
-    df.columns = [c.strip() for c in df.columns]
-
-    query_col = text_col or find_column(df, TEXT_COLUMNS)
-    label_col = label_col or find_column(df, LABEL_COLUMNS)
+    """
+    Stream ``in_path`` in chunks of ``chunksize`` rows: clean (on ``workers``
+    processes when > 1), drop empty rows and duplicates of earlier rows, and
+    append to ``out_path``. Memory is bounded by the chunk size plus one
+    16-byte digest per distinct query; the output is the same as cleaning the
+    whole file at once.
+    """
+    header = pd.read_csv(in_path, nrows=0)
+    raw_names = {c.strip(): c for c in header.columns}
+    header.columns = [c.strip() for c in header.columns]
+
+    query_col = text_col or find_column(header, TEXT_COLUMNS)
+    label_col = label_col or find_column(header, LABEL_COLUMNS)
 
     if not query_col:
         raise ValueError(
             f"No text column found. Expected one of: {TEXT_COLUMNS}. "
-            f"Your columns: {list(df.columns)}. Use --text-col <name> to specify."
+            f"Your columns: {list(header.columns)}. Use --text-col <name> to specify."
         )
     if not label_col and default_label is None:
         raise ValueError(
             f"No label column found. Expected one of: {LABEL_COLUMNS}. "
-            f"Your columns: {list(df.columns)}. Use --label-col <name> to specify, "
+            f"Your columns: {list(header.columns)}. Use --label-col <name> to specify, "
             f"or use --assume-label 0/1 to assign a constant label."
         )
 
-    out_df = pd.DataFrame()
-    out_df["query"] = df[query_col].fillna("").astype(str).apply(clean_text)
-
-    if label_col:
-        labels = df[label_col]
-    else:
-        # No label column present; fall back to a constant label
-        labels = pd.Series(default_label, index=df.index)
-
-    out_df["label"] = labels.apply(normalize_label)
-
-    # Drop empty or duplicate rows
-    out_df = out_df[out_df["query"].str.len() >= 2].drop_duplicates(subset=["query"])
-
+    seen = set()
+    rows = 0
+    label_counts = {}
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    out_df.to_csv(out_path, index=False)
-    print(f"Prepared {len(out_df)} rows -> {out_path}")
-    print(f"Label distribution:\n{out_df['label'].value_counts()}")
+    # pandas infers column types per chunk: read the text column as strings, or a chunk holding
+    # only numbers (and blanks) comes back as float and '123' would be written as '123.0'
+    dtype = {raw_names.get(query_col, query_col): str}
+    with pd.read_csv(in_path, chunksize=chunksize, dtype=dtype) as reader, \
+            open(out_path, "w", encoding="utf-8", newline="") as f:
+        jobs = ((chunk, query_col, label_col, default_label) for chunk in reader)
+        pd.DataFrame(columns=["query", "label"]).to_csv(f, index=False)
+        for out_df, digests in _map_ordered(_clean_chunk, jobs, workers):
+            # Drop rows whose query already appeared in this or an earlier chunk
+            keep = []
+            for digest in digests:
+                keep.append(digest not in seen)
+                seen.add(digest)
+            out_df = out_df[keep]
+            if out_df.empty:
+                continue
+            out_df.to_csv(f, index=False, header=False)
+            rows += len(out_df)
+            for label, n in out_df["label"].value_counts().items():
+                label_counts[label] = label_counts.get(label, 0) + n
+
+    print(f"Prepared {rows} rows -> {out_path}")
+    counts = pd.Series(label_counts, name="count", dtype="int64").rename_axis("label")
+    print(f"Label distribution:\n{counts.sort_values(ascending=False, kind='stable')}")
 
 
 if __name__ == "__main__":
@@ -110,6 +191,8 @@ if __name__ == "__main__":
         choices=[0, 1],
         help="If set, use this constant label (0=safe, 1=malicious) when no label column exists.",
     )
+    parser.add_argument("--chunksize", type=int, default=100_000, help="Rows read per chunk (default: 100000)")
+    parser.add_argument("--workers", type=int, default=1, help="Processes cleaning chunks in parallel (default: 1)")
     args = parser.parse_args()
     prepare(
         args.input,
@@ -117,4 +200,6 @@ if __name__ == "__main__":
         args.text_col,
         args.label_col,
         default_label=args.assume_label,
+        chunksize=args.chunksize,
+        workers=args.workers,
     )
@@ -1,5 +1,12 @@
-import re
-import pandas as pd
+import os
+import sys
+
+# Patterns come precompiled from the shared rule registry
+try:
+    from sentinelgate_lab.rules import WHITESPACE, decode_escapes
+except ImportError:  # run from ml/ (python train.py): the project root is not on sys.path
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from sentinelgate_lab.rules import WHITESPACE, decode_escapes
 
 
 def clean_text(text: str) -> str:
@@ -13,38 +20,94 @@ def clean_text(text: str) -> str:
     # Lowercase
     text = text.lower()
 
-    # Normalize URL encoding (e.g. %27 → ')
-    text = re.sub(r'%([0-9a-fA-F]{2})', lambda m: chr(int(m.group(1), 16)), text)
-
-    # Normalize hex encoding (e.g. 0x27 → ')
-    text = re.sub(r'0x[0-9a-fA-F]+', lambda m: str(int(m.group(0), 16)), text)
+    # Normalize URL encoding (e.g. %27 → ') and hex literals (e.g. 0x27 → 39)
+    text = decode_escapes(text)
 
     # Collapse multiple spaces/newlines
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = WHITESPACE.sub(' ', text).strip()
 
     return text
 
 
-def load_dataset(filepath: str) -> pd.DataFrame:
+def clean_texts(texts) -> list:
     """
-    Load a CSV dataset with 'query' and 'label' columns.
-    label: 1 = malicious, 0 = safe
+    clean_text for a list (or any iterable) of inputs, same output.
+
+    Most inputs contain neither '%' nor '0x', so the decoders only run on
+    those that do (rules.decode_escapes); whitespace is collapsed with
+    split/join (the same notion of whitespace as \\s and strip) instead of a regex.
     """
-    df = pd.read_csv(filepath)
+    out = []
+    append = out.append
+    for text in texts:
+        if not isinstance(text, str):
+            text = str(text)
+        append(' '.join(decode_escapes(text.lower()).split()))
+    return out
+
 
+def clean_series(texts: "pd.Series") -> "pd.Series":
+    """
+    clean_text for a whole pandas Series (index and name kept), same output.
+    Goes through clean_texts: on object/string columns pandas' .str methods
+    loop in Python too, and chaining five of them is slower than one pass.
+    """
+    import pandas as pd
+
+    return pd.Series(clean_texts(texts.tolist()), index=texts.index, name=texts.name, dtype=object)
+
+
+def _normalize_dataset(df: "pd.DataFrame") -> "pd.DataFrame":
+    """Lowercase column names, check for query/label, clean the text and coerce labels."""
     # Normalize column names
     df.columns = [c.strip().lower() for c in df.columns]
 
     if 'query' not in df.columns or 'label' not in df.columns:
         raise ValueError("Dataset must have 'query' and 'label' columns")
 
-    df['query'] = df['query'].apply(clean_text)
+    df['query'] = clean_series(df['query'])
     df = df.dropna(subset=['query', 'label'])
     df['label'] = df['label'].astype(int)
 
     return df
 
 
+def load_dataset(filepath: str) -> "pd.DataFrame":
+    """
+    Load a CSV dataset with 'query' and 'label' columns.
+    label: 1 = malicious, 0 = safe
+    """
+    import pandas as pd  # imported here so inference (clean_text) doesn't pay for pandas
+
+    return _normalize_dataset(pd.read_csv(filepath))
+
+
+def iter_dataset(filepath: str, chunksize: int = 50_000):
+    """
+    Stream a CSV dataset as cleaned DataFrame chunks of up to ``chunksize`` rows.
+    Same columns and cleaning as load_dataset, without holding the whole file in memory.
+    """
+    import pandas as pd
+
+    with pd.read_csv(filepath, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield _normalize_dataset(chunk)
+
+
+def count_labels(filepath: str, chunksize: int = 50_000) -> dict:
+    """Rows per label ({0: n, 1: m}), reading only the label column in chunks."""
+    import pandas as pd
+
+    counts = {}
+    with pd.read_csv(filepath, usecols=lambda c: c.strip().lower() == 'label', chunksize=chunksize) as reader:
+        for chunk in reader:
+            if chunk.shape[1] != 1:
+                raise ValueError("Dataset must have 'query' and 'label' columns")
+            for label, n in chunk.iloc[:, 0].dropna().astype(int).value_counts().items():
+                counts[int(label)] = counts.get(int(label), 0) + int(n)
+    return counts
+
+
 if __name__ == "__main__":
     # Quick test
     samples = [
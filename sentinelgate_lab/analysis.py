@@ -0,0 +1,72 @@
+"""
+Per-request analysis context: the views of one input that every check reads, built once.
+
+A chat message goes through the SQL and prompt injection rules, the quote
+heuristic, the lookup keyword checks and, in 'ml' mode, the classifier, and
+each of them used to lowercase and strip it again. An ``AnalysisContext``
+builds each view at most once, on first use, and keeps every verdict computed
+from it for the rest of the request:
+
+  text      the input as received (case-sensitive checks, e.g. KNOWN_USERS)
+  lower     lowercased and stripped: the rules, keyword checks and cache keys
+  decoded   ``lower`` with URL escapes (%27) and hex literals (0x27) decoded, as the
+            classifier's preprocessing does; ``lower`` itself when there is nothing to decode
+  cleaned   ``decoded`` with whitespace collapsed, i.e. ``ml.preprocess.clean_text(text)``
+
+A context belongs to one request (or one call). It takes no locks: use it from
+one thread at a time.
+"""
+from .rules import decode_escapes
+
+
+class AnalysisContext:
+    """Lazily built views of one input, plus the verdicts memoized on it."""
+
+    __slots__ = ('text', '_lower', '_decoded', '_cleaned', '_verdicts')
+
+    def __init__(self, text: str):
+        self.text = text
+        self._lower = None
+        self._decoded = None
+        self._cleaned = None
+        self._verdicts = {}
+
+    @property
+    def lower(self) -> str:
+        if self._lower is None:
+            self._lower = self.text.lower().strip()
+        return self._lower
+
+    @property
+    def decoded(self) -> str:
+        if self._decoded is None:
+            lower = self.lower
+            self._decoded = decode_escapes(lower) if '%' in lower or '0x' in lower else lower
+        return self._decoded
+
+    @property
+    def encoded(self) -> bool:
+        """True if decoding changed the input, i.e. the decoded view is worth its own scan."""
+        return self.decoded != self._lower
+
+    @property
+    def cleaned(self) -> str:
+        if self._cleaned is None:
+            self._cleaned = ' '.join(self.decoded.split())
+        return self._cleaned
+
+    def verdict(self, name: str, compute):
+        """``compute(self)``, run once per context for each ``name``."""
+        verdicts = self._verdicts
+        if name in verdicts:
+            return verdicts[name]
+        value = verdicts[name] = compute(self)
+        return value
+
+    def contains_any(self, words) -> bool:
+        """True if any of ``words`` (lowercase) occurs in the lowered input."""
+        lower = self.lower
+        for word in words:
+            if word in lower:
+                return True
+        return False
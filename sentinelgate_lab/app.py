@@ -1,11 +1,25 @@
+import hmac
+import io
 import os
-import re
 import sqlite3
 from datetime import timedelta
 from functools import wraps
-from time import time
+from time import perf_counter
 
-from flask import Flask, jsonify, render_template, request, Response, send_from_directory  # pyright: ignore[reportMissingImports]
+from flask import Flask, g, jsonify, render_template, request, Response, send_from_directory  # pyright: ignore[reportMissingImports]
+
+from .analysis import AnalysisContext
+from .assets import RenderedScript
+from .cache import VerdictCache
+from .db import ConnectionPool, ReadinessLatch
+from .detection import ScanBudget, ScanBudgetExceeded, flatten_strings
+from .inspection import JSONBodyInspector
+from .metrics import Metrics, current_timing, finish_request, stage, start_request
+from .profiling import RuleProfiler, SORT_KEYS, write_csv
+from .ml_stage import MLStage
+from .ratelimit import make_backend
+from .rulepacks import RulePackManager
+from .rules import QUOTE_RULE_ID, SCAN_BUDGET_RULE_ID, decode_escapes
 
 _basedir = os.path.dirname(os.path.abspath(__file__))
 _proj_root = os.path.dirname(_basedir)
@@ -28,11 +42,13 @@ app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=30)
 # Locally use absolute path to avoid CWD-dependent behavior
 _db_path = os.path.join('/tmp', 'users.db') if os.environ.get('VERCEL') else os.path.join(_basedir, 'users.db')
 
+# One persistent WAL-mode connection per worker thread (set SENTINELGATE_DB_POOL=0 to
+# open a fresh connection per call instead)
+DB_POOL = ConnectionPool(_db_path, enabled=os.environ.get('SENTINELGATE_DB_POOL', '1') != '0')
+
 # Database initialization
 def get_db_connection():
-    conn = sqlite3.connect(_db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return DB_POOL.connection()
 
 # Lookup column per table for query endpoints (keys are lowercase)
 TABLE_LOOKUP_COLUMN = {
@@ -53,8 +69,8 @@ def normalize_table_name(table: str) -> str:
     t = table.lower()
     return t if t in QUERYABLE_TABLES else 'secrets'
 
-def ensure_db_ready():
-    """Ensure all tables have data (handles Vercel cold starts where /tmp is empty)."""
+def _check_db_ready():
+    """Make sure all tables have data (handles Vercel cold starts where /tmp is empty)."""
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -64,12 +80,29 @@ def ensure_db_ready():
     except sqlite3.OperationalError as e:
         # likely the database or table doesn't exist; recreate
         app.logger.warning(f"DB not ready ({e}); reinitializing")
+        DB_POOL.reset()
         init_db()
     except Exception as e:
         # propagate unexpected errors so they can be noticed
         app.logger.error(f"Unexpected error checking DB readiness: {e}")
         raise
 
+# Readiness is verified once per process and DB file (inode/mtime), not per request
+DB_READY = ReadinessLatch(_db_path, _check_db_ready, DB_POOL)
+
+def ensure_db_ready():
+    """Ensure all tables have data; cheap (a stat call) once the DB has been verified."""
+    DB_READY.ensure()
+
+def note_db_error(e):
+    """Re-check readiness on the next request if a query failed because the DB/tables are gone."""
+    if not isinstance(e, sqlite3.OperationalError):
+        return
+    msg = str(e)
+    missing = msg.startswith('no such table: ') and msg.split(': ', 1)[1].strip().lower() in QUERYABLE_TABLES
+    if missing or 'unable to open database' in msg:
+        DB_READY.invalidate()
+
 
 def init_db():
     with get_db_connection() as conn:
@@ -177,49 +210,92 @@ def not_found_error(error):
 def internal_error(error):
     return jsonify({"status": "error", "message": "Internal server error"}), 500
 
-# simple in-memory rate limiter (not suitable for multi-process deployments)
-RATE_LIMIT = 100          # max requests
+# Rate limiting: per-IP sliding window. The default 'memory' backend is per process;
+# set RATE_LIMIT_BACKEND=sqlite to share one budget per IP across all worker processes
+# on the node (state in RATE_LIMIT_DB, next to the demo database by default).
+RATE_LIMIT = int(os.environ.get('RATE_LIMIT', '100'))   # max requests
 RATE_WINDOW = 60          # seconds
-_request_counts: dict[str, list[float]] = {}
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+_rate_limit_db = os.environ.get('RATE_LIMIT_DB') or os.path.join(os.path.dirname(_db_path), 'ratelimit.db')
+RATE_LIMITER = make_backend(RATE_LIMIT_BACKEND, RATE_LIMIT, RATE_WINDOW, path=_rate_limit_db)
 
 def limit_requests(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         ip = request.remote_addr or 'unknown'
-        now = time()
-        counts = _request_counts.setdefault(ip, [])
-        # prune old timestamps
-        counts[:] = [t for t in counts if now - t < RATE_WINDOW]
-        if len(counts) >= RATE_LIMIT:
+        if not RATE_LIMITER.hit(ip):
             return jsonify({"status": "error", "message": "Too many requests"}), 429
-        counts.append(now)
         return f(*args, **kwargs)
     return decorated_function
 
+# Per-request stage timings: histograms per endpoint and stage at /metrics (Prometheus format),
+# off with SENTINELGATE_METRICS=0. SENTINELGATE_SERVER_TIMING=1 also writes them to a
+# Server-Timing header on each response; it is opt-in, as formatting it costs about as much as
+# recording the metrics and it lets clients time SQLite lookups.
+METRICS_ENABLED = os.environ.get('SENTINELGATE_METRICS', '1') != '0'
+SERVER_TIMING = METRICS_ENABLED and os.environ.get('SENTINELGATE_SERVER_TIMING', '0') == '1'
+METRICS = Metrics()
+# Endpoints that refuse a request when detection flags it (counted as blocked)
+BLOCKING_ENDPOINTS = ('chat_secured', 'query_secure')
+
+@app.before_request
+def start_timing():
+    if METRICS_ENABLED:
+        start_request(request.endpoint or 'unmatched')
+
+@app.after_request
+def record_timing(response):
+    server_timing = finish_timing(response.status_code)
+    if server_timing is not None:
+        response.headers.add('Server-Timing', server_timing)
+    return response
+
+def finish_timing(status):
+    """Record the current request in METRICS; its Server-Timing header value if that is on, else None.
+    Shared with the async handlers in asgi.py, which don't go through the Flask hooks."""
+    timing = finish_request()
+    if timing is None:
+        return None
+    total = timing.elapsed()
+    METRICS.record(timing, status, total)
+    return timing.server_timing(total) if SERVER_TIMING else None
+
 # Routes
 @app.route('/version')
 def version():
     return jsonify({"version": "v2-no-navbar-buttons", "template": "index.html"})
 
 
+# cipher-shield.js is read once and rendered per deployed base URL. The base comes from the Host
+# header, so only the bases in SHIELD_SCRIPT_HOSTS (comma-separated, e.g. https://shield.example.com)
+# are pre-rendered with best-level gzip/brotli; any other is kept in a bounded LRU and compressed
+# lazily at a fast level, in the coding its client accepts
+SHIELD_SCRIPT = RenderedScript(
+    os.path.join(app.static_folder or os.path.join(_basedir, 'static'), 'cipher-shield.js'),
+    'https://your-domain.com',
+    max_variants=int(os.environ.get('SHIELD_SCRIPT_VARIANTS', '64')),
+    pinned=[h.strip().rstrip('/') for h in os.environ.get('SHIELD_SCRIPT_HOSTS', '').split(',') if h.strip()],
+)
+
+
 @app.route('/cipher-shield.js')
 def serve_sentinel_script():
     """Serve the embeddable SQL injection shield script with correct origin in header comment."""
-    static_dir = app.static_folder or os.path.join(_basedir, 'static')
-    path = os.path.join(static_dir, 'cipher-shield.js')
-    with open(path, 'r', encoding='utf-8') as f:
-        content = f.read()
     # Inject actual deployed URL into header comment (so viewing the .js file shows correct embed code)
     base = request.url_root.rstrip('/')
     if request.headers.get('X-Forwarded-Proto') == 'https':
         base = base.replace('http://', 'https://', 1)
-    content = content.replace(
-        'https://your-domain.com',
-        base,
-        1
-    )
-    resp = Response(content, mimetype='application/javascript')
+    rendering = SHIELD_SCRIPT.render(base)
+    coding = rendering.select(request.accept_encodings)
+    if rendering.matches(request.if_none_match):
+        resp = Response(status=304)
+    else:
+        resp = Response(rendering.body(coding), mimetype='application/javascript')
+        if coding != 'identity':
+            resp.headers['Content-Encoding'] = coding
+    resp.set_etag(rendering.etags[coding])
     resp.headers['Cache-Control'] = 'public, max-age=3600'
+    resp.headers['Vary'] = 'Accept-Encoding'
     resp.headers['X-Content-Type-Options'] = 'nosniff'
     return resp
 
@@ -262,9 +338,21 @@ def query_vulnerable():
             "message": "Request must be JSON"
         }), 400
 
-    ensure_db_ready()
-    user_input = request.json.get('chat_input', '')
-    table = request.json.get('table', 'secrets')
+    with stage('db_ready'):
+        ensure_db_ready()
+    with stage('json'):
+        doc = request.json
+    user_input = doc.get('chat_input', '')
+    if DETECTION_MODES['query_vulnerable'] != 'off':
+        # Reported in the X-Detection header only; this endpoint stays vulnerable on purpose
+        detect(user_input, DETECTION_MODES['query_vulnerable'])
+    with stage('sqlite'):
+        payload, status = query_vulnerable_lookup(user_input, doc.get('table', 'secrets'))
+    with stage('response'):
+        return jsonify(payload), status
+
+def query_vulnerable_lookup(user_input, table):
+    """Run the vulnerable lookup for /query/vulnerable; returns (payload, status)."""
     if table not in QUERYABLE_TABLES:
         table = 'secrets'
     col = TABLE_LOOKUP_COLUMN.get(table, 'name')
@@ -276,18 +364,19 @@ def query_vulnerable():
             # DANGER: This is vulnerable to SQL injection!
             cursor.execute(query)
             result = [dict(row) for row in cursor.fetchall()]
-            return jsonify({
+            return {
                 "status": "success",
                 "data": result,
                 "query_executed": query  # Show the actual query for educational purposes
-            })
+            }, 200
     except Exception as e:
+        note_db_error(e)
         app.logger.error(f"Error in vulnerable endpoint: {str(e)}")
-        return jsonify({
+        return {
             "status": "error",
             "message": "An error occurred while processing your request",
             "query_executed": query
-        }), 400
+        }, 400
 
 @app.route('/query/secure', methods=['POST'])
 @limit_requests
@@ -298,10 +387,30 @@ def query_secure():
             "message": "Request must be JSON"
         }), 400
 
-    ensure_db_ready()
-    user_input = request.json.get('chat_input', '')
-    test_case = request.json.get('test_case', '')
-    table = normalize_table_name(request.json.get('table', 'secrets'))
+    with stage('db_ready'):
+        ensure_db_ready()
+    with stage('json'):
+        doc = request.json
+    user_input = doc.get('chat_input', '')
+    test_case = doc.get('test_case', '')
+    if DETECTION_MODES['query_secure'] != 'off' and detect(user_input, DETECTION_MODES['query_secure'])["injection"]:
+        with stage('response'):
+            return jsonify(QUERY_SECURE_BLOCKED)
+    with stage('sqlite'):
+        payload, status = query_secure_lookup(user_input, doc.get('table', 'secrets'), test_case)
+    with stage('response'):
+        return jsonify(payload), status
+
+QUERY_SECURE_BLOCKED = {
+    "status": "success",
+    "data": [],
+    "message": "Cannot disclose such information. Suspected SQL injection attempt blocked.",
+    "user_found": False
+}
+
+def query_secure_lookup(user_input, table, test_case=''):
+    """Run the parameterized lookup for /query/secure; returns (payload, status)."""
+    table = normalize_table_name(table)
     col = TABLE_LOOKUP_COLUMN.get(table, 'name')
     try:
         with get_db_connection() as conn:
@@ -320,11 +429,11 @@ def query_secure():
                 }
                 msg = messages_found.get(test_case, "Query executed using parameterized statements")
                 redacted = [{**r, "data": "[REDACTED]" if r.get("data") else r.get("data")} for r in result]
-                return jsonify({
+                return {
                     "status": "success",
                     "data": redacted,
                     "message": msg
-                })
+                }, 200
             messages_empty = {
                 'valid': "Valid user lookup. No data returned.",
                 'injection': "Cannot disclose such information. Suspected SQL injection attempt blocked.",
@@ -333,209 +442,550 @@ def query_secure():
                 'always_true': "Cannot disclose such information. Invalid input pattern detected and blocked.",
             }
             msg = messages_empty.get(test_case, "Cannot disclose such information.")
-            return jsonify({
+            return {
                 "status": "success",
                 "data": [],
                 "message": msg,
                 "user_found": False
-            })
+            }, 200
     except Exception as e:
+        note_db_error(e)
         app.logger.error(f"Error in secure endpoint: {e}")
-        return jsonify({
+        return {
             "status": "error",
             "message": "An error occurred while processing your request"
-        }), 400
+        }, 400
+
+# Detection rules: the built-in set from rules.py, or a versioned rule pack file
+# (SENTINELGATE_RULE_PACK, JSON or TOML) that each worker re-reads in the background when it
+# changes (checked every SENTINELGATE_RULE_PACK_POLL seconds; 0 = only via /admin/rules/reload)
+RULE_PACK_PATH = os.environ.get('SENTINELGATE_RULE_PACK') or None
+RULE_PACKS = RulePackManager(RULE_PACK_PATH, poll_interval=float(os.environ.get('SENTINELGATE_RULE_PACK_POLL', '5')))
+
+# Per-rule hit/cost profiling, switched on and off at runtime via /admin/rules/profile. Off by
+# default, and then the detectors run unchanged; while on it follows hot-reloaded packs.
+RULE_PROFILER = RuleProfiler()
+
+@app.before_request
+def poll_rule_pack():
+    RULE_PACKS.maybe_reload()
+    if RULE_PROFILER.enabled:
+        RULE_PROFILER.follow(RULE_PACKS.active)
 
-# Chatbot security helpers - 100+ SQL injection patterns (production hardened)
-SQL_INJECTION_PATTERNS = [
-    r"('\s*OR\s*'1'\s*=\s*'1|OR\s+1\s*=\s*1)",
-    r"(DROP\s+TABLE|DELETE\s+FROM|INSERT\s+INTO)",
-    r"(UNION\s+SELECT|SELECT\s+\*)",
-    r"(;\s*--|--\s*$)",
-    r"('\s*OR\s*'1'|'\s*OR\s*1)",
-    r"(admin'\s*OR|'\s*;\s*DROP)",
-    r"\bOR\s+['\"]?\d+['\"]?\s*=\s*['\"]?\d+['\"]?",
-    r"\bOR\s+['\"]?1['\"]?\s*=\s*['\"]?1['\"]?\s*--",
-    r"\bAND\s+['\"]?\d+['\"]?\s*=\s*['\"]?\d+['\"]?",
-    r"\bUNION\s+(ALL\s+)?SELECT\b",
-    r"\bUNION\s+(ALL\s+)?SELECT\s+.*\s+FROM\b",
-    r";\s*--\s*$",
-    r"'\s*;\s*--",
-    r'"\s*;\s*--',
-    r"\bDROP\s+(TABLE|DATABASE|SCHEMA)\b",
-    r"\bALTER\s+TABLE\b",
-    r"\bTRUNCATE\b",
-    r";\s*DROP\b",
-    r";\s*INSERT\b",
-    r";\s*UPDATE\b",
-    r"'\s*OR\s+",
-    r'"\s*OR\s+',
-    r"'\s*AND\s+",
-    r'"\s*AND\s+',
-    r"\bSLEEP\s*\(",
-    r"\bBENCHMARK\s*\(",
-    r"\bWAITFOR\s+DELAY\b",
-    r"\bPG_SLEEP\s*\(",
-    r"\bINFORMATION_SCHEMA\b",
-    r"\bFROM\s+information_schema\b",
-    r"\b0x[0-9a-fA-F]+.*\b(SELECT|UNION|OR)\b",
-    r"\bVERSION\s*\(",
-    r"\b@@VERSION\b",
-    r"\bEXEC\s*\(",
-    r"\bXP_CMDSHELL\b",
-    r"\bOPENROWSET\b",
-    r"\bLOAD_FILE\b",
-    r"\bINTO\s+OUTFILE\b",
-    r"\bINTO\s+DUMPFILE\b",
-    r"\bGROUP_CONCAT\s*\(",
-    r"\bSELECT\s+\*\s+FROM\b",
-    r"\bINSERT\s+INTO\s+.*\s+VALUES\s*\(",
-    r"\bUPDATE\s+\w+\s+SET\s+",
-    r"\bGRANT\s+",
-    r"\bCREATE\s+TABLE\b",
-    r"\bCREATE\s+DATABASE\b",
-    r"\bORDER\s+BY\s+\d+",
-    r"\bHAVING\s+1\s*=\s*1\b",
-    r"\bWHERE\s+1\s*=\s*1\b",
-    r"1'\s+OR\s+'1'\s*=\s*'1",
-    r"1\s+OR\s+1\s*=\s*1",
-    r"\bOR\s+EXISTS\s*\(",
-    r"\bAND\s+EXISTS\s*\(",
-    r"\bCHAR\s*\(",
-    r"\bCONCAT\s*\(",
-    r"\bCONVERT\s*\(",
-    r"\bUSER\s*\(",
-    r"\bDATABASE\s*\(",
-    r"\bCURRENT_USER\b",
-    r"\bSYSTEM_USER\b",
-    r"\bEXECUTE\s*\(",
-    r"\bOPENQUERY\b",
-    r"\bBULK\s+INSERT\b",
-    r"\bPG_READ_FILE\b",
-    r"\bUTL_FILE\b",
-    r"\bUTL_HTTP\b",
-    r"\bDBMS_PIPE\.RECEIVE_MESSAGE\s*\(",
-    r"\bDROP\s+USER\b",
-    r"\bDROP\s+INDEX\b",
-    r"\bDROP\s+VIEW\b",
-    r"\bTRUNCATE\s+TABLE\b",
-    r"\bREVOKE\s+",
-    r"\bSHUTDOWN\b",
-    r"\bSHOW\s+TABLES\b",
-    r"\bSHOW\s+DATABASES\b",
-    r"\bSELECT\s*\(.*SELECT\b",
-    r"'\)\s*OR\s+",
-    r'"\)\s*OR\s+',
-    r"%00.*(SELECT|UNION|DROP)",
-    r"\\x00.*(SELECT|UNION)",
-    r"admin'\s*--",
-    r"admin\"\s*--",
-    r"'\)\s*OR\s+\('1'\s*=\s*'1",
-    r'"\)\s*OR\s+\("1"\s*=\s*"1',
-    r"\bOR\s+LIKE\s+'%",
-    r"\bAND\s+LIKE\s+'%",
-    r"\|\|\s*['\"]?\d+['\"]?\s*=\s*['\"]?\d+['\"]?",
-    r"/\*.*\*\/.*(SELECT|UNION|DROP|DELETE)",
-    r"'\s*\+\s*'",
-    r'"\s*\+\s*"',
-    r";\s*#\s*$",
-    r"'\s*\)\s*--",
-]
-
-PROMPT_INJECTION_PATTERNS = [
-    r"ignore\s+(all\s+)?(previous|prior)\s+instructions",
-    r"disregard\s+(your\s+)?(instructions|rules)",
-    r"reveal\s+(your\s+)?(system\s+)?(prompt|instructions)",
-    r"show\s+(me\s+)?(your\s+)?(system\s+)?(prompt|instructions)",
-    r"what\s+are\s+your\s+(system\s+)?(instructions|rules)",
-    r"you\s+are\s+now\s+(a|in)\s+",
-    r"pretend\s+(you\s+are|to\s+be)",
-    r"act\s+as\s+if\s+you",
-]
-
-def is_sql_injection(text):
-    text_lower = text.lower().strip()
-    for pattern in SQL_INJECTION_PATTERNS:
-        if re.search(pattern, text_lower, re.IGNORECASE):
-            return True
+# Scan budget for every detector run on a request: inputs longer than SENTINELGATE_SCAN_MAX_CHARS,
+# or still being matched after SENTINELGATE_SCAN_BUDGET_MS (per scan: the decoded view of an input
+# is a scan of its own), count as injections (fail closed) and are not cached. Rules that would
+# backtrack run in linear time anyway; 0 disables a limit.
+SCAN_MAX_CHARS = int(os.environ.get('SENTINELGATE_SCAN_MAX_CHARS', str(64 * 1024)))
+SCAN_BUDGET_MS = float(os.environ.get('SENTINELGATE_SCAN_BUDGET_MS', '50'))
+SCAN_BUDGET = ScanBudget(SCAN_MAX_CHARS or None, SCAN_BUDGET_MS or None)
+SCAN_OVER_BUDGET = {'length': 0, 'time': 0}
+
+# Verdict cache for repeated inputs, keyed on the normalized (lowercased, stripped) text
+VERDICT_CACHE_SIZE = 4096                 # max entries
+VERDICT_CACHE_MAX_BYTES = 4 * 1024 * 1024
+VERDICT_CACHE_TTL = None                  # seconds; None = no expiry
+VERDICT_CACHE = VerdictCache(VERDICT_CACHE_SIZE, VERDICT_CACHE_MAX_BYTES, VERDICT_CACHE_TTL)
+
+# Optional ML stage, consulted only for inputs the regexes leave undecided. Uses the compact
+# NumPy export (ml/models/classifier.npz) when present, else the sklearn pickle.
+_ml_models_dir = os.path.join(_proj_root, 'ml', 'models')
+ML_MODEL_PATH = os.environ.get('SENTINELGATE_ML_MODEL') or next(
+    (p for p in (os.path.join(_ml_models_dir, 'classifier.npz'), os.path.join(_ml_models_dir, 'classifier.pkl'))
+     if os.path.exists(p)),
+    os.path.join(_ml_models_dir, 'classifier.pkl'))
+ML_STAGE = MLStage(
+    ML_MODEL_PATH,
+    threshold=float(os.environ.get('SENTINELGATE_ML_THRESHOLD', '0.5')),
+    budget_ms=float(os.environ.get('SENTINELGATE_ML_BUDGET_MS', '25')),
+)
+
+# Detection mode per endpoint: 'off', 'regex' (default for the chatbots) or 'ml' (regex, then
+# the classifier for inputs no rule matched). SENTINELGATE_DETECTION_MODE sets the chatbot
+# default; SENTINELGATE_DETECTION_MODE_<ENDPOINT> (e.g. ..._CHAT_SECURED) overrides one endpoint.
+DETECTION_MODE_CHOICES = ('off', 'regex', 'ml')
+_default_mode = os.environ.get('SENTINELGATE_DETECTION_MODE', 'regex')
+DETECTION_MODES = {
+    endpoint: os.environ.get(f'SENTINELGATE_DETECTION_MODE_{endpoint.upper()}', default)
+    for endpoint, default in (
+        ('chat_secured', _default_mode),
+        ('chat_unsecured', _default_mode),
+        ('query_secure', 'off'),
+        ('query_vulnerable', 'off'),
+    )
+}
+for _endpoint, _mode in DETECTION_MODES.items():
+    if _mode not in DETECTION_MODE_CHOICES:
+        raise ValueError(f"Unknown detection mode {_mode!r} for {_endpoint}; expected one of {DETECTION_MODE_CHOICES}")
+
+# Warm load at import: once per worker, or once in the master with gunicorn --preload
+if 'ml' in DETECTION_MODES.values():
+    ML_STAGE.load()
+
+def _rules_generation(pack):
+    return (pack.fingerprint, ML_STAGE.fingerprint)
+
+def _quote_injection(text, text_lower):
     # Check for quote-based injection
-    if "'" in text or '"' in text and any(kw in text_lower for kw in ['or', 'and', 'select', 'union', 'drop']):
+    return "'" in text or '"' in text and any(kw in text_lower for kw in ['or', 'and', 'select', 'union', 'drop'])
+
+def _detect_sql_injection(text, text_lower, pack=None):
+    if (pack or RULE_PACKS.active).sql.is_match(text_lower, SCAN_BUDGET):
         return True
-    return False
+    return _quote_injection(text, text_lower)
+
+def _over_budget(reason):
+    SCAN_OVER_BUDGET[reason] += 1
+    return True
+
+def is_sql_injection(text, context=None):
+    """True if the SQL injection rules or the quote heuristic flag ``text``, as typed or once
+    URL escapes and hex literals are decoded. ``context`` (an AnalysisContext for ``text``)
+    shares the normalized views, and this verdict, with the request's other checks."""
+    return (context or AnalysisContext(text)).verdict('sql', _sql_verdict)
+
+def _sql_verdict(ctx):
+    try:
+        # Before lowercasing or hashing a huge input for the cache
+        SCAN_BUDGET.check_length(ctx.text)
+    except ScanBudgetExceeded as e:
+        return _over_budget(e.reason)
+    text_lower = ctx.lower
+    key = ('sql', text_lower)
+    pack = RULE_PACKS.active
+    generation = _rules_generation(pack)
+    verdict = VERDICT_CACHE.get(key, generation)
+    if verdict is None:
+        try:
+            verdict = _detect_sql_injection(ctx.text, text_lower, pack) or \
+                (ctx.encoded and _detect_sql_injection(ctx.decoded, ctx.decoded, pack))
+        except ScanBudgetExceeded as e:
+            return _over_budget(e.reason)
+        VERDICT_CACHE.put(key, verdict, generation)
+    return verdict
+
+def is_prompt_injection(text, context=None):
+    """True if the prompt injection rules flag ``text``, as typed or decoded; ``context`` as for is_sql_injection."""
+    return (context or AnalysisContext(text)).verdict('prompt', _prompt_verdict)
+
+def _prompt_verdict(ctx):
+    try:
+        SCAN_BUDGET.check_length(ctx.text)
+    except ScanBudgetExceeded as e:
+        return _over_budget(e.reason)
+    text_lower = ctx.lower
+    key = ('prompt', text_lower)
+    pack = RULE_PACKS.active
+    generation = _rules_generation(pack)
+    verdict = VERDICT_CACHE.get(key, generation)
+    if verdict is None:
+        try:
+            verdict = pack.prompt.is_match(text_lower, SCAN_BUDGET) or \
+                (ctx.encoded and pack.prompt.is_match(ctx.decoded, SCAN_BUDGET))
+        except ScanBudgetExceeded as e:
+            return _over_budget(e.reason)
+        VERDICT_CACHE.put(key, verdict, generation)
+    return verdict
+
+def ml_score(text, spent_ms=0.0, context=None):
+    """Classifier probability for ``text`` (cached like the regex verdicts), or None if not scored."""
+    ctx = context or AnalysisContext(text)
+    return ctx.verdict('ml', lambda c: _ml_score(c, spent_ms))
+
+def _ml_score(ctx, spent_ms):
+    key = ('ml', ctx.lower)
+    generation = _rules_generation(RULE_PACKS.active)
+    score = VERDICT_CACHE.get(key, generation)
+    if score is None:
+        score = ML_STAGE.score(ctx.text, spent_ms, cleaned=ctx.cleaned)
+        if score is not None:
+            VERDICT_CACHE.put(key, score, generation)
+    return score
+
+def detect(text, mode, prompt=True, context=None):
+    """``run_detection``, with the result also kept on ``g.detection`` for the X-Detection response header
+    and its stage timings added to the request's metrics."""
+    result = run_detection(text, mode, prompt, context)
+    g.detection = result
+    time_detection(result)
+    return result
+
+def time_detection(result):
+    """Add a ``run_detection`` result's stage timings, and whether it refuses the request, to the current request's metrics."""
+    timing = current_timing()
+    if timing is not None:
+        for name, ms in result["timings_ms"].items():
+            if name != 'total':
+                timing.add(name, ms / 1000)
+        timing.blocked = result["injection"] and timing.endpoint in BLOCKING_ENDPOINTS
+
+def run_detection(text, mode, prompt=True, context=None):
+    """Run the detection stages for ``mode`` on ``text``; needs no request context.
+
+    The regex stage decides first (SQL, then prompt injection unless ``prompt``
+    is False); in 'ml' mode the classifier scores inputs it left undecided.
+    All stages read one AnalysisContext (``context``, or a new one for ``text``).
+    The result carries per-stage timings.
+    """
+    result = {"mode": mode, "sql_injection": False, "prompt_injection": False,
+              "ml_flagged": False, "ml_score": None, "decided_by": None, "timings_ms": {}}
+    timings = result["timings_ms"]
+    start = perf_counter()
+    if mode != 'off':
+        ctx = context or AnalysisContext(text)
+        result["sql_injection"] = is_sql_injection(text, ctx)
+        if prompt and not result["sql_injection"]:
+            result["prompt_injection"] = is_prompt_injection(text, ctx)
+        timings["regex"] = (perf_counter() - start) * 1000
+        if result["sql_injection"] or result["prompt_injection"]:
+            result["decided_by"] = 'regex'
+        elif mode == 'ml':
+            ml_start = perf_counter()
+            score = ml_score(text, spent_ms=timings["regex"], context=ctx)
+            timings["ml"] = (perf_counter() - ml_start) * 1000
+            if score is None:
+                result["decided_by"] = 'regex'   # model unavailable or over budget: keep the regex verdict
+            else:
+                result["ml_score"] = round(score, 4)
+                result["ml_flagged"] = score >= ML_STAGE.threshold
+                result["decided_by"] = 'ml'
+        else:
+            result["decided_by"] = 'regex'
+    timings["total"] = (perf_counter() - start) * 1000
+    result["injection"] = result["sql_injection"] or result["prompt_injection"] or result["ml_flagged"]
+    return result
+
+@app.after_request
+def add_detection_header(response):
+    """Per-request detection breakdown, e.g. ``X-Detection: mode=ml; decided_by=ml; injection=false; regex=0.041ms; ml=1.203ms; total=1.262ms``."""
+    det = g.get('detection')
+    if det is not None:
+        response.headers['X-Detection'] = detection_header(det)
+    return response
+
+def detection_header(det):
+    parts = [f"mode={det['mode']}", f"decided_by={det['decided_by'] or 'none'}",
+             f"injection={'true' if det['injection'] else 'false'}"]
+    parts += [f"{stage}={ms:.3f}ms" for stage, ms in det["timings_ms"].items()]
+    return '; '.join(parts)
+
+def scan_batch(texts):
+    """Verdicts and matched rule IDs for many strings, with the same verdicts as
+    is_sql_injection / is_prompt_injection but one batched pass per detector
+    (and one more over the decoded views of the items that had escapes)."""
+    lowered = [t.lower().strip() for t in texts]
+    pack = RULE_PACKS.active
+    sql_hits = pack.sql.scan_many(lowered, SCAN_BUDGET)
+    prompt_hits = pack.prompt.scan_many(lowered, SCAN_BUDGET)
+    decoded = {}
+    for i, text_lower in enumerate(lowered):
+        text_decoded = decode_escapes(text_lower)
+        if text_decoded != text_lower:
+            decoded[i] = text_decoded
+    if decoded:
+        views = list(decoded.values())
+        for i, sql_ids, prompt_ids in zip(decoded, pack.sql.scan_many(views, SCAN_BUDGET),
+                                          pack.prompt.scan_many(views, SCAN_BUDGET)):
+            sql_hits[i] = _merge_ids(sql_hits[i], sql_ids)
+            prompt_hits[i] = _merge_ids(prompt_hits[i], prompt_ids)
+    results = []
+    for i, (text, text_lower, sql_ids, prompt_ids) in enumerate(zip(texts, lowered, sql_hits, prompt_hits)):
+        if sql_ids is None or prompt_ids is None:
+            # Over the scan budget: fail closed
+            _over_budget('length' if SCAN_MAX_CHARS and len(text_lower) > SCAN_MAX_CHARS else 'time')
+            results.append({"sql_injection": True, "prompt_injection": False, "matched": [SCAN_BUDGET_RULE_ID]})
+            continue
+        if not sql_ids and (_quote_injection(text, text_lower) or
+                            (i in decoded and _quote_injection(decoded[i], decoded[i]))):
+            sql_ids = (QUOTE_RULE_ID,)
+        results.append({
+            "sql_injection": bool(sql_ids),
+            "prompt_injection": bool(prompt_ids),
+            "matched": list(sql_ids + prompt_ids),
+        })
+    return results
+
+def _merge_ids(ids, more):
+    """Rule IDs matched by an input or its decoded view (None, over budget, wins)."""
+    if ids is None or more is None:
+        return None
+    return ids + tuple(rule_id for rule_id in more if rule_id not in ids)
+
+# /scan/batch counts as one request for the rate limiter, so the batch itself is capped
+SCAN_BATCH_MAX_ITEMS = 10_000
+SCAN_BATCH_MAX_BYTES = 4 * 1024 * 1024
+
+@app.route('/scan/batch', methods=['POST'])
+@limit_requests
+def scan_batch_endpoint():
+    """Classify many strings per request: a JSON array of strings, or any JSON document
+    (every string value in it is scanned, the way cipher-shield.js walks fetch bodies)."""
+    if request.content_length is not None and request.content_length > SCAN_BATCH_MAX_BYTES:
+        return jsonify({"status": "error", "message": f"Batch body larger than {SCAN_BATCH_MAX_BYTES} bytes"}), 413
+    if not request.is_json:
+        return jsonify({"status": "error", "message": "Request must be JSON"}), 400
+    doc = request.get_json(silent=True)
+    if doc is None:
+        return jsonify({"status": "error", "message": "Invalid JSON"}), 400
+    try:
+        items = flatten_strings(doc, max_items=SCAN_BATCH_MAX_ITEMS)
+    except ValueError:
+        return jsonify({"status": "error", "message": f"At most {SCAN_BATCH_MAX_ITEMS} strings per batch"}), 413
+    results = scan_batch([value for _, value in items])
+    for (path, _), result in zip(items, results):
+        result["path"] = path
+    return jsonify({
+        "status": "success",
+        "count": len(results),
+        "flagged": sum(1 for r in results if r["sql_injection"] or r["prompt_injection"]),
+        "results": results,
+    })
+
+# JSON bodies are inspected as they stream in, before a view parses them: size, nesting depth
+# and string length are capped on every JSON endpoint, and on /chat/secured (and /query/secure
+# when its detection mode is on) the field the view reads is checked as soon as it arrives. A
+# malicious one gets the view's own refusal without the rest of the body being read. The
+# intentionally vulnerable demo endpoints only get the limits.
+JSON_MAX_BYTES = int(os.environ.get('SENTINELGATE_JSON_MAX_BYTES', str(16 * 1024 * 1024)))
+JSON_MAX_DEPTH = int(os.environ.get('SENTINELGATE_JSON_MAX_DEPTH', '64'))
+JSON_MAX_STRING = int(os.environ.get('SENTINELGATE_JSON_MAX_STRING', str(1024 * 1024)))
+JSON_INSPECTION = {
+    '/chat/secured': 'block' if DETECTION_MODES['chat_secured'] != 'off' else 'limits',
+    '/query/secure': 'block' if DETECTION_MODES['query_secure'] != 'off' else 'limits',
+    '/chat/unsecured': 'limits',
+    '/query/vulnerable': 'limits',
+    '/scan/batch': 'limits',
+}
+
+# The values each inspected view reads; other fields of the body only get the limits
+JSON_INSPECTED_FIELDS = {
+    '/chat/secured': ('$.message',),
+    '/query/secure': ('$.chat_input',),
+}
+
+def _is_malicious_value(value):
+    ctx = AnalysisContext(value)
+    return is_sql_injection(value, ctx) or is_prompt_injection(value, ctx)
+
+def _inspection_refusal(route, value):
+    """The view's own response (status, payload, headers) to a value the inspector flagged: the
+    chatbot's refusal, not a bare 403, so clients see the same reply whichever layer caught it."""
+    if route == '/chat/secured':
+        user_input = value.strip()
+        ctx = AnalysisContext(user_input)
+        detection = run_detection(user_input, DETECTION_MODES['chat_secured'], context=ctx)
+        payload = chat_secured_reply(user_input, detection, ctx)
+    elif route == '/query/secure':
+        detection = run_detection(value, DETECTION_MODES['query_secure'])
+        payload = QUERY_SECURE_BLOCKED if detection["injection"] else None
+    else:
+        return None
+    if payload is None:
+        return None
+    return '200 OK', payload, [('X-Detection', detection_header(detection))]
+
+def _admit_rejected(environ):
+    # Requests answered by the inspector never reach limit_requests; count them here
+    return RATE_LIMITER.hit(environ.get('REMOTE_ADDR') or 'unknown')
+
+JSON_INSPECTOR = JSONBodyInspector(
+    app.wsgi_app, JSON_INSPECTION, _is_malicious_value, admit=_admit_rejected,
+    fields=JSON_INSPECTED_FIELDS, refusal=_inspection_refusal,
+    max_bytes=JSON_MAX_BYTES, max_depth=JSON_MAX_DEPTH, max_string=JSON_MAX_STRING,
+)
+app.wsgi_app = JSON_INSPECTOR
+
+@app.route('/detector/stats')
+def detector_stats():
+    """Literal-prefilter counters for the detectors, plus rule pack, cache, rate limiter, script-cache, ML stage, body inspection and scan budget statistics."""
+    pack = RULE_PACKS.active
+    return jsonify({
+        "sql": pack.sql.prefilter_stats(),
+        "prompt": pack.prompt.prefilter_stats(),
+        "rule_pack": {"version": pack.version, "fingerprint": pack.fingerprint},
+        "cache": VERDICT_CACHE.stats(),
+        "rate_limit": RATE_LIMITER.stats(),
+        "shield_script": SHIELD_SCRIPT.stats(),
+        "ml": ML_STAGE.stats(),
+        "json_inspection": JSON_INSPECTOR.stats(),
+        "scan_budget": {"max_chars": SCAN_BUDGET.max_chars, "max_ms": SCAN_BUDGET.max_ms,
+                        "over_budget": dict(SCAN_OVER_BUDGET)},
+        "modes": DETECTION_MODES,
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Request counters and stage histograms of this worker process, in Prometheus text format."""
+    if not METRICS_ENABLED:
+        return jsonify({"status": "error", "message": "Resource not found"}), 404
+    inspection = JSON_INSPECTOR.stats()
+    outcomes = {k: inspection[k] for k in ('inspected', 'blocked', 'too_large', 'malformed', 'rate_limited')}
+    body = METRICS.render(extra=[
+        ('sentinelgate_json_inspection_total', 'JSON bodies inspected while streaming in, and how many were refused.',
+         'outcome', outcomes),
+        ('sentinelgate_scan_over_budget_total', 'Inputs treated as injections because scanning them went over the scan budget.',
+         'reason', SCAN_OVER_BUDGET),
+    ])
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+# Admin endpoints need SENTINELGATE_ADMIN_TOKEN as a bearer token; without it they are disabled (404)
+ADMIN_TOKEN = os.environ.get('SENTINELGATE_ADMIN_TOKEN') or None
+
+def require_admin(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if ADMIN_TOKEN is None:
+            return jsonify({"status": "error", "message": "Resource not found"}), 404
+        auth = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(auth.encode('utf-8'), f"Bearer {ADMIN_TOKEN}".encode('utf-8')):
+            return jsonify({"status": "error", "message": "Unauthorized"}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+@app.route('/admin/rules')
+@require_admin
+def admin_rules():
+    """Active rule pack (version, fingerprint, compile time) and reload history."""
+    return jsonify(RULE_PACKS.stats())
+
+@app.route('/admin/rules/reload', methods=['POST'])
+@require_admin
+def admin_rules_reload():
+    """Re-read the rule pack file now, in the background (``?wait=1`` to wait for the result).
+
+    Only the worker that receives this request reloads; the others pick the file up on their next poll.
+    """
+    if not RULE_PACKS.path:
+        return jsonify({"status": "error", "message": "No rule pack configured (SENTINELGATE_RULE_PACK)"}), 409
+    wait = request.args.get('wait') == '1'
+    started = RULE_PACKS.reload(wait=wait)
+    return jsonify({"status": "success", "started": started, **RULE_PACKS.stats()}), 200 if wait else 202
 
-def is_prompt_injection(text):
-    text_lower = text.lower().strip()
-    for pattern in PROMPT_INJECTION_PATTERNS:
-        if re.search(pattern, text_lower):
-            return True
-    return False
+@app.route('/admin/rules/profile', methods=['GET', 'POST'])
+@require_admin
+def admin_rules_profile():
+    """Per-rule hits and search time (``GET``; ``?sort=time|mean|max|hits|candidates&top=N&format=csv``).
 
-def get_general_response(user_input):
+    ``POST`` with ``{"enabled": true, "sample_every": 10, "reset": true}`` switches profiling on this
+    worker (every rule is run on each sampled input, so sample under real traffic).
+    """
+    if request.method == 'POST':
+        doc = request.get_json(silent=True) or {}
+        if doc.get('reset'):
+            RULE_PROFILER.reset()
+        if 'sample_every' in doc:
+            try:
+                sample_every = int(doc['sample_every'])
+            except (TypeError, ValueError):
+                sample_every = 0
+            if sample_every < 1:
+                return jsonify({"status": "error", "message": "sample_every must be a positive integer"}), 400
+            RULE_PROFILER.sample_every = sample_every
+        if 'enabled' in doc:
+            if doc['enabled']:
+                RULE_PROFILER.follow(RULE_PACKS.active)
+            else:
+                RULE_PROFILER.detach()
+        return jsonify({"status": "success", **RULE_PROFILER.stats()})
+
+    sort = request.args.get('sort', 'time')
+    if sort not in SORT_KEYS:
+        return jsonify({"status": "error", "message": f"sort must be one of {', '.join(SORT_KEYS)}"}), 400
+    top = request.args.get('top', type=int)
+    rows = RULE_PROFILER.report(sort, top=top)
+    if request.args.get('format') == 'csv':
+        out = io.StringIO()
+        write_csv(rows, out)
+        return Response(out.getvalue(), mimetype='text/csv')
+    return jsonify({**RULE_PROFILER.stats(), "rules": rows})
+
+KNOWN_USERS = ['Admin', 'CEO', 'CTO', 'CFO', 'HR', 'Support', 'Developer', 'QA', 'Sales', 'Marketing', 'DevOps', 'Intern', 'Contractor', 'Manager', 'Analyst']
+LOOKUP_KEYWORDS = ['get', 'find', 'show', 'lookup', 'data', 'info', 'password', 'secret']
+_KNOWN_USERS_LOWER = [(u, u.lower()) for u in KNOWN_USERS]
+
+def get_general_response(user_input, context=None):
     """Simple intelligent responses for general chat (demo - can be replaced with LLM API)"""
-    inp = user_input.lower().strip()
-    if any(g in inp for g in ['hello', 'hi', 'hey', 'greetings']):
+    ctx = context or AnalysisContext(user_input)
+    if ctx.contains_any(['hello', 'hi', 'hey', 'greetings']):
         return "Hello! I'm here to help. Ask me anything."
-    if any(g in inp for g in ['help', 'what can you']):
+    if ctx.contains_any(['help', 'what can you']):
         return "I can answer general questions. User data lookups are only available in the Unsecured Chatbot."
-    if any(g in inp for g in ['thanks', 'thank you']):
+    if ctx.contains_any(['thanks', 'thank you']):
         return "You're welcome! Let me know if you need anything else."
-    if any(g in inp for g in ['who are you', 'what are you']):
+    if ctx.contains_any(['who are you', 'what are you']):
         return "I'm a database assistant chatbot. I help retrieve user information from the system."
-    if any(g in inp for g in ['bye', 'goodbye']):
+    if ctx.contains_any(['bye', 'goodbye']):
         return "Goodbye! Stay secure!"
     # Default contextual response
     return f"I understand you're asking about: \"{user_input[:50]}...\" if applicable. For user data, try asking for a specific username like Admin, CEO, Developer, or Support."
 
-def extract_username_for_lookup(text):
+def extract_username_for_lookup(text, context=None):
     """Extract username from phrases like 'get Admin' or 'show User1 data'"""
-    known_users = ['Admin', 'CEO', 'CTO', 'CFO', 'HR', 'Support', 'Developer', 'QA', 'Sales', 'Marketing', 'DevOps', 'Intern', 'Contractor', 'Manager', 'Analyst']
-    for u in known_users:
-        if u.lower() in text.lower():
+    text_lower = (context or AnalysisContext(text)).lower
+    for u, u_lower in _KNOWN_USERS_LOWER:
+        if u_lower in text_lower:
             return u
     return text.strip()
 
+def is_lookup_request(user_input, context=None):
+    """True if the message asks for user data (a lookup keyword or a known user name)."""
+    return (context or AnalysisContext(user_input)).verdict('lookup', _lookup_verdict)
+
+def _lookup_verdict(ctx):
+    return ctx.contains_any(LOOKUP_KEYWORDS) or any(name in ctx.text for name in KNOWN_USERS)
+
 @app.route('/chat/unsecured', methods=['POST'])
 @limit_requests
 def chat_unsecured():
     """Unsecured chatbot – intentionally leaky for demo (shows why protection matters)."""
     if not request.is_json:
         return jsonify({"status": "error", "message": "Request must be JSON"}), 400
-    user_input = request.json.get('message', '').strip()
+    with stage('json'):
+        user_input = request.json.get('message', '').strip()
     if not user_input:
         return jsonify({"status": "error", "message": "Empty message"}), 400
 
     # Determine if user is trying to look up data
-    is_lookup = any(kw in user_input.lower() for kw in ['get', 'find', 'show', 'lookup', 'data', 'info', 'password', 'secret']) or \
-                any(name in user_input for name in ['Admin', 'CEO', 'CTO', 'CFO', 'HR', 'Support', 'Developer', 'QA', 'Sales', 'Marketing', 'DevOps', 'Intern', 'Contractor', 'Manager', 'Analyst'])
-
-    if is_lookup:
+    ctx = AnalysisContext(user_input)
+    if is_lookup_request(user_input, ctx):
         # DEMO: intentionally vulnerable version that shows data leakage when no client-side/script protection is present.
-        ensure_db_ready()
-        is_injection = is_sql_injection(user_input)
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                # Vulnerable concatenation on purpose so `' OR '1'='1` etc. will leak multiple rows.
-                query_input = extract_username_for_lookup(user_input) if not is_injection else user_input
-                query = f"SELECT * FROM secrets WHERE name = '{query_input}'"
-                cursor.execute(query)
-                result = [dict(row) for row in cursor.fetchall()]
-                if result:
-                    response = "Here is the data you requested:\n" + "\n".join(
-                        [f"- {r['name']}: {r['data']}" for r in result]
-                    )
-                    return jsonify({"status": "success", "response": response, "is_injection": is_injection})
-                else:
-                    return jsonify({
-                        "status": "success",
-                        "response": f"No record found for '{query_input}'.",
-                        "is_injection": is_injection,
-                    })
-        except Exception as e:
-            app.logger.error(f"Chat query error (unsecured): {e}")
-            return jsonify({"status": "error", "response": "Query error", "is_injection": is_injection}), 400
-
-    return jsonify({"status": "success", "response": get_general_response(user_input)})
+        with stage('db_ready'):
+            ensure_db_ready()
+        detection = detect(user_input, DETECTION_MODES['chat_unsecured'], prompt=False, context=ctx)
+        with stage('sqlite'):
+            payload, status = chat_unsecured_lookup(user_input, detection, ctx)
+        with stage('response'):
+            return jsonify(payload), status
+
+    with stage('response'):
+        return jsonify({"status": "success", "response": get_general_response(user_input, ctx)})
+
+def chat_unsecured_lookup(user_input, detection, context=None):
+    """Run the (vulnerable) data lookup for /chat/unsecured; returns (payload, status)."""
+    is_injection = detection["sql_injection"] or detection["ml_flagged"]
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            # Vulnerable concatenation on purpose so `' OR '1'='1` etc. will leak multiple rows.
+            query_input = extract_username_for_lookup(user_input, context) if not detection["sql_injection"] else user_input
+            query = f"SELECT * FROM secrets WHERE name = '{query_input}'"
+            cursor.execute(query)
+            result = [dict(row) for row in cursor.fetchall()]
+            if result:
+                response = "Here is the data you requested:\n" + "\n".join(
+                    [f"- {r['name']}: {r['data']}" for r in result]
+                )
+                return {"status": "success", "response": response, "is_injection": is_injection}, 200
+            else:
+                return {
+                    "status": "success",
+                    "response": f"No record found for '{query_input}'.",
+                    "is_injection": is_injection,
+                }, 200
+    except Exception as e:
+        note_db_error(e)
+        app.logger.error(f"Chat query error (unsecured): {e}")
+        return {"status": "error", "response": "Query error", "is_injection": is_injection}, 400
 
 @app.route('/chat/secured', methods=['POST'])
 @limit_requests
@@ -543,41 +993,59 @@ def chat_secured():
     """Secured chatbot - NEVER reveals data. Blocks SQL injection, prompt injection, and all data lookups."""
     if not request.is_json:
         return jsonify({"status": "error", "message": "Request must be JSON"}), 400
-    user_input = request.json.get('message', '').strip()
+    with stage('json'):
+        user_input = request.json.get('message', '').strip()
     if not user_input:
         return jsonify({"status": "error", "message": "Empty message"}), 400
 
+    # One context for the detectors and the keyword checks below: the input is normalized once
+    ctx = AnalysisContext(user_input)
+    detection = detect(user_input, DETECTION_MODES['chat_secured'], context=ctx)
+    with stage('response'):
+        return jsonify(chat_secured_reply(user_input, detection, ctx))
+
+def chat_secured_reply(user_input, detection, context=None):
+    """Response payload of /chat/secured for a message and its detection result
+    (``context``: the AnalysisContext the detection ran on, if any)."""
+    ctx = context or AnalysisContext(user_input)
     # BLOCK: Refuse SQL injection attempts
-    if is_sql_injection(user_input):
-        return jsonify({
+    if detection["sql_injection"]:
+        return {
             "status": "success",
             "response": "I cannot process that request. It appears to contain potentially malicious SQL patterns. For security reasons, I do not return any user data."
-        })
+        }
 
     # BLOCK: Refuse prompt injection attempts
-    if is_prompt_injection(user_input):
-        return jsonify({
+    if detection["prompt_injection"]:
+        return {
             "status": "success",
             "response": "I cannot comply with that request. It looks like an attempt to manipulate my instructions."
-        })
+        }
+
+    # BLOCK: Refuse inputs the classifier flags (ml mode only)
+    if detection["ml_flagged"]:
+        return {
+            "status": "success",
+            "response": "I cannot process that request. It was flagged as a likely injection attempt."
+        }
 
     # BLOCK: Secured chatbot NEVER reveals data - refuse all data lookup requests
-    is_data_request = any(kw in user_input.lower() for kw in ['get', 'find', 'show', 'lookup', 'data', 'info', 'password', 'secret']) or \
-                     any(name in user_input for name in ['Admin', 'CEO', 'CTO', 'CFO', 'HR', 'Support', 'Developer', 'QA', 'Sales', 'Marketing', 'DevOps', 'Intern', 'Contractor', 'Manager', 'Analyst']) or \
-                     (user_input.isalnum() and user_input in ['Admin', 'CEO', 'CTO', 'CFO', 'HR', 'Support', 'Developer', 'QA', 'Sales', 'Marketing', 'DevOps', 'Intern', 'Contractor', 'Manager', 'Analyst'])
+    is_data_request = is_lookup_request(user_input, ctx) or \
+                     (user_input.isalnum() and user_input in KNOWN_USERS)
 
     if is_data_request:
-        return jsonify({
+        return {
             "status": "success",
             "response": "I cannot provide user data. This chatbot is secured and does not return sensitive information. For data lookup demonstrations, use the Unsecured Chatbot."
-        })
+        }
 
-    return jsonify({"status": "success", "response": get_general_response(user_input)})
+    return {"status": "success", "response": get_general_response(user_input, ctx)}
 
 @app.route('/reset', methods=['GET'])
 def reset_db():
     try:
         init_db()
+        DB_READY.invalidate()
         return jsonify({
             "status": "success", 
             "message": "Database reset successfully"
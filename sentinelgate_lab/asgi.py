@@ -0,0 +1,433 @@
+"""
+Async (ASGI) serving path for the chat and query endpoints.
+
+``app`` is an ASGI 3 application. POST /chat/secured, /chat/unsecured,
+/query/secure and /query/vulnerable are served by async handlers that give
+the same responses as the Flask views (they share the helpers in app.py);
+every other route is handed to the Flask app on a thread, so one server
+serves the whole site::
+
+    uvicorn sentinelgate_lab.asgi:app
+    gunicorn -k uvicorn.workers.UvicornWorker sentinelgate_lab.asgi:app
+    python -m sentinelgate_lab.asgi --port 8000    # uvicorn if installed, else devserver.py
+
+Nothing on the event loop waits on I/O or long CPU work:
+
+- SQLite lookups (and ``ensure_db_ready``) run on a bounded thread pool
+  (SENTINELGATE_ASGI_DB_THREADS, default 8). Connections are pooled per
+  thread, so that is also the number of open connections.
+- Detection of a short input on the regex stage takes microseconds and runs
+  inline. Inputs longer than SENTINELGATE_ASGI_OFFLOAD_CHARS (default 2048)
+  and classifier scoring go to a process pool (SENTINELGATE_ASGI_DETECT_PROCS,
+  default: CPU count; 0 = a thread instead). The pool is forked from the
+  loaded app at startup, before any other thread exists, so its workers
+  start with the compiled rules and model; each polls the rule pack itself.
+- The rate limit is checked with ``RATE_LIMITER.ahit`` (inline for the
+  in-memory backend, on the DB pool for SQLite).
+- JSON bodies get the same streaming inspection as under Flask
+  (``JSON_INSPECTION``: size/depth/string limits and a 403 at the first
+  malicious value on block routes), fed from ``receive()`` as they arrive.
+- Requests on the async handlers are recorded in ``METRICS`` under the view's
+  endpoint name, with the same stages (``sqlite`` is the whole DB pool call)
+  and the Server-Timing header when it is on. As under Flask, answers of the
+  JSON inspector are not counted.
+
+The Flask entry points (``app:app`` under gunicorn or ``flask run``) are unchanged.
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from . import app as flask_module
+from .analysis import AnalysisContext
+from .jsonstream import JSONLimitError, JSONStringReader
+from .metrics import NULL_STAGE, stage, start_request
+
+logger = logging.getLogger(__name__)
+
+DB_THREADS = int(os.environ.get('SENTINELGATE_ASGI_DB_THREADS', '8'))
+DETECT_PROCS = int(os.environ.get('SENTINELGATE_ASGI_DETECT_PROCS', str(os.cpu_count() or 1)))
+OFFLOAD_CHARS = int(os.environ.get('SENTINELGATE_ASGI_OFFLOAD_CHARS', '2048'))
+# Threads running the Flask app for the routes without an async handler
+WSGI_THREADS = int(os.environ.get('SENTINELGATE_ASGI_WSGI_THREADS', '4'))
+
+
+class _Rejected(Exception):
+    """A request answered before its handler runs (status, payload, extra headers)."""
+
+    def __init__(self, status: int, payload: dict, headers=()):
+        super().__init__(status)
+        self.status = status
+        self.payload = payload
+        self.headers = headers
+
+
+def _detect_in_worker(text, mode, prompt):
+    # Runs in a detection process: follow rule pack changes like any other worker
+    flask_module.RULE_PACKS.maybe_reload()
+    return flask_module.run_detection(text, mode, prompt)
+
+
+def _malicious_in_worker(value):
+    flask_module.RULE_PACKS.maybe_reload()
+    return flask_module._is_malicious_value(value)
+
+
+def _refused_in_worker(path, value_path, value):
+    flask_module.RULE_PACKS.maybe_reload()
+    return flask_module.JSON_INSPECTOR.refused(path, value_path, value)
+
+
+def _warm_up():
+    return os.getpid()
+
+
+def _db_call(fn, *args):
+    flask_module.ensure_db_ready()
+    return fn(*args)
+
+
+class AsyncApp:
+    """The ASGI application: async chat/query handlers plus the Flask app for everything else."""
+
+    def __init__(self, db_threads: int = DB_THREADS, detect_procs: int = DETECT_PROCS,
+                 offload_chars: int = OFFLOAD_CHARS, wsgi_threads: int = WSGI_THREADS):
+        self.db_threads = db_threads
+        self.detect_procs = detect_procs
+        self.offload_chars = offload_chars
+        self.wsgi_threads = wsgi_threads
+        self.db_pool = None
+        self.detect_pool = None
+        self.wsgi_pool = None
+        self.offloaded = 0
+        self.routes = {
+            '/chat/secured': self.chat_secured,
+            '/chat/unsecured': self.chat_unsecured,
+            '/query/secure': self.query_secure,
+            '/query/vulnerable': self.query_vulnerable,
+        }
+
+    def start(self):
+        """Create the pools; the detection processes are forked first, while this is the only thread."""
+        if self.db_pool is not None:
+            return
+        if self.detect_procs > 0 and 'fork' in multiprocessing.get_all_start_methods():
+            self.detect_pool = ProcessPoolExecutor(self.detect_procs, mp_context=multiprocessing.get_context('fork'))
+            for future in [self.detect_pool.submit(_warm_up) for _ in range(self.detect_procs)]:
+                future.result()
+        else:
+            self.detect_pool = ThreadPoolExecutor(max(1, self.detect_procs), thread_name_prefix='sg-detect')
+        self.db_pool = ThreadPoolExecutor(self.db_threads, thread_name_prefix='sg-db')
+        self.wsgi_pool = ThreadPoolExecutor(self.wsgi_threads, thread_name_prefix='sg-wsgi')
+
+    def close(self):
+        for pool in (self.detect_pool, self.db_pool, self.wsgi_pool):
+            if pool is not None:
+                if sys.version_info >= (3, 9):
+                    pool.shutdown(wait=True, cancel_futures=True)
+                else:   # no cancel_futures: queued jobs run before the pool exits
+                    pool.shutdown(wait=True)
+        self.db_pool = self.detect_pool = self.wsgi_pool = None
+
+    async def _offload(self, fn, *args):
+        try:
+            self.offloaded += 1
+            return await asyncio.get_running_loop().run_in_executor(self.detect_pool, fn, *args)
+        except BrokenProcessPool:
+            logger.error("Detection process pool broke; detecting on threads from now on")
+            self.detect_pool = ThreadPoolExecutor(max(1, self.detect_procs), thread_name_prefix='sg-detect')
+            return await asyncio.get_running_loop().run_in_executor(self.detect_pool, fn, *args)
+
+    async def detect(self, text, mode, prompt=True, context=None):
+        """``run_detection`` inline when cheap (sharing ``context``), else in the detection pool."""
+        if mode == 'off' or (mode == 'regex' and len(text) <= self.offload_chars):
+            result = flask_module.run_detection(text, mode, prompt, context)
+        else:
+            result = await self._offload(_detect_in_worker, text, mode, prompt)
+        flask_module.time_detection(result)
+        return result
+
+    async def _is_malicious(self, value):
+        if len(value) <= self.offload_chars:
+            return flask_module._is_malicious_value(value)
+        return await self._offload(_malicious_in_worker, value)
+
+    async def _refused(self, path, value_path, value):
+        """The inspector's answer to a malicious value (the view's refusal, or a 403)."""
+        if len(value) <= self.offload_chars:
+            return flask_module.JSON_INSPECTOR.refused(path, value_path, value)
+        return await self._offload(_refused_in_worker, path, value_path, value)
+
+    async def run_db(self, fn, *args):
+        """``fn(*args)`` on the DB pool, after the readiness check (both touch SQLite)."""
+        # Timed here: the pool's threads don't see this request's timing
+        with stage('sqlite'):
+            return await asyncio.get_running_loop().run_in_executor(self.db_pool, _db_call, fn, *args)
+
+    async def _admit(self, ip):
+        return await flask_module.RATE_LIMITER.ahit(ip, self.db_pool)
+
+    # -- request body ---------------------------------------------------------------
+
+    async def _read_body(self, receive, scope, is_json, ip):
+        """The whole body; JSON bodies of inspected routes go through the JSON inspector's checks as they arrive."""
+        inspector = flask_module.JSON_INSPECTOR
+        mode = inspector.routes.get(scope['path']) if is_json else None
+        wanted = inspector.fields.get(scope['path'])
+        reader = None
+        if mode is not None:
+            length = next((v for k, v in scope.get('headers', ()) if k == b'content-length'), b'')
+            if length.isdigit() and int(length) > inspector.max_bytes:
+                await self._reject(ip, 'too_large', 413, {"message": f"Body larger than {inspector.max_bytes} bytes"})
+            inspector.count('inspected')
+            reader = JSONStringReader(max_bytes=inspector.max_bytes, max_depth=inspector.max_depth,
+                                      max_string=inspector.max_string)
+        chunks = []
+        try:
+            while True:
+                message = await receive()
+                if message['type'] != 'http.request':
+                    raise _Rejected(400, {"status": "error", "message": "Client disconnected"})
+                data = message.get('body', b'')
+                chunks.append(data)
+                more = message.get('more_body', False)
+                if reader is not None:
+                    values = reader.feed(data) if more else reader.feed(data) + reader.close()
+                    for value_path, value in values:
+                        if mode == 'block' and (wanted is None or value_path in wanted) \
+                                and await self._is_malicious(value):
+                            status, payload, headers = await self._refused(scope['path'], value_path, value)
+                            await self._answer(ip, 'blocked', int(status.split(' ', 1)[0]), payload, headers)
+                if not more:
+                    return b''.join(chunks)
+        except JSONLimitError as e:
+            await self._reject(ip, 'too_large', 413, {"message": f"Request body rejected: {e}"})
+        except ValueError as e:
+            await self._reject(ip, 'malformed', 400, {"message": f"Invalid JSON: {e}"})
+
+    async def _answer(self, ip, counter, status, payload, headers=()):
+        """Raise the inspector's answer, counted against the rate limit like under Flask."""
+        inspector = flask_module.JSON_INSPECTOR
+        if not await self._admit(ip):
+            inspector.count('rate_limited')
+            raise _Rejected(429, {"status": "error", "message": "Too many requests"})
+        inspector.count(counter)
+        raise _Rejected(status, payload, headers)
+
+    async def _reject(self, ip, counter, status, payload):
+        await self._answer(ip, counter, status, {"status": "error", **payload})
+
+    # -- handlers (same responses as the Flask views) ---------------------------------
+
+    async def chat_secured(self, doc):
+        user_input = doc.get('message', '').strip()
+        if not user_input:
+            raise _Rejected(400, {"status": "error", "message": "Empty message"})
+        ctx = AnalysisContext(user_input)
+        detection = await self.detect(user_input, flask_module.DETECTION_MODES['chat_secured'], context=ctx)
+        return flask_module.chat_secured_reply(user_input, detection, ctx), 200, detection
+
+    async def chat_unsecured(self, doc):
+        user_input = doc.get('message', '').strip()
+        if not user_input:
+            raise _Rejected(400, {"status": "error", "message": "Empty message"})
+        ctx = AnalysisContext(user_input)
+        if not flask_module.is_lookup_request(user_input, ctx):
+            return {"status": "success", "response": flask_module.get_general_response(user_input, ctx)}, 200, None
+        detection = await self.detect(user_input, flask_module.DETECTION_MODES['chat_unsecured'], prompt=False,
+                                      context=ctx)
+        payload, status = await self.run_db(flask_module.chat_unsecured_lookup, user_input, detection, ctx)
+        return payload, status, detection
+
+    async def query_secure(self, doc):
+        user_input = doc.get('chat_input', '')
+        mode = flask_module.DETECTION_MODES['query_secure']
+        detection = None
+        if mode != 'off':
+            detection = await self.detect(user_input, mode)
+            if detection["injection"]:
+                return flask_module.QUERY_SECURE_BLOCKED, 200, detection
+        payload, status = await self.run_db(flask_module.query_secure_lookup, user_input,
+                                            doc.get('table', 'secrets'), doc.get('test_case', ''))
+        return payload, status, detection
+
+    async def query_vulnerable(self, doc):
+        user_input = doc.get('chat_input', '')
+        mode = flask_module.DETECTION_MODES['query_vulnerable']
+        detection = None
+        if mode != 'off':
+            # Reported in the X-Detection header only; this endpoint stays vulnerable on purpose
+            detection = await self.detect(user_input, mode)
+        payload, status = await self.run_db(flask_module.query_vulnerable_lookup, user_input,
+                                            doc.get('table', 'secrets'))
+        return payload, status, detection
+
+    # -- ASGI ------------------------------------------------------------------------
+
+    async def _send_json(self, send, status, payload, detection=None, headers=(), timed=False):
+        # Like the views, which time jsonify() for their replies but not for their early errors
+        with stage('response') if timed else NULL_STAGE:
+            body = (flask_module.app.json.dumps(payload) + "\n").encode('utf-8')
+        headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode('ascii')),
+                   *((name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers)]
+        if detection is not None:
+            headers.append((b'x-detection', flask_module.detection_header(detection).encode('latin-1')))
+        server_timing = flask_module.finish_timing(status)
+        if server_timing is not None:
+            headers.append((b'server-timing', server_timing.encode('latin-1')))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    self.start()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        self.start()   # servers without lifespan support
+        handler = self.routes.get(scope['path']) if scope['method'] == 'POST' else None
+        if handler is None:
+            return await self._wsgi(scope, receive, send)
+
+        flask_module.RULE_PACKS.maybe_reload()
+        client = scope.get('client')
+        ip = client[0] if client else 'unknown'
+        content_type = next((v.decode('latin-1') for k, v in scope.get('headers', ()) if k == b'content-type'), '')
+        mimetype = content_type.split(';', 1)[0].strip().lower()
+        is_json = mimetype == 'application/json' or mimetype.endswith('+json')
+        try:
+            body = await self._read_body(receive, scope, is_json, ip)
+            if flask_module.METRICS_ENABLED:
+                # Timed from here, as under Flask, where the JSON inspector runs before the hooks
+                start_request(handler.__name__)
+            if not await self._admit(ip):
+                raise _Rejected(429, {"status": "error", "message": "Too many requests"})
+            if not is_json:
+                raise _Rejected(400, {"status": "error", "message": "Request must be JSON"})
+            with stage('json'):
+                doc = json.loads(body)
+            payload, status, detection = await handler(doc)
+        except _Rejected as r:
+            return await self._send_json(send, r.status, r.payload, headers=r.headers)
+        except Exception:
+            logger.exception("Error in async handler for %s", scope['path'])
+            return await self._send_json(send, 500, {"status": "error", "message": "Internal server error"})
+        await self._send_json(send, status, payload, detection, timed=True)
+
+    # -- everything else: the Flask app on a thread -----------------------------------
+
+    def _environ(self, scope, body: bytes) -> dict:
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client')
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0] if client else '',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', ()):
+            key = name.decode('latin-1').upper().replace('-', '_')
+            if key == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value.decode('latin-1')
+            elif key != 'CONTENT_LENGTH':
+                key = 'HTTP_' + key
+                value = value.decode('latin-1')
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    @staticmethod
+    def _call_wsgi(environ):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = headers
+            return lambda data: response.setdefault('written', []).append(data)
+        result = flask_module.app(environ, start_response)
+        try:
+            body = b''.join(response.get('written', [])) + b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], body
+
+    async def _wsgi(self, scope, receive, send):
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] != 'http.request':
+                return
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        environ = self._environ(scope, b''.join(chunks))
+        status, headers, body = await asyncio.get_running_loop().run_in_executor(
+            self.wsgi_pool, self._call_wsgi, environ)
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    def stats(self) -> dict:
+        return {
+            "db_threads": self.db_threads,
+            "detect_pool": type(self.detect_pool).__name__ if self.detect_pool else None,
+            "detect_workers": self.detect_procs,
+            "offload_chars": self.offload_chars,
+            "offloaded": self.offloaded,
+        }
+
+
+app = AsyncApp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the app with the async chat/query path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    try:
+        import uvicorn  # pyright: ignore[reportMissingImports]
+    except ImportError:
+        from .devserver import serve
+        logger.info("uvicorn not installed; using the built-in development server")
+        serve(app, args.host, args.port)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Pre-rendered, pre-compressed serving for the embeddable cipher-shield.js.
+
+The script is embedded on every page of the sites that use the shield, which
+makes it the highest-volume route. ``RenderedScript`` reads the file once and
+renders it once per distinct base URL, with a strong ETag per encoding, so
+requests are served from memory and revalidations get a 304.
+
+The base comes from the Host header, so it is client-controlled. Bases listed
+as ``pinned`` (the deployment's own hosts) are rendered at construction and
+compressed once at the best levels: gzip 9 and, when the optional ``brotli``
+package is installed, brotli 11. Any other base goes into a bounded LRU: its
+first response is sent uncompressed, and later ones compress lazily, only in
+the coding a client asked for and at a fast level. A client rotating Host
+headers thus costs about what the plain per-request replace did, not a
+best-level compression per request.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+CODINGS = ('identity', 'gzip') + (('br',) if brotli is not None else ())
+
+# Compression levels per coding: pinned bases are compressed once, other bases on a cache miss
+BEST_LEVELS = {'gzip': 9, 'br': 11}
+FAST_LEVELS = {'gzip': 1, 'br': 1}
+
+
+class Rendering:
+    """One rendered script: ``etags`` per content coding ('identity', 'gzip', 'br') and the
+    bodies, each compressed at ``levels`` on first use. With ``eager`` every coding is
+    compressed at construction; otherwise the first ``select`` always picks 'identity'."""
+
+    __slots__ = ('bodies', 'etags', 'levels', 'selected')
+
+    def __init__(self, content: bytes, levels: dict, eager: bool = False):
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        self.bodies = {'identity': content}
+        self.levels = levels
+        self.selected = eager
+        # Strong ETags must differ between encodings of the same content
+        self.etags = {
+            coding: digest if coding == 'identity' else f"{digest}-{coding}"
+            for coding in CODINGS
+        }
+        if eager:
+            for coding in CODINGS[1:]:
+                self.body(coding)
+
+    def body(self, coding: str) -> bytes:
+        """The body in ``coding``, compressed now if this is its first use (a race just compresses twice)."""
+        body = self.bodies.get(coding)
+        if body is None:
+            content = self.bodies['identity']
+            if coding == 'gzip':
+                body = gzip.compress(content, compresslevel=self.levels['gzip'], mtime=0)
+            else:
+                body = brotli.compress(content, quality=self.levels['br'])
+            self.bodies[coding] = body
+        return body
+
+    def select(self, accept_encodings) -> str:
+        """Pick the smallest coding the client accepts (werkzeug ``request.accept_encodings``)."""
+        if not self.selected:
+            # Made on a cache miss: compress only once the same base is asked for again
+            self.selected = True
+            return 'identity'
+        for coding in ('br', 'gzip'):
+            if coding in self.etags and accept_encodings[coding] > 0:
+                return coding
+        return 'identity'
+
+    def matches(self, if_none_match) -> bool:
+        """True if the client's cached copy (``request.if_none_match``) is any encoding of this content."""
+        if not if_none_match:
+            return False
+        if if_none_match.star_tag:
+            return True
+        return any(if_none_match.contains(etag) for etag in self.etags.values())
+
+
+class RenderedScript:
+    """A static text file with one placeholder, rendered per value and memoized.
+
+    The source is read once, at construction or on ``reload()``; the ``pinned``
+    values are rendered (and compressed) right then and never evicted.
+    """
+
+    def __init__(self, path: str, placeholder: str, max_variants: int = 64, pinned=()):
+        self.path = path
+        self.placeholder = placeholder
+        self.max_variants = max_variants
+        self.pinned = tuple(pinned)
+        self._pinned = {}                # replacement -> Rendering, replaced whole on reload
+        self._variants = OrderedDict()   # replacement -> Rendering
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reload()
+
+    def reload(self):
+        """Re-read the source file, re-render the pinned values and drop every other rendering."""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        pinned = {
+            value: Rendering(source.replace(self.placeholder, value, 1).encode('utf-8'), BEST_LEVELS, eager=True)
+            for value in self.pinned
+        }
+        with self._lock:
+            self._source = source
+            self._pinned = pinned
+            self._variants.clear()
+
+    def render(self, replacement: str) -> Rendering:
+        rendering = self._pinned.get(replacement)
+        if rendering is not None:
+            self.hits += 1
+            return rendering
+        with self._lock:
+            rendering = self._variants.get(replacement)
+            if rendering is not None:
+                self._variants.move_to_end(replacement)
+                self.hits += 1
+                return rendering
+            self.misses += 1
+            source = self._source
+        # No compression here: Rendering.body compresses the coding a client asks for, on first use
+        rendering = Rendering(source.replace(self.placeholder, replacement, 1).encode('utf-8'), FAST_LEVELS)
+        with self._lock:
+            self._variants[replacement] = rendering
+            self._variants.move_to_end(replacement)
+            while len(self._variants) > self.max_variants:
+                self._variants.popitem(last=False)
+                self.evictions += 1
+        return rendering
+
+    def stats(self) -> dict:
+        return {
+            "pinned": len(self._pinned),
+            "variants": len(self._variants),
+            "max_variants": self.max_variants,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "brotli": brotli is not None,
+        }
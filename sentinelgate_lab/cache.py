@@ -0,0 +1,108 @@
+"""
+Bounded LRU cache for detector verdicts.
+
+Bots and UI retries send the same strings over and over; caching the verdict
+per normalized input avoids re-running the detectors. Entries are tied to a
+rules *generation* (the detectors' fingerprints): the first lookup with a new
+generation drops everything cached under the old rule set.
+"""
+from __future__ import annotations
+
+import sys
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+# Rough per-entry bookkeeping cost on top of the key string (OrderedDict node, tuples, value)
+_ENTRY_OVERHEAD = 160
+
+
+class VerdictCache:
+    """Thread-safe LRU cache with entry/byte limits and an optional TTL.
+
+    ``get`` returns None on a miss, so cached values must never be None.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 4 * 1024 * 1024,
+                 ttl: float | None = None, max_key_chars: int = 2048):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_key_chars = max_key_chars
+        self._data = OrderedDict()   # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+        self._generation = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_generation(self, generation):
+        if generation != self._generation:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self._bytes = 0
+            self._generation = generation
+
+    def get(self, key, generation=None):
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at is not None and monotonic() >= expires_at:
+                del self._data[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation=None):
+        text = key[-1] if isinstance(key, tuple) else key
+        if isinstance(text, str) and len(text) > self.max_key_chars:
+            return  # not worth the memory; one-off large inputs would only churn the cache
+        size = sys.getsizeof(text) + _ENTRY_OVERHEAD
+        expires_at = monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._check_generation(generation)
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
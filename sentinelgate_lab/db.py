@@ -0,0 +1,182 @@
+"""
+Per-thread persistent SQLite connections.
+
+Opening a connection on every request (file open, schema parse, pragma setup)
+was a large share of request latency. ``ConnectionPool`` keeps one long-lived
+connection per worker thread, in WAL mode with a larger statement cache so the
+parameterized lookups are prepared once per connection and reused.
+
+Connections are health-checked periodically and recycled after a maximum age
+or number of uses, when the database file is replaced, or after ``reset()``.
+A connection inherited across ``fork()`` (gunicorn ``--preload``) is never
+reused in the child.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from time import monotonic
+
+
+class ConnectionPool:
+    """One persistent connection per thread for a single SQLite database file.
+
+    ``connection()`` returns the calling thread's connection; it can be used
+    as ``with pool.connection() as conn:`` (commit/rollback, no close), which
+    is how the app already uses its connections.
+    """
+
+    def __init__(self, path: str, enabled: bool = True, max_age: float = 600.0,
+                 max_uses: int = 50_000, health_check_interval: float = 30.0,
+                 cached_statements: int = 256, cache_size_kib: int = 8192,
+                 busy_timeout: float = 5.0):
+        self.path = path
+        self.enabled = enabled
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.health_check_interval = health_check_interval
+        self.cached_statements = cached_statements
+        self.cache_size_kib = cache_size_kib
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.recycled = 0
+        self.failed_checks = 0
+
+    def _file_identity(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino)
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                               cached_statements=self.cached_statements)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def _healthy(self, state, now) -> bool:
+        if state['generation'] != self._generation:
+            return False
+        if now - state['created'] > self.max_age or state['uses'] >= self.max_uses:
+            return False
+        if now - state['checked'] >= self.health_check_interval:
+            state['checked'] = now
+            if self._file_identity() != state['identity']:
+                return False
+            try:
+                state['conn'].execute("SELECT 1").fetchone()
+            except sqlite3.Error:
+                with self._lock:
+                    self.failed_checks += 1
+                return False
+        return True
+
+    def connection(self) -> sqlite3.Connection:
+        if not self.enabled:
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            return conn
+        now = monotonic()
+        state = getattr(self._local, 'state', None)
+        if state is not None and state['pid'] != os.getpid():
+            # Inherited from the parent process; SQLite handles must not cross fork()
+            state = self._local.state = None
+        if state is not None and not self._healthy(state, now):
+            self._discard(state)
+            state = None
+            with self._lock:
+                self.recycled += 1
+        if state is None:
+            conn = self._open()
+            state = {
+                'conn': conn,
+                'created': now,
+                'checked': now,
+                'uses': 0,
+                'generation': self._generation,
+                'identity': self._file_identity(),
+                'pid': os.getpid(),
+            }
+            self._local.state = state
+        state['uses'] += 1
+        return state['conn']
+
+    def _discard(self, state):
+        self._local.state = None
+        try:
+            state['conn'].close()
+        except sqlite3.Error:
+            pass
+
+    def reset(self):
+        """Recycle every thread's connection on its next use (e.g. after the DB file is recreated)."""
+        with self._lock:
+            self._generation += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "opened": self.opened,
+            "recycled": self.recycled,
+            "failed_checks": self.failed_checks,
+            "generation": self._generation,
+        }
+
+
+class ReadinessLatch:
+    """Runs a database readiness check once and remembers the result.
+
+    The check is repeated only when the database file changes (different
+    inode, or modification time moved) or after ``invalidate()`` - e.g. when a
+    query reports a missing table, or after the database was reset. When the
+    file was replaced, the connection pool is told to recycle its connections.
+    """
+
+    def __init__(self, path: str, check, pool: ConnectionPool | None = None):
+        self.path = path
+        self.check = check
+        self.pool = pool
+        self._ready = None   # file stamp at the last successful check
+        self._lock = threading.Lock()
+        self.checks = 0
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino, st.st_mtime_ns)
+
+    def ensure(self):
+        stamp = self._stamp()
+        if stamp is not None and stamp == self._ready:
+            return
+        with self._lock:
+            previous = self._ready
+            if stamp is not None and stamp == previous:
+                return
+            if previous is not None and self.pool is not None and (stamp is None or stamp[:2] != previous[:2]):
+                # The file was deleted or replaced; pooled connections point at the old inode
+                self.pool.reset()
+            self.check()
+            self.checks += 1
+            self._ready = self._stamp()
+
+    def invalidate(self):
+        with self._lock:
+            self._ready = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready is not None
@@ -0,0 +1,604 @@
+"""
+Compiled detection engine for the injection pattern lists.
+
+All patterns of a list are compiled once into a single alternation, so a
+benign input is scanned in one pass instead of one ``re.search`` per pattern.
+The individual compiled patterns are only consulted after the combined scan
+has found something, to report *which* rules matched.
+
+In front of the regexes sits a literal prefilter: every rule that can only
+match when some literal (``union``, ``sleep``, ``'``...) occurs in the input is
+skipped unless one of its literals is present, so plain chat text usually
+returns without running a single regex. Which rules a given combination of
+literals enables is worked out once and remembered: ordinary text keeps
+hitting the same few combinations (``or``, ``=``...).
+
+Rules with an unbounded wildcard followed by more pattern (``UNION\\s+SELECT\\s+.*\\s+FROM``)
+backtrack: on crafted input ``re`` retries the ``.*`` from every start and
+every split, quadratic or worse in the input length. Such a rule is not
+given to ``re`` whole. It is cut at its top-level ``.*`` gaps into segments
+that are searched one after the other (``SegmentChain``), each once, so
+the cost is a few linear passes. A ``ScanBudget`` bounds what remains: inputs
+over a length cap, or still being scanned when a time budget runs out, raise
+``ScanBudgetExceeded`` and the caller fails closed.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from time import perf_counter
+
+try:  # Python 3.11+
+    from re import _compiler as sre_compile, _constants as sre_constants, _parser as sre_parse
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_compile
+    import sre_constants
+    import sre_parse
+
+_WORD_BOUNDARY = '\\b'
+
+# Clauses kept per rule by required_literals (the most selective ones)
+MAX_CLAUSES = 2
+
+
+def _alternation(patterns) -> str:
+    return '|'.join(f'(?:{p})' for p in patterns)
+
+
+def combine_patterns(patterns) -> str:
+    """Join patterns into one regex that matches wherever any of them matches.
+
+    Patterns that start with ``\\b`` are grouped behind a single hoisted ``\\b``
+    so the engine rejects non-boundary positions once instead of once per
+    pattern. Groups are non-capturing: capturing groups would disable most of
+    sre's search optimizations on a large alternation.
+    """
+    bounded = [p[len(_WORD_BOUNDARY):] for p in patterns if p.startswith(_WORD_BOUNDARY)]
+    others = [p for p in patterns if not p.startswith(_WORD_BOUNDARY)]
+    parts = []
+    if bounded:
+        parts.append(f'{_WORD_BOUNDARY}(?:{_alternation(bounded)})')
+    if others:
+        parts.append(_alternation(others))
+    return '|'.join(parts)
+
+
+def required_literals(pattern: str, flags: int = 0) -> tuple:
+    """Literal requirements that any string matched by ``pattern`` must satisfy.
+
+    Returns a tuple of clauses; each clause is a frozenset of literals of which
+    at least one must occur in the input. An empty tuple means nothing could be
+    derived and the rule must always run. With IGNORECASE the literals are
+    lowercased and only valid against a lowercased ASCII haystack.
+    """
+    parsed = sre_parse.parse(pattern, flags)
+    fold = bool(flags & re.IGNORECASE)
+    if bool(parsed.state.flags & re.IGNORECASE) != fold:
+        return ()
+    clauses = sorted(dict.fromkeys(_clauses(parsed, fold)), key=_selectivity, reverse=True)
+    # A couple of selective clauses filter nearly as well as all of them, and
+    # every extra literal costs a substring check on each input
+    return tuple(clauses[:MAX_CLAUSES])
+
+
+def _selectivity(clause):
+    # Longer shortest-literal first, then fewer alternatives
+    return (min(len(s) for s in clause), -len(clause))
+
+
+def _clauses(items, fold: bool) -> list:
+    clauses = []
+    run = []
+
+    def add(clause):
+        if clause and not (fold and not all(s.isascii() for s in clause)):
+            clauses.append(clause)
+
+    def flush():
+        if run:
+            add(frozenset({''.join(run)}))
+            run.clear()
+
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av).lower() if fold else chr(av))
+            continue
+        flush()
+        if op is sre_constants.SUBPATTERN:
+            _group, add_flags, del_flags, sub = av
+            if not (add_flags | del_flags) & re.IGNORECASE:
+                clauses.extend(_clauses(sub, fold))
+        elif op is sre_constants.BRANCH:
+            # One clause per alternation: the most selective clause of each branch, OR-ed together
+            best = [max(c, key=_selectivity) if c else None for c in (_clauses(b, fold) for b in av[1])]
+            if all(best):
+                add(frozenset().union(*best))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            low, _high, sub = av
+            if low >= 1:
+                clauses.extend(_clauses(sub, fold))
+    flush()
+    return clauses
+
+
+class ScanBudgetExceeded(Exception):
+    """A scan went over its ``ScanBudget``: ``reason`` is 'length' or 'time'. Treat the input as a match."""
+
+    def __init__(self, reason: str, limit):
+        super().__init__(f"scan budget exceeded: {reason} (limit {limit})")
+        self.reason = reason
+        self.limit = limit
+
+
+class ScanBudget:
+    """Limits on scanning one input: ``max_chars`` characters and ``max_ms`` of matching (None = unlimited).
+
+    The length is checked before any matching. The time budget is checked
+    between regex runs, so a scan can overrun it by at most one (linear) run.
+    """
+
+    __slots__ = ('max_chars', 'max_ms')
+
+    def __init__(self, max_chars: int | None = None, max_ms: float | None = None):
+        self.max_chars = max_chars
+        self.max_ms = max_ms
+
+    def check_length(self, text: str):
+        if self.max_chars is not None and len(text) > self.max_chars:
+            raise ScanBudgetExceeded('length', self.max_chars)
+
+    def start(self, text: str) -> float | None:
+        """Check the length of ``text``; the deadline (a perf_counter value) for scanning it, or None."""
+        self.check_length(text)
+        return None if self.max_ms is None else perf_counter() + self.max_ms / 1000
+
+    def check_time(self, deadline: float | None):
+        if deadline is not None and perf_counter() > deadline:
+            raise ScanBudgetExceeded('time', self.max_ms)
+
+
+def _is_wildcard_repeat(item) -> bool:
+    # .* / .+ / .*? ... : an unbounded repeat of any character
+    op, av = item
+    return (op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[1] == sre_constants.MAXREPEAT
+            and list(av[2]) == [(sre_constants.ANY, None)])
+
+
+def _backtracks(items, followed: bool = False, in_repeat: bool = False) -> bool:
+    """True if ``items`` has an unbounded wildcard repeat with pattern after it, or nested unbounded repeats."""
+    items = list(items)
+    for n, (op, av) in enumerate(items):
+        more = followed or n + 1 < len(items)
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            unbounded = av[1] == sre_constants.MAXREPEAT
+            if unbounded and (in_repeat or (more and _is_wildcard_repeat((op, av)))):
+                return True
+            if _backtracks(av[2], more, in_repeat or unbounded):
+                return True
+        elif op is sre_constants.SUBPATTERN:
+            if _backtracks(av[3], more, in_repeat):
+                return True
+        elif op is sre_constants.BRANCH:
+            if any(_backtracks(branch, more, in_repeat) for branch in av[1]):
+                return True
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if _backtracks(av[1], False, in_repeat):
+                return True
+    return False
+
+
+def backtracking_risk(pattern: str, flags: int = 0) -> bool:
+    """True if ``re`` can take superlinear time on ``pattern`` (a ``.*`` with more pattern after it, or ``(a+)+``)."""
+    return _backtracks(sre_parse.parse(pattern, flags))
+
+
+def _walk(items):
+    for op, av in items:
+        yield op, av
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            yield from _walk(av[2])
+        elif op is sre_constants.SUBPATTERN:
+            yield from _walk(av[3])
+        elif op is sre_constants.BRANCH:
+            for branch in av[1]:
+                yield from _walk(branch)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            yield from _walk(av[1])
+
+
+def _may_match_newline(state, items, flags: int) -> bool:
+    for op, av in _walk(items):
+        if op in (sre_constants.LITERAL, sre_constants.NOT_LITERAL, sre_constants.IN, sre_constants.ANY):
+            if sre_compile.compile(sre_parse.SubPattern(state, [(op, av)]), flags).match('\n'):
+                return True
+    return False
+
+
+def _sees_past_end(items) -> bool:
+    """True if a match of ``items`` may depend on text after its end: a lookaround, or an anchor other than a leading one."""
+    for n, (op, av) in enumerate(_walk(items)):
+        if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT) or (op is sre_constants.AT and n):
+            return True
+    return False
+
+
+def _trim(items) -> list:
+    """Drop what a neighbouring gap absorbs: leading and trailing unbounded repeats go down to their minimum count."""
+    items = list(items)
+    for end in (0, -1):
+        while items and items[end][0] in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) \
+                and items[end][1][1] == sre_constants.MAXREPEAT:
+            op, (low, _high, sub) = items[end]
+            if low:
+                items[end] = (op, (low, low, sub))
+                break
+            del items[end]
+    return items
+
+
+class SegmentChain:
+    """Linear-time search for a rule whose backtracking comes from top-level ``.*`` gaps.
+
+    ``S0 .* S1 .* S2`` is searched as: the match of S0 that ends first, then
+    the match of S1 that ends first from there (plus the gap's minimum width),
+    and so on. Each segment is searched once, from left to right; when its
+    leftmost match is wider than the segment's minimum width (``\\s+`` or
+    ``(ALL\\s+)?`` inside it), the first end is found by bisecting with
+    ``search(text, start, end)`` over at most ``MAX_BISECT`` extra characters,
+    so the further searches stay short whatever the input.
+    Leading and trailing repeats of a segment are trimmed to their minimum
+    count (the gap absorbs the rest), so a segment does not start a scan at
+    each character of a whitespace run.
+
+    This finds every match the original regex finds. When no segment can
+    match a line break, the chain is kept within one line and finds exactly
+    those, with two exceptions, where the next segment is searched from the
+    segment's minimum width and may overlap its match: a match more than
+    ``MAX_BISECT`` characters wider than the minimum (e.g. UNION, a long
+    whitespace run, ALL SELECT), and a variable-width segment whose match
+    depends on text past its end (a lookaround, or an anchor other than a
+    leading one), which cannot be bisected on a cut-off text; none of the
+    built-in rules has one. Otherwise (``\\s`` matches ``\\n``) a gap may
+    cross a line break, which ``.`` does not. In all these cases the chain can
+    flag an input the regex would pass, which is the safe direction for a
+    detector.
+    """
+
+    __slots__ = ('pattern', 'segments', 'single_line')
+
+    # Widest stretch past a segment's minimum width searched for its first end
+    MAX_BISECT = 256
+
+    def __init__(self, pattern: str, segments, single_line: bool = False):
+        self.pattern = pattern
+        # (compiled segment, minimum width, following gap's minimum width, bisect for the first end)
+        self.segments = tuple(segments)
+        self.single_line = single_line
+
+    @classmethod
+    def build(cls, pattern: str, flags: int = 0):
+        """The chain for ``pattern``, or None if it cannot be cut into segments that are safe on their own."""
+        parsed = sre_parse.parse(pattern, flags)
+        if any(op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS) for op, _ in _walk(parsed)):
+            return None
+        parts, gaps, current = [], [], []
+        for item in parsed:
+            if _is_wildcard_repeat(item):
+                parts.append(current)
+                gaps.append(item[1][0])
+                current = []
+            else:
+                current.append(item)
+        parts.append(current)
+        if len(parts) < 2:
+            return None
+        gaps.append(0)
+        segments = []
+        single_line = not (flags | parsed.state.flags) & re.DOTALL
+        for n, (part, gap) in enumerate(zip(parts, gaps)):
+            part = _trim(part)
+            if not part:
+                if segments:
+                    compiled, width, skip, bisect = segments[-1]
+                    segments[-1] = (compiled, width, skip + gap, bisect)
+                continue
+            anchors = [av for op, av in _walk(part) if op is sre_constants.AT]
+            if _backtracks(part) or (n and any(a in (sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING)
+                                              for a in anchors)):
+                return None
+            if single_line and _may_match_newline(parsed.state, part, flags):
+                single_line = False
+            sub = sre_parse.SubPattern(parsed.state, part)
+            low, high = sub.getwidth()
+            segments.append((sre_compile.compile(sub, flags), low, gap, low != high and not _sees_past_end(part)))
+        return cls(pattern, segments, single_line) if segments else None
+
+    def _first_end(self, compiled, width: int, bisect: bool, m, text: str) -> int:
+        """Where the first match of a segment to end, at or after ``m``'s start, ends (or a bound below it)."""
+        start, end = m.start(), m.end()
+        low = start + width
+        if not bisect or end == low or end - low > self.MAX_BISECT:
+            return low
+        # "Some match lies within text[start:e]" only turns true as e grows
+        while low < end:
+            mid = (low + end) // 2
+            if compiled.search(text, start, mid) is None:
+                low = mid + 1
+            else:
+                end = mid
+        return end
+
+    def search(self, text: str) -> bool:
+        if self.single_line and '\n' in text:
+            return self._search_lines(text)
+        pos = 0
+        for compiled, width, gap, bisect in self.segments:
+            m = compiled.search(text, pos)
+            if m is None:
+                return False
+            pos = self._first_end(compiled, width, bisect, m, text) + gap
+        return True
+
+    def _search_lines(self, text: str) -> bool:
+        # As search, but all segments on one line: when one is only found on a later line, start
+        # over from the beginning of that line (earlier lines cannot hold a match any more)
+        pos = n = 0
+        line_end = -1
+        segments = self.segments
+        while n < len(segments):
+            compiled, width, gap, bisect = segments[n]
+            m = compiled.search(text, pos)
+            if m is None:
+                return False
+            if n and m.start() > line_end:
+                pos, n = text.rfind('\n', 0, m.start()) + 1, 0
+                continue
+            if not n:
+                line_end = text.find('\n', m.start())
+                if line_end < 0:
+                    line_end = len(text)
+            pos = self._first_end(compiled, width, bisect, m, text) + gap
+            n += 1
+        return True
+
+
+class PatternSet:
+    """An ordered, compiled set of regex rules with stable IDs.
+
+    Rule IDs are ``<prefix>-NNN`` and follow the position of the pattern in the
+    source list (1-based), so they stay stable as long as the list is only
+    appended to; pass ``ids`` to name the rules explicitly instead.
+
+    ``is_match``/``scan`` expect the input to be lowercased when the set is
+    built with IGNORECASE (the app lowercases before detection anyway); other
+    input is still matched correctly, it just cannot use the prefilter.
+
+    Rules that would backtrack run as a ``SegmentChain`` and are left out of
+    the combined regex. Risky rules that cannot be cut at ``.*`` (nested
+    repeats such as ``(a+)+``) still run on ``re``; they are listed in
+    ``unguarded``, and only the ``ScanBudget`` bounds them.
+    """
+
+    # Above this many prefilter candidates, is_match runs the combined regex instead
+    MAX_INDIVIDUAL = 3
+    # Literal combinations whose candidate rules are remembered (the memo is cleared when full)
+    MAX_RESOLVED = 4096
+
+    def __init__(self, patterns, flags: int = 0, prefix: str = 'rule', ids=None):
+        self.patterns = tuple(patterns)
+        self.flags = flags
+        if ids is None:
+            self.ids = tuple(f"{prefix}-{i:03d}" for i in range(1, len(self.patterns) + 1))
+        else:
+            self.ids = tuple(ids)
+            if len(self.ids) != len(self.patterns):
+                raise ValueError(f"{len(self.ids)} rule IDs for {len(self.patterns)} patterns")
+        # Identifies the rule set; caches keyed on verdicts use it to notice rule changes
+        self.fingerprint = hashlib.sha1(repr((flags, self.patterns)).encode('utf-8')).hexdigest()[:16]
+        self._compiled = tuple(re.compile(p, flags) for p in self.patterns)
+
+        # Linear-time path for the rules that backtrack; the combined regex gets the rest
+        chains, unguarded = {}, []
+        for i, pattern in enumerate(self.patterns):
+            if backtracking_risk(pattern, flags):
+                chain = SegmentChain.build(pattern, flags)
+                if chain is None:
+                    unguarded.append(self.ids[i])
+                else:
+                    chains[i] = chain
+        self._chained = tuple(chains)
+        self._chained_set = frozenset(chains)
+        self.unguarded = tuple(unguarded)
+        self._search = tuple(chains[i].search if i in chains else compiled.search
+                             for i, compiled in enumerate(self._compiled))
+        direct = [p for i, p in enumerate(self.patterns) if i not in chains]
+        self._combined = re.compile(combine_patterns(direct), flags) if direct else None
+
+        # Prefilter tables: literal -> rules it may enable, each rule's clauses,
+        # and the rules without any literal requirement
+        self._fold = bool(flags & re.IGNORECASE)
+        self._requirements = tuple(required_literals(p, flags) for p in self.patterns)
+        by_literal = {}
+        for i, clauses in enumerate(self._requirements):
+            for lit in frozenset().union(*clauses):
+                by_literal.setdefault(lit, []).append(i)
+        self._literals = tuple(by_literal)
+        self._literal_rules = {lit: tuple(idx) for lit, idx in by_literal.items()}
+        self._unfiltered = tuple(i for i, clauses in enumerate(self._requirements) if not clauses)
+        self._resolved = {}
+
+        # Prefilter counters (approximate under concurrent updates; read via prefilter_stats)
+        self.prefilter_hits = 0      # literals found, candidate regexes were run
+        self.prefilter_skips = 0     # returned without running any regex
+        self.prefilter_bypass = 0    # input not eligible (e.g. non-ASCII under IGNORECASE)
+        self.regex_runs = 0
+
+    def __len__(self):
+        return len(self.patterns)
+
+    @property
+    def compiled(self) -> tuple:
+        """The compiled pattern of each rule, in rule order."""
+        return self._compiled
+
+    @property
+    def matchers(self) -> tuple:
+        """Per rule, in rule order, the ``search(text)`` the set runs it with (truthy on a match)."""
+        return self._search
+
+    def _candidates(self, text: str, literals=None) -> tuple | None:
+        """Indices of rules that may match ``text`` in rule order, or None if the prefilter can't decide.
+
+        ``literals`` narrows the literals looked for (``scan_many`` passes the ones present in the batch).
+        """
+        if self._fold:
+            if not text.isascii():
+                return None
+            hay = text.lower()
+        else:
+            hay = text
+        present = tuple(lit for lit in (self._literals if literals is None else literals) if lit in hay)
+        if not present:
+            return self._unfiltered
+        found = self._resolved.get(present)
+        if found is None:
+            touched = set()
+            for lit in present:
+                touched.update(self._literal_rules[lit])
+            present_set = set(present)
+            reqs = self._requirements
+            found = [i for i in touched if all(not present_set.isdisjoint(c) for c in reqs[i])]
+            found.extend(self._unfiltered)
+            found = tuple(sorted(found))
+            if len(self._resolved) >= self.MAX_RESOLVED:
+                self._resolved.clear()
+            self._resolved[present] = found
+        return found
+
+    def is_match(self, text: str, budget: ScanBudget | None = None) -> bool:
+        """True if any rule matches ``text``; raises ScanBudgetExceeded if ``budget`` runs out first."""
+        if not self.patterns:
+            return False
+        deadline = None if budget is None else budget.start(text)
+        cands = self._candidates(text)
+        if cands is None:
+            self.prefilter_bypass += 1
+            return self._any(text, self._chained, budget, deadline)
+        if not cands:
+            self.prefilter_skips += 1
+            return False
+        self.prefilter_hits += 1
+        if budget is not None:
+            budget.check_time(deadline)
+        if len(cands) > self.MAX_INDIVIDUAL:
+            # Many candidates: one pass of the combined regex beats several separate scans
+            return self._any(text, [i for i in cands if i in self._chained_set], budget, deadline)
+        search = self._search
+        for i in cands:
+            if budget is not None:
+                budget.check_time(deadline)
+            self.regex_runs += 1
+            if search[i](text):
+                return True
+        return False
+
+    def _any(self, text: str, chained, budget, deadline) -> bool:
+        # The combined regex, then the given chained rules
+        if self._combined is not None:
+            self.regex_runs += 1
+            if self._combined.search(text) is not None:
+                return True
+        search = self._search
+        for i in chained:
+            if budget is not None:
+                budget.check_time(deadline)
+            self.regex_runs += 1
+            if search[i](text):
+                return True
+        return False
+
+    def scan(self, text: str, budget: ScanBudget | None = None) -> tuple:
+        """Return the IDs of every rule matching ``text``, in rule order (raises ScanBudgetExceeded like is_match)."""
+        if not self.patterns:
+            return ()
+        return self._scan(text, None, budget)
+
+    def scan_many(self, texts, budget: ScanBudget | None = None) -> list:
+        """``scan`` for a batch of inputs, returning one tuple of rule IDs per input.
+
+        Duplicate inputs are scanned once, and the literal prefilter first looks
+        for each literal in the whole batch: literals that occur nowhere are not
+        searched for again in every item. ``budget`` applies to each input on
+        its own; one that goes over it gets None instead of a tuple.
+        """
+        verdicts = dict.fromkeys(texts)
+        if not self.patterns:
+            return [() for _ in texts]
+        eligible = [t for t in verdicts if t.isascii()] if self._fold else list(verdicts)
+        # Joining can only add matches across item boundaries, never hide one, so no literal
+        # that occurs in some item is dropped
+        hay = '\x00'.join(eligible)
+        if self._fold:
+            hay = hay.lower()
+        literals = [lit for lit in self._literals if lit in hay]
+        for text in verdicts:
+            try:
+                verdicts[text] = self._scan(text, literals, budget)
+            except ScanBudgetExceeded:
+                verdicts[text] = None
+        return [verdicts[t] for t in texts]
+
+    def _scan(self, text: str, literals, budget) -> tuple:
+        deadline = None if budget is None else budget.start(text)
+        cands = self._candidates(text, literals)
+        if cands is None:
+            if not self._any(text, self._chained, budget, deadline):
+                return ()
+            cands = range(len(self.patterns))
+        search = self._search
+        matched = []
+        for i in cands:
+            if budget is not None:
+                budget.check_time(deadline)
+            if search[i](text):
+                matched.append(self.ids[i])
+        return tuple(matched)
+
+    def prefilter_stats(self) -> dict:
+        """Counters showing how often the literal prefilter avoided running regexes."""
+        decided = self.prefilter_hits + self.prefilter_skips
+        return {
+            "rules": len(self.patterns),
+            "literals": len(self._literals),
+            "unfiltered_rules": len(self._unfiltered),
+            "linear_rules": len(self._chained),
+            "unguarded_rules": list(self.unguarded),
+            "hits": self.prefilter_hits,
+            "skips": self.prefilter_skips,
+            "bypassed": self.prefilter_bypass,
+            "regex_runs": self.regex_runs,
+            "skip_ratio": round(self.prefilter_skips / decided, 4) if decided else 0.0,
+        }
+
+
+def flatten_strings(doc, max_items: int | None = None) -> list:
+    """``(path, value)`` for every string in a decoded JSON document, in document order.
+
+    Walks object values and array elements like cipher-shield.js does for fetch
+    bodies (keys, numbers, booleans and nulls are not inspected). Paths look like
+    ``$.user.name`` / ``$.items[2]``. Raises ValueError once more than
+    ``max_items`` strings have been found.
+    """
+    out = []
+    stack = [('$', doc)]
+    while stack:
+        path, node = stack.pop()
+        if isinstance(node, str):
+            out.append((path, node))
+            if max_items is not None and len(out) > max_items:
+                raise ValueError(f"more than {max_items} strings")
+        elif isinstance(node, dict):
+            stack.extend((f"{path}.{k}", v) for k, v in reversed(node.items()))
+        elif isinstance(node, list):
+            stack.extend((f"{path}[{i}]", v) for i, v in reversed(list(enumerate(node))))
+    return out
@@ -0,0 +1,215 @@
+"""
+Minimal asyncio HTTP/1.1 server for ASGI applications.
+
+Used by ``python -m sentinelgate_lab.asgi`` and the async load test when no
+ASGI server (uvicorn, hypercorn) is installed; deploy behind a real one.
+It handles keep-alive connections one request at a time, Content-Length and
+chunked request bodies, responses with or without a Content-Length, and the
+ASGI lifespan protocol; requests beyond ``concurrency`` wait their turn
+in arrival order. There is no TLS, HTTP/2, WebSocket or pipelining.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import signal
+from http import HTTPStatus
+from urllib.parse import unquote
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_BYTES = 64 * 1024
+READ_CHUNK = 64 * 1024
+
+
+def _status_line(status: int) -> bytes:
+    try:
+        reason = HTTPStatus(status).phrase
+    except ValueError:
+        reason = ''
+    return f"HTTP/1.1 {status} {reason}\r\n".encode('latin-1')
+
+
+class _BodyReader:
+    """ASGI ``receive`` for one request: the body as it arrives, then a disconnect once the response is sent."""
+
+    def __init__(self, reader: asyncio.StreamReader, length: int | None, chunked: bool, finished: asyncio.Event):
+        self._reader = reader
+        self._remaining = length or 0
+        self._chunked = chunked
+        self._finished = finished
+        self.complete = not chunked and not self._remaining
+
+    async def _read_chunk(self) -> bytes:
+        size_line = await self._reader.readline()
+        size = int(size_line.split(b';', 1)[0].strip() or b'0', 16)
+        if size == 0:
+            while (await self._reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass   # trailers
+            self.complete = True
+            return b''
+        data = await self._reader.readexactly(size)
+        await self._reader.readline()
+        return data
+
+    async def __call__(self) -> dict:
+        if self.complete:
+            await self._finished.wait()
+            return {'type': 'http.disconnect'}
+        try:
+            if self._chunked:
+                data = await self._read_chunk()
+            else:
+                data = await self._reader.read(min(READ_CHUNK, self._remaining))
+                if not data:
+                    raise ConnectionResetError("client closed the connection mid-body")
+                self._remaining -= len(data)
+                self.complete = not self._remaining
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            self.complete = True
+            self._finished.set()
+            return {'type': 'http.disconnect'}
+        return {'type': 'http.request', 'body': data, 'more_body': not self.complete}
+
+
+async def _handle(app, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, server_addr,
+                  slots: asyncio.Semaphore):
+    peer = writer.get_extra_info('peername')
+    client = tuple(peer[:2]) if peer else None
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b'\r\n\r\n')
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except asyncio.LimitOverrunError:
+                writer.write(_status_line(431) + b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+                return
+            lines = head.decode('latin-1').split('\r\n')
+            try:
+                method, target, version = lines[0].split(' ', 2)
+            except ValueError:
+                writer.write(_status_line(400) + b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+                return
+            headers = []
+            for line in lines[1:]:
+                if line:
+                    name, _, value = line.partition(':')
+                    headers.append((name.strip().lower().encode('latin-1'), value.strip().encode('latin-1')))
+            fields = dict(headers)
+            connection = fields.get(b'connection', b'').lower()
+            keep_alive = connection != b'close' if version == 'HTTP/1.1' else connection == b'keep-alive'
+            chunked = b'chunked' in fields.get(b'transfer-encoding', b'').lower()
+            length = fields.get(b'content-length')
+            if not chunked and length is not None and not length.isdigit():
+                writer.write(_status_line(400) + b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+                return
+            path, _, query = target.partition('?')
+            finished = asyncio.Event()
+            receive = _BodyReader(reader, int(length) if length else None, chunked, finished)
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0', 'spec_version': '2.3'},
+                'http_version': version.partition('/')[2] or '1.1',
+                'method': method,
+                'scheme': 'http',
+                'path': unquote(path),
+                'raw_path': path.encode('latin-1'),
+                'query_string': query.encode('latin-1'),
+                'root_path': '',
+                'headers': headers,
+                'client': client,
+                'server': server_addr,
+            }
+            response = {'started': False, 'chunked': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    out = [_status_line(message['status'])]
+                    names = set()
+                    for name, value in message.get('headers', ()):
+                        names.add(name.lower())
+                        out.append(name + b': ' + value + b'\r\n')
+                    if b'content-length' not in names:
+                        response['chunked'] = True
+                        out.append(b'Transfer-Encoding: chunked\r\n')
+                    out.append(b'Connection: keep-alive\r\n\r\n' if keep_alive else b'Connection: close\r\n\r\n')
+                    writer.write(b''.join(out))
+                    response['started'] = True
+                elif message['type'] == 'http.response.body':
+                    body = message.get('body', b'')
+                    more = message.get('more_body', False)
+                    if response['chunked']:
+                        if body:
+                            writer.write(b'%x\r\n%s\r\n' % (len(body), body))
+                        if not more:
+                            writer.write(b'0\r\n\r\n')
+                    elif body:
+                        writer.write(body)
+                    await writer.drain()
+                    if not more:
+                        finished.set()
+
+            try:
+                async with slots:
+                    await app(scope, receive, send)
+            except Exception:
+                logger.exception("Error in ASGI application for %s %s", method, path)
+                if not response['started']:
+                    writer.write(_status_line(500) + b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+                keep_alive = False
+            finished.set()
+            await writer.drain()
+            # A body the app did not read would be parsed as the next request
+            if not keep_alive or not receive.complete:
+                return
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def _lifespan(app, queue: asyncio.Queue, done: asyncio.Queue):
+    async def receive():
+        return await queue.get()
+
+    async def send(message):
+        await done.put(message)
+    try:
+        await app({'type': 'lifespan', 'asgi': {'version': '3.0'}}, receive, send)
+    except Exception:
+        logger.debug("Application does not support lifespan", exc_info=True)
+    await done.put(None)
+
+
+async def serve_async(app, host: str = '127.0.0.1', port: int = 8000, backlog: int = 2048, concurrency: int = 64):
+    """Serve ``app`` until SIGINT/SIGTERM, running its lifespan startup and shutdown.
+
+    At most ``concurrency`` requests are inside the app at once; the rest wait
+    in arrival order, which keeps tail latency close to the median under overload.
+    """
+    queue, done = asyncio.Queue(), asyncio.Queue()
+    lifespan = asyncio.create_task(_lifespan(app, queue, done))
+    await queue.put({'type': 'lifespan.startup'})
+    message = await done.get()
+    if message is not None and message['type'] == 'lifespan.startup.failed':
+        raise RuntimeError(f"Application startup failed: {message.get('message', '')}")
+
+    slots = asyncio.Semaphore(concurrency)
+    server = await asyncio.start_server(lambda r, w: _handle(app, r, w, (host, port), slots), host, port,
+                                        backlog=backlog, limit=MAX_HEADER_BYTES)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    logger.info("Serving on http://%s:%s", host, port)
+    async with server:
+        await stop.wait()
+    if message is not None:
+        await queue.put({'type': 'lifespan.shutdown'})
+        await done.get()
+    await lifespan
+
+
+def serve(app, host: str = '127.0.0.1', port: int = 8000, backlog: int = 2048, concurrency: int = 64):
+    asyncio.run(serve_async(app, host, port, backlog, concurrency))
@@ -0,0 +1,279 @@
+"""
+Streaming inspection of JSON request bodies, in front of the Flask views.
+
+``JSONBodyInspector`` is WSGI middleware. For the configured paths it reads a
+JSON body from ``wsgi.input`` in chunks and walks it with
+``jsonstream.iter_json_strings`` (size, depth and string-length limits checked
+as the bytes arrive) before the view parses it with ``request.json``. On a
+``block`` path the string values the view reads (``fields``; every one if the
+path has none listed) go through the detector as soon as they are complete,
+and the first malicious one ends the request: the rest of the body is neither
+read nor parsed. It is answered with the view's own reply to such input where
+the app supplies one (``refusal``), else with a 403. ``limits`` paths only get
+the limits, which apply to the whole body either way.
+
+Bodies that pass are handed to the app unchanged through a ``BodyBuffer``:
+the chunks already read are replayed as they are (no join into one buffer),
+and only a body larger than ``spool_bytes`` goes to a temporary file.
+``middleware.py`` reuses the same plumbing for its form and JSON bodies.
+"""
+import collections
+import io
+import json
+import tempfile
+import threading
+
+from .jsonstream import JSONLimitError, iter_json_strings
+
+INSPECTION_MODES = ('block', 'limits')
+
+
+def _json_response(start_response, status: str, payload: dict, headers=()):
+    body = json.dumps(payload).encode('utf-8')
+    start_response(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(body))), *headers])
+    return [body]
+
+
+def iter_body(environ, chunk_size: int = 64 * 1024):
+    """Yield a WSGI request body in chunks of at most ``chunk_size`` bytes, up to its Content-Length."""
+    stream = environ['wsgi.input']
+    length = environ.get('CONTENT_LENGTH')
+    remaining = int(length) if length else (None if environ.get('wsgi.input_terminated') else 0)
+    while remaining is None or remaining > 0:
+        data = stream.read(chunk_size if remaining is None else min(chunk_size, remaining))
+        if not data:
+            break
+        if remaining is not None:
+            remaining -= len(data)
+        yield data
+
+
+class ChunkStream(io.RawIOBase):
+    """Readable binary stream over byte chunks that were already read from the client.
+
+    A read that falls within one chunk returns the chunk (or a slice of it) as
+    it is, so replaying an inspected body does not join it into a second buffer.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = collections.deque(chunk for chunk in chunks if chunk)
+        self._offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def _take(self, size: int) -> bytes:
+        chunk = self._chunks[0]
+        if self._offset == 0 and size >= len(chunk):
+            self._chunks.popleft()
+            return chunk
+        end = min(len(chunk), self._offset + size)
+        data = chunk[self._offset:end]
+        if end == len(chunk):
+            self._chunks.popleft()
+            self._offset = 0
+        else:
+            self._offset = end
+        return data
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return self.readall()
+        # Fill the request like a file would; only a read spanning chunks joins them
+        parts = []
+        while size > 0 and self._chunks:
+            parts.append(self._take(size))
+            size -= len(parts[-1])
+        return parts[0] if len(parts) == 1 else b''.join(parts)
+
+    def readall(self) -> bytes:
+        parts = []
+        while self._chunks:
+            parts.append(self._take(len(self._chunks[0])))
+        return b''.join(parts)
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast('B')
+        filled = 0
+        while filled < len(view) and self._chunks:
+            data = self._take(len(view) - filled)
+            view[filled:filled + len(data)] = data
+            filled += len(data)
+        return filled
+
+    def readline(self, size: int = -1) -> bytes:
+        parts = []
+        while self._chunks and size != 0:
+            chunk = self._chunks[0]
+            newline = chunk.find(b'\n', self._offset)
+            take = len(chunk) - self._offset if newline < 0 else newline + 1 - self._offset
+            if size > 0:
+                take = min(take, size)
+                size -= take
+            parts.append(self._take(take))
+            if newline >= 0 and parts[-1].endswith(b'\n'):
+                break
+        return b''.join(parts)
+
+
+class BodyBuffer:
+    """The chunks of a body being inspected, kept to hand the body to the app afterwards.
+
+    Up to ``spool_bytes`` the chunks are kept as they are and replayed through
+    a ``ChunkStream``; a larger body is moved to a temporary file.
+    """
+
+    def __init__(self, spool_bytes: int = 1024 * 1024):
+        self.spool_bytes = spool_bytes
+        self.size = 0
+        self._chunks = []
+        self._file = None
+
+    def append(self, data: bytes):
+        self.size += len(data)
+        if self._file is not None:
+            self._file.write(data)
+        elif self.size > self.spool_bytes:
+            self._file = tempfile.TemporaryFile()
+            for chunk in self._chunks:
+                self._file.write(chunk)
+            self._file.write(data)
+            self._chunks = None
+        else:
+            self._chunks.append(data)
+
+    def stream(self):
+        """A readable stream of the whole body, positioned at its start."""
+        if self._file is not None:
+            self._file.seek(0)
+            return self._file
+        return ChunkStream(self._chunks)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        self._chunks = None
+
+    def hand_over(self, environ):
+        """Put the buffered body back as the request's ``wsgi.input``."""
+        environ['wsgi.input'] = self.stream()
+        environ['CONTENT_LENGTH'] = str(self.size)
+
+
+class JSONBodyInspector:
+    """WSGI middleware that inspects JSON bodies of ``routes`` ({path: 'block' | 'limits'}) while they stream in.
+
+    ``is_malicious(value)`` is the detector for block paths. ``admit(environ)``,
+    if given, is called for every request the middleware answers itself and
+    returns False when the client is over its rate limit (answered with 429).
+    ``fields`` ({path: JSON paths such as ``'$.message'``}) limits the detector
+    to the values a path's view reads. ``refusal(path, value)``, if given,
+    returns the view's own ``(status, payload, headers)`` for a malicious
+    value, or None for the default 403.
+    """
+
+    def __init__(self, app, routes: dict, is_malicious, admit=None, fields=None, refusal=None,
+                 max_bytes: int = 16 * 1024 * 1024, max_depth: int = 64, max_string: int = 1024 * 1024,
+                 chunk_size: int = 64 * 1024, spool_bytes: int = 1024 * 1024):
+        for path, mode in routes.items():
+            if mode not in INSPECTION_MODES:
+                raise ValueError(f"Unknown inspection mode {mode!r} for {path}; expected one of {INSPECTION_MODES}")
+        self.app = app
+        self.routes = dict(routes)
+        self.is_malicious = is_malicious
+        self.admit = admit
+        self.fields = {path: frozenset(paths) for path, paths in (fields or {}).items()}
+        self.refusal = refusal
+        self.max_bytes = max_bytes
+        self.max_depth = max_depth
+        self.max_string = max_string
+        self.chunk_size = chunk_size
+        self.spool_bytes = spool_bytes
+        self._lock = threading.Lock()
+        self.inspected = 0
+        self.blocked = 0
+        self.too_large = 0
+        self.malformed = 0
+        self.rate_limited = 0
+
+    def count(self, counter: str):
+        """Increment one of the counters reported by ``stats()``."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _body_chunks(self, environ, body: BodyBuffer):
+        """Yield the request body in chunks, keeping each in ``body``."""
+        for data in iter_body(environ, self.chunk_size):
+            body.append(data)
+            yield data
+
+    def refused(self, path: str, value_path: str, value: str) -> tuple:
+        """(status, payload, headers) answering a malicious ``value``: the path's ``refusal``, else a 403."""
+        reply = self.refusal(path, value) if self.refusal is not None else None
+        if reply is not None:
+            return reply
+        return '403 Forbidden', {
+            "status": "error",
+            "message": f"Request blocked: possible injection in {value_path}",
+            "path": value_path,
+        }, ()
+
+    def _answer(self, environ, start_response, counter: str, status: str, payload: dict, headers=()):
+        if self.admit is not None and not self.admit(environ):
+            self.count('rate_limited')
+            return _json_response(start_response, '429 Too Many Requests',
+                                  {"status": "error", "message": "Too many requests"})
+        self.count(counter)
+        return _json_response(start_response, status, payload, headers)
+
+    def _reject(self, environ, start_response, counter: str, status: str, payload: dict):
+        return self._answer(environ, start_response, counter, status, {"status": "error", **payload})
+
+    def __call__(self, environ, start_response):
+        route = environ.get('PATH_INFO', '')
+        mode = self.routes.get(route)
+        content_type = environ.get('CONTENT_TYPE', '').split(';', 1)[0].strip().lower()
+        if (mode is None or environ.get('REQUEST_METHOD') != 'POST'
+                or not (content_type == 'application/json' or content_type.endswith('+json'))):
+            return self.app(environ, start_response)
+
+        length = environ.get('CONTENT_LENGTH')
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            return self._reject(environ, start_response, 'too_large', '413 Payload Too Large',
+                                {"message": f"Body larger than {self.max_bytes} bytes"})
+
+        self.count('inspected')
+        wanted = self.fields.get(route)
+        body = BodyBuffer(self.spool_bytes)
+        try:
+            values = iter_json_strings(self._body_chunks(environ, body), max_bytes=self.max_bytes,
+                                       max_depth=self.max_depth, max_string=self.max_string)
+            for path, value in values:
+                if mode == 'block' and (wanted is None or path in wanted) and self.is_malicious(value):
+                    body.close()
+                    return self._answer(environ, start_response, 'blocked', *self.refused(route, path, value))
+        except JSONLimitError as e:
+            body.close()
+            return self._reject(environ, start_response, 'too_large', '413 Payload Too Large',
+                                {"message": f"Request body rejected: {e}"})
+        except ValueError as e:
+            body.close()
+            return self._reject(environ, start_response, 'malformed', '400 Bad Request',
+                                {"message": f"Invalid JSON: {e}"})
+
+        body.hand_over(environ)
+        return self.app(environ, start_response)
+
+    def stats(self) -> dict:
+        return {
+            "routes": self.routes,
+            "fields": {path: sorted(paths) for path, paths in self.fields.items()},
+            "max_bytes": self.max_bytes,
+            "max_depth": self.max_depth,
+            "max_string": self.max_string,
+            "inspected": self.inspected,
+            "blocked": self.blocked,
+            "too_large": self.too_large,
+            "malformed": self.malformed,
+            "rate_limited": self.rate_limited,
+        }
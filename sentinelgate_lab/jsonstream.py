@@ -0,0 +1,292 @@
+"""
+Incremental JSON reader: yields the string values of a document as its bytes arrive.
+
+``JSONStringReader`` is fed a JSON body chunk by chunk and returns
+``(path, value)`` for every string value as soon as it is complete;
+``iter_json_strings`` does the same over an iterable of byte chunks. Both give
+the same pairs, in the same order, as
+``detection.flatten_strings(json.loads(body))`` without building the
+document. Only the unconsumed tail of the current chunk and the string being
+read are held in memory, so a caller that stops at the first bad value
+never reads (or allocates) the rest of the body.
+
+Limits are enforced while reading: total bytes, nesting depth, and the length
+of any single string (checked before its closing quote arrives). Exceeding one
+raises ``JSONLimitError``; malformed JSON raises ``ValueError``.
+
+The structure is walked token by token, but an object or array that is
+already complete in the buffer (typically one record of a large array) is
+decoded in one call to the json module's C scanner and walked as a small
+Python object, which is several times faster than tokenizing it here.
+"""
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from json.decoder import scanstring
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?')
+_NUMBER_CHARS = re.compile(r'[-+0-9.eE]*')
+# Body of a string up to its closing quote (unrolled so long strings don't backtrack)
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+_LITERALS = ('true', 'false', 'null')
+# Longest number accepted; json.loads rejects integers over 4300 digits anyway
+_MAX_NUMBER_CHARS = 4400
+
+# Parser states
+_VALUE, _FIRST_VALUE, _KEY, _FIRST_KEY, _COLON, _AFTER_VALUE, _DONE = range(7)
+
+
+class JSONLimitError(ValueError):
+    """The body exceeds a size, depth or string-length limit."""
+
+
+def _reject_constant(name):
+    raise ValueError(f"{name} is not valid JSON")
+
+
+# Decodes one complete value at an offset; NaN/Infinity are rejected like in the tokenizer
+_scan_once = json.JSONDecoder(parse_constant=_reject_constant).scan_once
+
+
+def _strings(node, path: str, depth: int, max_depth: int, max_string: int | None) -> list:
+    """``(path, value)`` for the strings of a decoded value whose container sits ``depth`` levels deep."""
+    out = []
+    stack = [(path, node, depth)]
+    while stack:
+        path, node, depth = stack.pop()
+        if isinstance(node, str):
+            if max_string is not None and len(node) > max_string:
+                raise JSONLimitError(f"string longer than {max_string} characters at {path}")
+            out.append((path, node))
+        elif isinstance(node, dict):
+            if depth >= max_depth:
+                raise JSONLimitError(f"nesting deeper than {max_depth} at {path}")
+            stack.extend((f"{path}.{k}", v, depth + 1) for k, v in reversed(node.items()))
+        elif isinstance(node, list):
+            if depth >= max_depth:
+                raise JSONLimitError(f"nesting deeper than {max_depth} at {path}")
+            stack.extend((f"{path}[{i}]", v, depth + 1) for i, v in reversed(list(enumerate(node))))
+    return out
+
+
+class JSONStringReader:
+    """Push-style reader: ``feed()`` the body's bytes as they arrive, then ``close()``.
+
+    Each call returns the ``(path, value)`` pairs completed by that input, so
+    the reader works the same whether the chunks come from a blocking stream
+    or from an ASGI ``receive()``. Object keys, numbers, booleans and nulls are
+    validated but not returned. Paths look like ``$.user.name`` / ``$.items[2]``.
+    """
+
+    def __init__(self, max_bytes: int | None = None, max_depth: int = 64, max_string: int | None = None):
+        self.max_bytes = max_bytes
+        self.max_depth = max_depth
+        self.max_string = max_string
+        self.received = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        # Open containers: [is_object, key or index]; a path part is built from each
+        self._stack = []
+        self._state = _VALUE
+        # A string longer than the buffered text is collected piece by piece and
+        # joined once its closing quote arrives, instead of re-joining and
+        # re-scanning a growing buffer per chunk
+        self._pieces = None
+        self._length = 0
+        self._skip = 0
+        # Error found after some values of the same input; raised on the next call
+        self._error = None
+
+    def _path(self) -> str:
+        return '$' + ''.join(f".{part}" if is_object else f"[{part}]" for is_object, part in self._stack)
+
+    def feed(self, data: bytes) -> list:
+        """Add the next chunk of the body; return the string values it completed."""
+        if self._eof:
+            raise ValueError("feed() after close()")
+        if self._error is not None:
+            raise self._error
+        self.received += len(data)
+        if self.max_bytes is not None and self.received > self.max_bytes:
+            raise JSONLimitError(f"body larger than {self.max_bytes} bytes")
+        return self._add(self._decoder.decode(data))
+
+    def close(self) -> list:
+        """Mark the end of the body; return the remaining values or raise if the document is incomplete."""
+        if self._error is not None:
+            raise self._error
+        self._eof = True
+        return self._add(self._decoder.decode(b'', final=True))
+
+    def _add(self, text: str) -> list:
+        if self._pieces is not None:
+            piece = text
+            self._pieces.append(piece)
+            self._length += len(piece)
+            end = _STRING_BODY.match(piece, min(self._skip, len(piece))).end() if piece else 0
+            closed = False
+            if end < len(piece):
+                if piece[end] == '"':
+                    closed = True
+                else:
+                    self._skip = 1   # the piece ended in a lone backslash
+            elif piece:
+                self._skip = 0
+            if not closed and not self._eof:
+                if self.max_string is not None and self._length > self.max_string:
+                    raise JSONLimitError(f"string longer than {self.max_string} characters at {self._path()}")
+                return []
+            self._buf = ''.join(self._pieces)
+            self._pos = 0
+            self._pieces = None
+        else:
+            self._buf = self._buf[self._pos:] + text
+            self._pos = 0
+        out = []
+        try:
+            self._run(out)
+        except ValueError as e:
+            if not out:
+                raise
+            # Report the values before the error first, as a pull parser would
+            self._error = e
+        return out
+
+    def _run(self, out: list):
+        """Consume the buffered text into ``out`` until a token needs more input."""
+        buf, pos, stack, state, eof = self._buf, self._pos, self._stack, self._state, self._eof
+        max_depth, max_string = self.max_depth, self.max_string
+        while True:
+            # Make sure the next token is complete in buf (or that the input has ended)
+            pos = _WHITESPACE.match(buf, pos).end()
+            need_more = pos >= len(buf)
+            if not need_more:
+                c = buf[pos]
+                if c == '"':
+                    end = _STRING_BODY.match(buf, pos + 1).end()
+                    if end >= len(buf) or buf[end] != '"':
+                        if eof:
+                            raise ValueError(f"unterminated string at {self._path()}")
+                        self._pieces = [buf[pos:]]
+                        self._length = len(buf) - pos - 1
+                        self._skip = 1 if end < len(buf) else 0
+                        if max_string is not None and self._length > max_string:
+                            raise JSONLimitError(f"string longer than {max_string} characters at {self._path()}")
+                        buf, pos = '', 0
+                        break
+                elif c in '-0123456789':
+                    need_more = _NUMBER_CHARS.match(buf, pos).end() >= len(buf)
+                    if need_more and len(buf) - pos > _MAX_NUMBER_CHARS:
+                        raise ValueError(f"number too long at {self._path()}")
+                elif c in 'tfn':
+                    need_more = len(buf) - pos < 5 and any(
+                        lit.startswith(buf[pos:]) and lit != buf[pos:pos + len(lit)] for lit in _LITERALS)
+            if need_more and not eof:
+                break
+            if pos >= len(buf):
+                if state == _DONE:
+                    break
+                raise ValueError("unexpected end of JSON input")
+            if state == _DONE:
+                raise ValueError("extra data after the JSON document")
+
+            c = buf[pos]
+            if state == _COLON:
+                if c != ':':
+                    raise ValueError(f"expected ':' at {self._path()}")
+                pos += 1
+                state = _VALUE
+                continue
+            if state == _AFTER_VALUE:
+                top = stack[-1]
+                if c == ',':
+                    pos += 1
+                    if top[0]:
+                        state = _KEY
+                    else:
+                        top[1] += 1
+                        state = _VALUE
+                elif c == ('}' if top[0] else ']'):
+                    pos += 1
+                    stack.pop()
+                    state = _AFTER_VALUE if stack else _DONE
+                else:
+                    raise ValueError(f"expected ',' or closing bracket at {self._path()}")
+                continue
+            if state in (_KEY, _FIRST_KEY):
+                if c == '}' and state == _FIRST_KEY:
+                    pos += 1
+                    stack.pop()
+                    state = _AFTER_VALUE if stack else _DONE
+                    continue
+                if c != '"':
+                    raise ValueError(f"expected an object key at {self._path()}")
+                key, pos = scanstring(buf, pos + 1, True)
+                stack[-1][1] = key
+                state = _COLON
+                continue
+
+            # _VALUE / _FIRST_VALUE
+            if c == ']' and state == _FIRST_VALUE:
+                pos += 1
+                stack.pop()
+                state = _AFTER_VALUE if stack else _DONE
+            elif c == '"':
+                value, end = scanstring(buf, pos + 1, True)
+                if max_string is not None and end - pos - 2 > max_string:
+                    raise JSONLimitError(f"string longer than {max_string} characters at {self._path()}")
+                pos = end
+                state = _AFTER_VALUE if stack else _DONE
+                out.append((self._path(), value))
+            elif c == '{' or c == '[':
+                try:
+                    value, end = _scan_once(buf, pos)
+                except (ValueError, StopIteration, RecursionError):
+                    pass   # incomplete in the buffer (or malformed): tokenize it
+                else:
+                    out.extend(_strings(value, self._path(), len(stack), max_depth, max_string))
+                    pos = end
+                    state = _AFTER_VALUE if stack else _DONE
+                    continue
+                if len(stack) >= max_depth:
+                    raise JSONLimitError(f"nesting deeper than {max_depth} at {self._path()}")
+                pos += 1
+                if c == '{':
+                    stack.append([True, None])
+                    state = _FIRST_KEY
+                else:
+                    stack.append([False, 0])
+                    state = _FIRST_VALUE
+            elif c in '-0123456789':
+                number = _NUMBER.match(buf, pos)
+                if number is None or number.end() != _NUMBER_CHARS.match(buf, pos).end():
+                    raise ValueError(f"malformed number at {self._path()}")
+                pos = number.end()
+                state = _AFTER_VALUE if stack else _DONE
+            else:
+                for lit in _LITERALS:
+                    if buf.startswith(lit, pos):
+                        pos += len(lit)
+                        break
+                else:
+                    raise ValueError(f"unexpected character {c!r} at {self._path()}")
+                state = _AFTER_VALUE if stack else _DONE
+        self._buf, self._pos, self._state = buf, pos, state
+
+
+def iter_json_strings(chunks, max_bytes: int | None = None, max_depth: int = 64,
+                      max_string: int | None = None):
+    """Yield ``(path, value)`` for each string value of the JSON document in ``chunks`` (bytes).
+
+    Pull-style wrapper around ``JSONStringReader``: the next chunk is only read
+    once the values of the previous one have been consumed.
+    """
+    reader = JSONStringReader(max_bytes=max_bytes, max_depth=max_depth, max_string=max_string)
+    for chunk in chunks:
+        yield from reader.feed(chunk)
+    yield from reader.close()
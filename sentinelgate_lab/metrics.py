@@ -0,0 +1,268 @@
+"""
+Per-request stage timings, ``Server-Timing`` headers and Prometheus metrics.
+
+``start_request()`` begins a ``RequestTiming`` for the current request; code
+handling it times its stages with ``with stage('sqlite'):`` (or adds a
+duration measured elsewhere, like the detector's own timings), and
+``finish_request()`` hands it back when the response goes out, to be written
+to a ``Server-Timing`` header and folded into ``Metrics``:
+
+- fixed-bucket histograms of the request duration per endpoint and of each
+  stage per endpoint (buckets shared by all series, so aggregating them is
+  meaningful),
+- counters of requests per endpoint and status, of requests refused by
+  detection, and of 429s.
+
+``Metrics.render()`` produces the Prometheus text exposition format (0.0.4).
+Counts are per process: with ``gunicorn -w N`` each worker reports its own,
+so scrape workers individually or sum over the instances.
+
+Recording costs two perf_counter calls per stage, a bisect per stage and
+one lock acquisition per request (``python -m benchmarks.bench_metrics``).
+"""
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+# Upper bounds in seconds (Prometheus ``le``), from 50 us to 2.5 s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``counts[i]`` is the number of observations in bucket i (the last is +Inf)."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self):
+        """(le, cumulative count) pairs, ending with ('+Inf', count)."""
+        total = 0
+        out = []
+        for le, n in zip((*map(_format_float, self.buckets), '+Inf'), self.counts):
+            total += n
+            out.append((le, total))
+        return out
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+class RequestTiming:
+    """Stage durations (seconds) of one request, in the order the stages first ran.
+
+    It is also the context manager that times them (``with timing.stage(name):``).
+    A request's stages run one after another, never nested, so the open stage
+    is two plain fields here rather than an object allocated per stage.
+    """
+
+    __slots__ = ('endpoint', 'start', 'stages', 'blocked', '_name', '_mark')
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.stages = {}
+        self.blocked = False
+        self._name = None
+        self.start = perf_counter()
+
+    def stage(self, name: str) -> RequestTiming:
+        self._name = name
+        return self
+
+    def __enter__(self):
+        self._mark = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = perf_counter() - self._mark
+        stages = self.stages
+        stages[self._name] = stages.get(self._name, 0.0) + seconds
+        return False
+
+    def add(self, name: str, seconds: float):
+        stages = self.stages
+        stages[name] = stages.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return perf_counter() - self.start
+
+    def server_timing(self, total: float) -> str:
+        """``Server-Timing`` header value, durations in milliseconds."""
+        parts = ['%s;dur=%.3f' % (name, seconds * 1000) for name, seconds in self.stages.items()]
+        parts.append('total;dur=%.3f' % (total * 1000))
+        return ', '.join(parts)
+
+
+# The timing of the request being handled in this thread / task (a ContextVar is much
+# cheaper to reach from a view than flask.g, which matters at a few microseconds a request)
+_current = ContextVar('sentinelgate_request_timing', default=None)
+
+
+def start_request(endpoint: str) -> RequestTiming:
+    timing = RequestTiming(endpoint)
+    _current.set(timing)
+    return timing
+
+
+def current_timing():
+    """The ``RequestTiming`` of the current request, or None outside one (or with metrics off)."""
+    return _current.get()
+
+
+def finish_request():
+    """Detach and return the current request's timing (None if there is none)."""
+    timing = _current.get()
+    if timing is not None:
+        _current.set(None)
+    return timing
+
+
+def stage(name: str):
+    """Time a block as one stage of the current request: ``with stage('sqlite'): ...`` (no-op outside one)."""
+    timing = _current.get()
+    if timing is None:
+        return NULL_STAGE
+    timing._name = name
+    return timing
+
+
+class _Series:
+    """Histograms of one endpoint: the whole request, and each stage by name."""
+
+    __slots__ = ('total', 'stages')
+
+    def __init__(self, buckets):
+        self.total = Histogram(buckets)
+        self.stages = {}
+
+
+class Metrics:
+    """Request counters and duration histograms for a process."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.requests = {}        # (endpoint, status) -> count
+        self.blocked = {}         # endpoint -> requests refused by detection
+        self.rate_limited = {}    # endpoint -> 429 responses
+        self.series = {}          # endpoint -> _Series
+
+    def record(self, timing: RequestTiming, status: int, total: float):
+        endpoint = timing.endpoint
+        key = (endpoint, status)
+        buckets = self.buckets
+        with self._lock:
+            requests = self.requests
+            requests[key] = requests.get(key, 0) + 1
+            if timing.blocked:
+                self.blocked[endpoint] = self.blocked.get(endpoint, 0) + 1
+            if status == 429:
+                self.rate_limited[endpoint] = self.rate_limited.get(endpoint, 0) + 1
+            series = self.series.get(endpoint)
+            if series is None:
+                series = self.series[endpoint] = _Series(self.buckets)
+            # Histogram.observe, inlined: one call less per stage
+            histogram = series.total
+            histogram.counts[bisect_left(buckets, total)] += 1
+            histogram.sum += total
+            histogram.count += 1
+            histograms = series.stages
+            for name, seconds in timing.stages.items():
+                histogram = histograms.get(name)
+                if histogram is None:
+                    histogram = histograms[name] = Histogram(buckets)
+                histogram.counts[bisect_left(buckets, seconds)] += 1
+                histogram.sum += seconds
+                histogram.count += 1
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.blocked.clear()
+            self.rate_limited.clear()
+            self.series.clear()
+
+    def render(self, extra=()) -> str:
+        """Prometheus text format. ``extra``: (name, help, label, {label value: count}) counters to append."""
+        with self._lock:
+            requests = dict(self.requests)
+            blocked = dict(self.blocked)
+            rate_limited = dict(self.rate_limited)
+            durations = {e: _copy(series.total) for e, series in self.series.items()}
+            stage_durations = {(e, name): _copy(h) for e, series in self.series.items()
+                               for name, h in series.stages.items()}
+        lines = []
+        _counter(lines, 'sentinelgate_requests_total', 'Requests handled, by endpoint and status.',
+                 [((('endpoint', e), ('status', str(s))), n) for (e, s), n in sorted(requests.items())])
+        _counter(lines, 'sentinelgate_blocked_total', 'Requests refused because detection flagged the input.',
+                 [((('endpoint', e),), n) for e, n in sorted(blocked.items())])
+        _counter(lines, 'sentinelgate_rate_limited_total', 'Requests answered 429 Too Many Requests.',
+                 [((('endpoint', e),), n) for e, n in sorted(rate_limited.items())])
+        _histograms(lines, 'sentinelgate_request_duration_seconds', 'Request duration, by endpoint.',
+                    [((('endpoint', e),), h) for e, h in sorted(durations.items())])
+        _histograms(lines, 'sentinelgate_stage_duration_seconds', 'Duration of one request stage, by endpoint.',
+                    [((('endpoint', e), ('stage', name)), h) for (e, name), h in sorted(stage_durations.items())])
+        for name, help_text, label, values in extra:
+            _counter(lines, name, help_text, [(((label, str(v)),), n) for v, n in values.items()])
+        return '\n'.join(lines) + '\n'
+
+
+def _copy(histogram: Histogram) -> Histogram:
+    copy = Histogram(histogram.buckets)
+    copy.counts = list(histogram.counts)
+    copy.sum = histogram.sum
+    copy.count = histogram.count
+    return copy
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs) -> str:
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+
+def _counter(lines, name, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for labels, value in samples:
+        lines.append(f"{name}{{{_labels(labels)}}} {value}")
+
+
+def _histograms(lines, name, help_text, series):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in series:
+        label_text = _labels(labels)
+        for le, count in histogram.cumulative():
+            lines.append(f'{name}_bucket{{{label_text},le="{le}"}} {count}')
+        lines.append(f"{name}_sum{{{label_text}}} {_format_float(histogram.sum)}")
+        lines.append(f"{name}_count{{{label_text}}} {histogram.count}")
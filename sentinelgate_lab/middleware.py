@@ -0,0 +1,419 @@
+"""
+Drop-in injection filter for any WSGI or ASGI application.
+
+``SentinelGate`` (WSGI) and ``SentinelGateASGI`` (ASGI 3) run the compiled
+rule sets over the parts of a request an injection usually arrives in - the
+query string, selected headers, url-encoded form fields and the string values
+of a JSON body - before the wrapped app sees it::
+
+    app.wsgi_app = SentinelGate(app.wsgi_app, paths=[('/static/*', 'allow'), ('/search', 'tag')])
+    asgi_app = SentinelGateASGI(asgi_app, action='tag')
+
+What happens is decided per path (``fnmatch`` patterns tried in order, the
+first match wins, ``action`` applies to the rest):
+
+  block  inspect; the first finding ends the request with a 403
+  tag    inspect everything and let the request through, with the findings in
+         ``environ`` / ``scope`` under ``'sentinelgate.findings'`` and an
+         ``X-SentinelGate`` response header
+  allow  pass through uninspected
+  deny   answer 403 without inspecting
+
+Bodies are only read for form and JSON content types on inspected paths, and
+are inspected chunk by chunk as they arrive (``jsonstream.JSONStringReader``
+for JSON, ``&``-separated fields for forms): a blocked request's body is not
+read past the bad value, and one that passes is replayed to the app from the
+chunks already read (``inspection.BodyBuffer``) rather than from a copy.
+Bodies over the limits get a 413 and malformed JSON a 400 on every inspected
+path. Other requests and bodies reach the app untouched.
+
+Only values are inspected, not query, form or JSON keys. The default detector
+is the built-in SQL and prompt rule sets; ``rule_detector(manager)`` follows a
+``RulePackManager`` instead, and any ``detect(text) -> rule IDs`` callable
+works. The app's apostrophe heuristic is left out: it is tuned for the demo
+chatbot and would flag a name like O'Brien on an arbitrary app.
+"""
+from __future__ import annotations
+
+import fnmatch
+import json
+import re
+import threading
+from collections import deque
+from urllib.parse import parse_qsl
+
+from . import rules as builtin_rules
+from .cache import VerdictCache
+from .detection import ScanBudgetExceeded
+from .inspection import BodyBuffer, _json_response, iter_body
+from .jsonstream import JSONLimitError, JSONStringReader
+
+GATE_ACTIONS = ('block', 'tag', 'allow', 'deny')
+DEFAULT_HEADERS = ('User-Agent', 'Referer', 'X-Forwarded-For')
+FINDINGS_KEY = 'sentinelgate.findings'
+TAG_HEADER = 'X-SentinelGate'
+
+
+def rule_detector(packs=None, cache=None, budget=None):
+    """``detect(text) -> rule IDs`` over the built-in rules, or over the active pack of a ``RulePackManager``.
+
+    Verdicts for short values are kept in ``cache`` (a fresh ``VerdictCache``
+    by default; pass ``False`` to disable it): headers such as User-Agent and
+    common field values repeat across requests. Its generation is the rule
+    fingerprint, so a pack swap drops the cached verdicts. A value that goes
+    over ``budget`` (a ``detection.ScanBudget``) is reported as the
+    ``scan-budget`` rule, so it is blocked or tagged like any other finding.
+    """
+    if cache is None:
+        cache = VerdictCache(max_entries=4096, max_bytes=1024 * 1024, max_key_chars=256)
+    elif cache is False:
+        cache = None
+    if packs is None:
+        builtin = (builtin_rules.SQL_DETECTOR, builtin_rules.PROMPT_DETECTOR)
+        generation = tuple(detector.fingerprint for detector in builtin)
+
+        def active():
+            return builtin, generation
+    else:
+        def active():
+            pack = packs.active
+            return (pack.sql, pack.prompt), pack.fingerprint
+
+    def scan(sql, prompt, lowered):
+        try:
+            return sql.scan(lowered, budget) + prompt.scan(lowered, budget)
+        except ScanBudgetExceeded:
+            return (builtin_rules.SCAN_BUDGET_RULE_ID,)
+
+    def detect(text):
+        (sql, prompt), generation = active()
+        lowered = text.lower().strip()
+        if cache is None or len(lowered) > cache.max_key_chars:
+            return scan(sql, prompt, lowered)
+        rule_ids = cache.get(lowered, generation)
+        if rule_ids is None:
+            rule_ids = scan(sql, prompt, lowered)
+            if rule_ids != (builtin_rules.SCAN_BUDGET_RULE_ID,):
+                cache.put(lowered, rule_ids, generation)
+        return rule_ids
+    detect.cache = cache
+    return detect
+
+
+def _decode_query(query) -> str:
+    # WSGI passes the query string as latin-1 text, ASGI as bytes; both carry UTF-8
+    if isinstance(query, str):
+        if query.isascii():
+            return query
+        query = query.encode('latin-1')
+    return query.decode('utf-8', 'replace')
+
+
+class _FormReader:
+    """Incremental ``application/x-www-form-urlencoded`` reader with the ``JSONStringReader`` interface."""
+
+    def __init__(self, max_bytes: int | None, max_field: int | None):
+        self.max_bytes = max_bytes
+        self.max_field = max_field
+        self.received = 0
+        self._tail = b''
+
+    @staticmethod
+    def _fields(parts) -> list:
+        out = []
+        for part in parts:
+            if part:
+                out.extend(parse_qsl(part.decode('utf-8', 'replace'), keep_blank_values=True))
+        return out
+
+    def feed(self, data: bytes) -> list:
+        self.received += len(data)
+        if self.max_bytes is not None and self.received > self.max_bytes:
+            raise JSONLimitError(f"body larger than {self.max_bytes} bytes")
+        parts = (self._tail + data if self._tail else data).split(b'&')
+        self._tail = parts.pop()
+        if self.max_field is not None and len(self._tail) > self.max_field:
+            raise JSONLimitError(f"form field longer than {self.max_field} bytes")
+        return self._fields(parts)
+
+    def close(self) -> list:
+        tail, self._tail = self._tail, b''
+        return self._fields([tail])
+
+
+class _Gate:
+    """Configuration, path matching, inspection and counters shared by the WSGI and ASGI middleware."""
+
+    def __init__(self, app, detect=None, action: str = 'block', paths=(), headers=DEFAULT_HEADERS,
+                 query: bool = True, forms: bool = True, json_bodies: bool = True,
+                 max_body: int = 16 * 1024 * 1024, max_depth: int = 64, max_string: int = 1024 * 1024,
+                 chunk_size: int = 64 * 1024, spool_bytes: int = 1024 * 1024):
+        for pattern, path_action in [('*', action), *paths]:
+            if path_action not in GATE_ACTIONS:
+                raise ValueError(f"Unknown gate action {path_action!r} for {pattern}; expected one of {GATE_ACTIONS}")
+        self.app = app
+        self.detect = detect or rule_detector()
+        self.action = action
+        self.paths = tuple((pattern, path_action) for pattern, path_action in paths)
+        self._path_rules = tuple((re.compile(fnmatch.translate(pattern)).match, path_action)
+                                 for pattern, path_action in self.paths)
+        self.headers = tuple(headers)
+        self._environ_headers = tuple(('HTTP_' + name.upper().replace('-', '_'), name) for name in self.headers)
+        self._scope_headers = {name.lower().encode('latin-1'): name for name in self.headers}
+        self.query = query
+        self.forms = forms
+        self.json_bodies = json_bodies
+        self.max_body = max_body
+        self.max_depth = max_depth
+        self.max_string = max_string
+        self.chunk_size = chunk_size
+        self.spool_bytes = spool_bytes
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.inspected = 0
+        self.blocked = 0
+        self.tagged = 0
+        self.denied = 0
+        self.too_large = 0
+        self.malformed = 0
+
+    def _count(self, *counters: str):
+        with self._lock:
+            for counter in counters:
+                setattr(self, counter, getattr(self, counter) + 1)
+
+    def action_for(self, path: str) -> str:
+        for match, path_action in self._path_rules:
+            if match(path):
+                return path_action
+        return self.action
+
+    def _body_kind(self, content_type: str) -> str | None:
+        content_type = content_type.split(';', 1)[0].strip().lower()
+        if self.json_bodies and (content_type == 'application/json' or content_type.endswith('+json')):
+            return 'json'
+        if self.forms and content_type == 'application/x-www-form-urlencoded':
+            return 'form'
+        return None
+
+    def _body_reader(self, kind: str):
+        if kind == 'json':
+            return JSONStringReader(max_bytes=self.max_body, max_depth=self.max_depth, max_string=self.max_string)
+        return _FormReader(self.max_body, self.max_string)
+
+    def _check(self, findings: list, source: str, values, stop: bool) -> bool:
+        """Run the detector over ``(field, value)`` pairs; True once a finding should end the request."""
+        detect = self.detect
+        for field, value in values:
+            rule_ids = detect(value)
+            if rule_ids:
+                findings.append((source, field, tuple(rule_ids)))
+                if stop:
+                    return True
+        return False
+
+    def _check_head(self, findings: list, stop: bool, query, header_values) -> bool:
+        if self.query and query:
+            if self._check(findings, 'query', parse_qsl(_decode_query(query), keep_blank_values=True), stop):
+                return True
+        return self._check(findings, 'header', header_values, stop)
+
+    def _too_large(self, length) -> bool:
+        return length is not None and length.isdigit() and int(length) > self.max_body
+
+    def _rejection(self, error: ValueError) -> tuple:
+        if isinstance(error, JSONLimitError):
+            self._count('too_large')
+            return '413 Payload Too Large', {"status": "error", "message": f"Request body rejected: {error}"}
+        self._count('malformed')
+        return '400 Bad Request', {"status": "error", "message": f"Invalid JSON: {error}"}
+
+    def _blocked(self, finding) -> tuple:
+        self._count('blocked')
+        source, field, rule_ids = finding
+        return '403 Forbidden', {
+            "status": "error",
+            "message": f"Request blocked: possible injection in {source} {field}",
+            "source": source,
+            "field": field,
+            "rules": list(rule_ids),
+        }
+
+    def _denied(self) -> tuple:
+        self._count('denied')
+        return '403 Forbidden', {"status": "error", "message": "Forbidden"}
+
+    def _oversized(self) -> tuple:
+        self._count('too_large')
+        return '413 Payload Too Large', {"status": "error", "message": f"Body larger than {self.max_body} bytes"}
+
+    @staticmethod
+    def tag_value(findings: list) -> str:
+        """``X-SentinelGate`` value for tagged findings, e.g. ``findings=2; rules=sql-003,prompt-001``."""
+        rule_ids = dict.fromkeys(rule_id for _, _, ids in findings for rule_id in ids)
+        return f"findings={len(findings)}; rules={','.join(rule_ids)}"
+
+    def stats(self) -> dict:
+        return {
+            "action": self.action,
+            "paths": [list(p) for p in self.paths],
+            "headers": list(self.headers),
+            "max_body": self.max_body,
+            "requests": self.requests,
+            "inspected": self.inspected,
+            "blocked": self.blocked,
+            "tagged": self.tagged,
+            "denied": self.denied,
+            "too_large": self.too_large,
+            "malformed": self.malformed,
+            "cache": cache.stats() if (cache := getattr(self.detect, 'cache', None)) is not None else None,
+        }
+
+
+class SentinelGate(_Gate):
+    """WSGI middleware: inspect each request before ``app`` sees it (see the module docstring)."""
+
+    def __call__(self, environ, start_response):
+        action = self.action_for(environ.get('PATH_INFO') or '/')
+        if action == 'allow':
+            self._count('requests')
+            return self.app(environ, start_response)
+        if action == 'deny':
+            self._count('requests')
+            return _json_response(start_response, *self._denied())
+        self._count('requests', 'inspected')
+
+        stop = action == 'block'
+        findings = []
+        headers = [(name, environ[key]) for key, name in self._environ_headers if key in environ]
+        if self._check_head(findings, stop, environ.get('QUERY_STRING'), headers):
+            return _json_response(start_response, *self._blocked(findings[-1]))
+
+        length = environ.get('CONTENT_LENGTH')
+        kind = None
+        if (length and length != '0') or environ.get('wsgi.input_terminated'):
+            kind = self._body_kind(environ.get('CONTENT_TYPE', ''))
+        if kind is not None:
+            if self._too_large(length):
+                return _json_response(start_response, *self._oversized())
+            reader = self._body_reader(kind)
+            body = BodyBuffer(self.spool_bytes)
+            received = 0
+            try:
+                for data in iter_body(environ, self.chunk_size):
+                    body.append(data)
+                    received += len(data)
+                    if self._check(findings, kind, reader.feed(data), stop):
+                        body.close()
+                        return _json_response(start_response, *self._blocked(findings[-1]))
+                # An empty body (a GET or DELETE with a content type, or Content-Length: 0 behind a
+                # server that sets wsgi.input_terminated) goes to the app as it is
+                if received and self._check(findings, kind, reader.close(), stop):
+                    body.close()
+                    return _json_response(start_response, *self._blocked(findings[-1]))
+            except ValueError as e:
+                body.close()
+                return _json_response(start_response, *self._rejection(e))
+            body.hand_over(environ)
+
+        environ[FINDINGS_KEY] = findings
+        if not findings:
+            return self.app(environ, start_response)
+        self._count('tagged')
+        tag = (TAG_HEADER, self.tag_value(findings))
+
+        def tagged_start_response(status, response_headers, exc_info=None):
+            return start_response(status, [*response_headers, tag], exc_info)
+        return self.app(environ, tagged_start_response)
+
+
+async def _send_json(send, status: str, payload: dict):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode('ascii'))],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class SentinelGateASGI(_Gate):
+    """ASGI 3 middleware: inspect each HTTP request before ``app`` sees it (see the module docstring).
+
+    Body messages are held (not copied) while the body is inspected and then
+    replayed to the app by a wrapped ``receive``.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        action = self.action_for(scope.get('path') or '/')
+        if action == 'allow':
+            self._count('requests')
+            return await self.app(scope, receive, send)
+        if action == 'deny':
+            self._count('requests')
+            return await _send_json(send, *self._denied())
+        self._count('requests', 'inspected')
+
+        stop = action == 'block'
+        findings = []
+        content_type = length = None
+        header_values = []
+        wanted = self._scope_headers
+        for name, value in scope.get('headers') or ():
+            if name in wanted:
+                header_values.append((wanted[name], value.decode('latin-1')))
+            if name == b'content-type':
+                content_type = value.decode('latin-1')
+            elif name == b'content-length':
+                length = value.decode('latin-1')
+        if self._check_head(findings, stop, scope.get('query_string'), header_values):
+            return await _send_json(send, *self._blocked(findings[-1]))
+
+        # Read the body whatever the framing headers say: HTTP/2 and HTTP/3 requests usually
+        # carry neither Content-Length nor Transfer-Encoding
+        kind = None
+        if content_type and length != '0':
+            kind = self._body_kind(content_type)
+        if kind is not None:
+            if self._too_large(length):
+                return await _send_json(send, *self._oversized())
+            reader = self._body_reader(kind)
+            messages = deque()
+            received = 0
+            try:
+                while True:
+                    message = await receive()
+                    messages.append(message)
+                    if message['type'] != 'http.request':
+                        break   # client went away: the app gets the disconnect as usual
+                    data = message.get('body', b'')
+                    received += len(data)
+                    if self._check(findings, kind, reader.feed(data), stop):
+                        return await _send_json(send, *self._blocked(findings[-1]))
+                    if not message.get('more_body', False):
+                        # An empty body (e.g. a GET with a content type) goes to the app as it is
+                        if received and self._check(findings, kind, reader.close(), stop):
+                            return await _send_json(send, *self._blocked(findings[-1]))
+                        break
+            except ValueError as e:
+                return await _send_json(send, *self._rejection(e))
+
+            async def replay_receive():
+                return messages.popleft() if messages else await receive()
+            inner_receive = replay_receive
+        else:
+            inner_receive = receive
+
+        scope[FINDINGS_KEY] = findings
+        if not findings:
+            return await self.app(scope, inner_receive, send)
+        self._count('tagged')
+        tag = (TAG_HEADER.lower().encode('latin-1'), self.tag_value(findings).encode('latin-1'))
+
+        async def tagged_send(message):
+            if message['type'] == 'http.response.start':
+                message = {**message, 'headers': [*message.get('headers', ()), tag]}
+            await send(message)
+        return await self.app(scope, inner_receive, tagged_send)
@@ -0,0 +1,147 @@
+"""
+In-process ML stage: the TF-IDF + LogisticRegression classifier trained in ``ml/``.
+
+The app runs its regex detectors first; only inputs they leave undecided
+(nothing matched) are scored by the classifier. The model is loaded once when
+the app module is imported - in every worker, or once in the gunicorn master
+with ``--preload`` so the forked workers share its memory copy-on-write -
+instead of lazily on the first request.
+
+Each score has to fit a latency budget: the stage keeps a moving average of
+its own cost and skips the classifier (keeping the regex verdict) when the
+time already spent on the request plus that estimate would exceed the budget.
+Skipped calls measure nothing, so after ``PROBE_EVERY`` skips in a row one
+call is scored anyway and its time replaces the estimate: a single slow call
+(a GC pause, a cold cache) cannot switch the classifier off for good.
+
+The compact export (``classifier.npz``, see ``ml/compact.py``) needs only
+NumPy and loads in a fraction of the pickle's time and memory; the pickled
+pipeline needs the ``ml/requirements.txt`` packages. Without them, or without
+a trained model, the stage reports itself unavailable and detection stays
+regex-only.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from time import perf_counter
+
+try:
+    from ml.preprocess import clean_text  # project root on sys.path (app.py / gunicorn app:app)
+except ImportError:
+    clean_text = None
+
+logger = logging.getLogger(__name__)
+
+
+class MLStage:
+    """The classifier from ``ml/models`` (compact ``.npz`` or pickled ``.pkl``) behind a latency budget."""
+
+    # Weight of the newest sample in the moving average of classifier latency
+    EWMA_ALPHA = 0.2
+    # Consecutive budget skips after which one call is scored to re-measure the latency
+    PROBE_EVERY = 20
+
+    def __init__(self, model_path: str, threshold: float = 0.5, budget_ms: float = 25.0):
+        self.model_path = model_path
+        self.threshold = threshold
+        self.budget_ms = budget_ms
+        self.fingerprint = None
+        self.error = None
+        self.load_ms = None
+        self._model = None
+        self._lock = threading.Lock()
+        self._ewma_ms = 0.0
+        self._skips_in_row = 0
+        self.calls = 0
+        self.flagged = 0
+        self.skipped_budget = 0
+        self.probes = 0
+
+    @property
+    def available(self) -> bool:
+        return self._model is not None
+
+    def load(self) -> bool:
+        """Load and warm up the model; returns False (and logs why) if it can't be used."""
+        start = perf_counter()
+        if clean_text is None:
+            self.error = "ml dependencies not installed (pip install -r ml/requirements.txt)"
+        elif not os.path.exists(self.model_path):
+            self.error = f"model not found at {self.model_path} (run ml/train.py)"
+        else:
+            try:
+                with open(self.model_path, 'rb') as f:
+                    raw = f.read()
+                if self.model_path.endswith('.npz'):
+                    from ml.compact import CompactModel
+                    model = CompactModel(self.model_path)
+                else:
+                    model = pickle.loads(raw)
+                # First call initializes sklearn/numpy internals; do it now, not on a user request
+                model.predict_proba([clean_text("warm up")])
+            except ImportError as e:
+                self.error = f"ml dependencies not installed ({e}; pip install -r ml/requirements.txt)"
+            except Exception as e:  # unpickling, format or sklearn version problems
+                self.error = f"could not load model: {e}"
+            else:
+                self._model = model
+                self.fingerprint = hashlib.sha1(raw).hexdigest()[:16]
+                self.error = None
+        self.load_ms = (perf_counter() - start) * 1000
+        if self.error:
+            logger.warning("ML stage disabled: %s", self.error)
+        return self.available
+
+    def score(self, text: str, spent_ms: float = 0.0, cleaned: str | None = None) -> float | None:
+        """Malicious-class probability for ``text``, or None if the stage is unavailable or
+        the call would not fit in the budget after ``spent_ms`` already used. ``cleaned`` is
+        ``clean_text(text)`` when the caller already has it (AnalysisContext.cleaned)."""
+        if self._model is None:
+            return None
+        probe = False
+        if spent_ms + self._ewma_ms > self.budget_ms:
+            with self._lock:
+                self._skips_in_row += 1
+                probe = self._skips_in_row > self.PROBE_EVERY
+                if probe:
+                    self._skips_in_row = 0
+                    self.probes += 1
+                else:
+                    self.skipped_budget += 1
+            if not probe:
+                return None
+        start = perf_counter()
+        if cleaned is None:
+            cleaned = clean_text(text)
+        probability = float(self._model.predict_proba([cleaned])[0][1])
+        elapsed_ms = (perf_counter() - start) * 1000
+        with self._lock:
+            self.calls += 1
+            if probability >= self.threshold:
+                self.flagged += 1
+            self._skips_in_row = 0
+            if self.calls == 1 or probe:
+                # The average only saw the calls before the skips began; start over from this one
+                self._ewma_ms = elapsed_ms
+            else:
+                self._ewma_ms += self.EWMA_ALPHA * (elapsed_ms - self._ewma_ms)
+        return probability
+
+    def stats(self) -> dict:
+        return {
+            "available": self.available,
+            "error": self.error,
+            "model": self.model_path,
+            "load_ms": round(self.load_ms, 1) if self.load_ms is not None else None,
+            "threshold": self.threshold,
+            "budget_ms": self.budget_ms,
+            "calls": self.calls,
+            "flagged": self.flagged,
+            "skipped_budget": self.skipped_budget,
+            "probes": self.probes,
+            "avg_ms": round(self._ewma_ms, 3),
+        }
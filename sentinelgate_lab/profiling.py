@@ -0,0 +1,343 @@
+"""
+Per-rule hit and cost profiler for the detection rule sets.
+
+While a ``PatternSet`` is attached to a ``RuleProfiler``, each input it
+checks is run through every rule separately, timing each search. The verdict
+is still the same as without profiling. For every rule the profiler counts:
+
+  evaluations   inputs the rule was timed on
+  candidates    inputs the literal prefilter would have let it run on (its real workload)
+  hits          inputs it matched
+  first_hits    inputs where it was the first matching rule (the one that decides is_match)
+  total / max   cumulative and worst search time
+
+Rules that never hit on a representative corpus are candidates for pruning.
+Expensive rules with a high ``candidates`` count are the ones worth rewriting
+or tightening, and ``first_hits`` shows which rules carry the verdict.
+
+Profiling is switched on and off at runtime. ``attach`` shadows the set's
+``is_match``/``scan``/``scan_many`` with profiling versions on that one
+instance, and ``detach`` deletes them again, so with the profiler off the
+detector runs its normal class methods with no extra checks. Only every
+``sample_every``-th input is profiled (running every rule costs far more
+than the prefiltered check). Rules are timed the way the set runs them, so
+a rule on the linear-time path is timed as a ``SegmentChain``. Counters are
+not locked and may undercount slightly under concurrent requests.
+
+A profiled input is held to the caller's ``ScanBudget`` like any other: the
+length cap first, then the deadline between rule runs. Profiling that runs
+out of time stops (the input is counted in ``cut_short``) and the verdict
+comes from the set's own method, under a fresh deadline, so it does not
+change. With a budget (the request path), rules in the set's ``unguarded``
+list run only on the inputs the literal prefilter would run them on: a
+backtracking rule does not get inputs the detector itself would keep from it.
+
+Replay a corpus (a CSV such as ml/prepare_data.py writes, or the built-in
+samples) and print the ranked report:
+  python -m sentinelgate_lab.profiling ml/data/raw/dataset.csv
+  python -m sentinelgate_lab.profiling dataset.csv --sort mean --top 30 --csv rule-profile.csv
+  python -m sentinelgate_lab.profiling --pack rules.json          # corpus.py samples against a pack
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import sys
+from time import perf_counter
+
+from .detection import ScanBudgetExceeded
+
+# Report orderings: row key, largest first
+SORT_KEYS = {
+    'time': 'total_ms',
+    'mean': 'mean_us',
+    'max': 'max_us',
+    'hits': 'hits',
+    'candidates': 'candidates',
+}
+REPORT_FIELDS = ('kind', 'rule_id', 'category', 'hits', 'first_hits', 'candidates', 'evaluations',
+                 'total_ms', 'mean_us', 'max_us', 'time_share', 'pattern')
+# Columns taken as the input text when replaying a CSV (as in ml/prepare_data.py)
+TEXT_COLUMNS = ("query", "text", "prompt", "content", "input", "message", "sentence")
+
+
+class RuleStats:
+    """Counters of one rule (see the module docstring)."""
+
+    __slots__ = ('kind', 'rule_id', 'pattern', 'category', 'evaluations', 'candidates', 'hits',
+                 'first_hits', 'seconds', 'max_seconds')
+
+    def __init__(self, kind: str, rule_id: str, pattern: str, category: str = ''):
+        self.kind = kind
+        self.rule_id = rule_id
+        self.pattern = pattern
+        self.category = category
+        self.evaluations = 0
+        self.candidates = 0
+        self.hits = 0
+        self.first_hits = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+
+
+class RuleProfiler:
+    """Collects per-rule counters from the ``PatternSet`` instances attached to it."""
+
+    PROFILED = ('is_match', 'scan', 'scan_many')
+
+    def __init__(self, sample_every: int = 1):
+        if sample_every < 1:
+            raise ValueError("sample_every must be at least 1")
+        self.sample_every = sample_every
+        self._attached = {}     # kind -> PatternSet
+        self._tables = {}       # kind -> list of RuleStats aligned with the attached set's rules
+        self._stats = {}        # (kind, rule id, pattern) -> RuleStats, kept across re-attaches
+        self._seen = 0
+        self.profiled_inputs = {}   # kind -> inputs run through every rule
+        self.cut_short = {}         # kind -> profiled inputs that ran out of scan budget
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._attached)
+
+    def attach(self, kind: str, pattern_set, categories=None):
+        """Profile ``pattern_set`` as ``kind`` ('sql', 'prompt') until ``detach``; replaces a set already attached as ``kind``."""
+        if self._attached.get(kind) is pattern_set:
+            return
+        self.detach(kind)
+        categories = categories or {}
+        table = []
+        for rule_id, pattern in zip(pattern_set.ids, pattern_set.patterns):
+            key = (kind, rule_id, pattern)
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = RuleStats(kind, rule_id, pattern, categories.get(rule_id, ''))
+            table.append(stats)
+        self._tables[kind] = table
+        self._attached[kind] = pattern_set
+        self.profiled_inputs.setdefault(kind, 0)
+        self.cut_short.setdefault(kind, 0)
+        unguarded = frozenset(i for i, rule_id in enumerate(pattern_set.ids) if rule_id in pattern_set.unguarded)
+        cls = type(pattern_set)
+
+        def is_match(text, budget=None):
+            if self._skip():
+                return cls.is_match(pattern_set, text, budget)
+            hits = self._profile(kind, pattern_set, table, text, budget, unguarded)
+            if hits is None:
+                return cls.is_match(pattern_set, text, budget)
+            return bool(hits)
+
+        def scan(text, budget=None):
+            if self._skip():
+                return cls.scan(pattern_set, text, budget)
+            hits = self._profile(kind, pattern_set, table, text, budget, unguarded)
+            if hits is None:
+                return cls.scan(pattern_set, text, budget)
+            ids = pattern_set.ids
+            return tuple(ids[i] for i in hits)
+
+        def scan_many(texts, budget=None):
+            verdicts = dict.fromkeys(texts)
+            for text in verdicts:
+                try:
+                    verdicts[text] = scan(text, budget)
+                except ScanBudgetExceeded:
+                    verdicts[text] = None
+            return [verdicts[t] for t in texts]
+
+        pattern_set.is_match = is_match
+        pattern_set.scan = scan
+        pattern_set.scan_many = scan_many
+
+    def follow(self, pack):
+        """Attach the detectors of a rule pack, e.g. again after a hot reload swapped them."""
+        categories = {rule_id: rule.category for rule_id, rule in pack.rules.items()}
+        self.attach('sql', pack.sql, categories)
+        self.attach('prompt', pack.prompt, categories)
+
+    def detach(self, kind: str | None = None):
+        """Stop profiling ``kind`` (all kinds by default); the detectors go back to their own methods."""
+        for k in ([kind] if kind is not None else list(self._attached)):
+            pattern_set = self._attached.pop(k, None)
+            if pattern_set is not None:
+                for name in self.PROFILED:
+                    pattern_set.__dict__.pop(name, None)
+                self._tables.pop(k, None)
+
+    def reset(self):
+        """Zero all counters (attached sets stay attached)."""
+        for stats in self._stats.values():
+            stats.evaluations = stats.candidates = stats.hits = stats.first_hits = 0
+            stats.seconds = stats.max_seconds = 0.0
+        for kind in self.profiled_inputs:
+            self.profiled_inputs[kind] = 0
+            self.cut_short[kind] = 0
+
+    def _skip(self) -> bool:
+        if self.sample_every == 1:
+            return False
+        self._seen += 1
+        return self._seen % self.sample_every != 0
+
+    def _profile(self, kind, pattern_set, table, text, budget=None, unguarded=frozenset()) -> list | None:
+        """Run every rule on ``text``; indices of the matching rules in rule order, or None if
+        ``budget`` ran out first (raises ScanBudgetExceeded if ``text`` is over its length cap)."""
+        deadline = None if budget is None else budget.start(text)
+        candidates = pattern_set._candidates(text)
+        candidates = None if candidates is None else frozenset(candidates)
+        hits = []
+        for i, search in enumerate(pattern_set.matchers):
+            if budget is not None:
+                if i in unguarded and candidates is not None and i not in candidates:
+                    continue
+                if deadline is not None and perf_counter() > deadline:
+                    self.cut_short[kind] += 1
+                    return None
+            start = perf_counter()
+            matched = bool(search(text))
+            elapsed = perf_counter() - start
+            stats = table[i]
+            stats.evaluations += 1
+            stats.seconds += elapsed
+            if elapsed > stats.max_seconds:
+                stats.max_seconds = elapsed
+            if candidates is None or i in candidates:
+                stats.candidates += 1
+            if matched:
+                stats.hits += 1
+                hits.append(i)
+        self.profiled_inputs[kind] += 1
+        if hits:
+            table[hits[0]].first_hits += 1
+        return hits
+
+    def report(self, sort: str = 'time', kind: str | None = None, top: int | None = None) -> list:
+        """Report rows (dicts with REPORT_FIELDS), largest ``SORT_KEYS[sort]`` first."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort {sort!r}; expected one of {tuple(SORT_KEYS)}")
+        totals = {}
+        for stats in self._stats.values():
+            totals[stats.kind] = totals.get(stats.kind, 0.0) + stats.seconds
+        rows = []
+        for stats in self._stats.values():
+            if kind is not None and stats.kind != kind:
+                continue
+            rows.append({
+                "kind": stats.kind,
+                "rule_id": stats.rule_id,
+                "category": stats.category,
+                "hits": stats.hits,
+                "first_hits": stats.first_hits,
+                "candidates": stats.candidates,
+                "evaluations": stats.evaluations,
+                "total_ms": round(stats.seconds * 1000, 3),
+                "mean_us": round(stats.seconds / stats.evaluations * 1e6, 3) if stats.evaluations else 0.0,
+                "max_us": round(stats.max_seconds * 1e6, 3),
+                "time_share": round(stats.seconds / totals[stats.kind], 4) if totals[stats.kind] else 0.0,
+                "pattern": stats.pattern,
+            })
+        rows.sort(key=lambda r: r[SORT_KEYS[sort]], reverse=True)
+        return rows[:top] if top is not None else rows
+
+    def dead_rules(self) -> list:
+        """IDs of profiled rules that never matched (only meaningful after a representative corpus)."""
+        return [s.rule_id for s in self._stats.values() if s.evaluations and not s.hits]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "attached": sorted(self._attached),
+            "sample_every": self.sample_every,
+            "profiled_inputs": dict(self.profiled_inputs),
+            "cut_short": dict(self.cut_short),
+            "dead_rules": len(self.dead_rules()),
+        }
+
+
+def write_csv(rows, out):
+    writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def iter_corpus(path: str | None, column: str | None = None, limit: int | None = None):
+    """Texts of a CSV corpus (the ``column``, else the first known text column), or the built-in samples."""
+    if path is None:
+        from .corpus import BENIGN_SAMPLES, PROMPT_INJECTION_SAMPLES, SQL_INJECTION_SAMPLES
+        texts = BENIGN_SAMPLES + SQL_INJECTION_SAMPLES + PROMPT_INJECTION_SAMPLES
+        yield from texts[:limit]
+        return
+    csv.field_size_limit(sys.maxsize)
+    with open(path, newline='', encoding='utf-8', errors='replace') as f:
+        reader = csv.DictReader(f)
+        fields = {name.strip().lower(): name for name in reader.fieldnames or ()}
+        name = column or next((fields[c] for c in TEXT_COLUMNS if c in fields), None)
+        if name is None or name not in (reader.fieldnames or ()):
+            raise SystemExit(f"{path}: no text column (looked for {column or ', '.join(TEXT_COLUMNS)})")
+        for n, row in enumerate(reader):
+            if limit is not None and n >= limit:
+                return
+            yield row[name] or ''
+
+
+def replay(texts, pack, profiler: RuleProfiler) -> int:
+    """Check each text the way the app does against both detectors: lowercased and stripped,
+    and again decoded when it has URL escapes or hex literals."""
+    from .analysis import AnalysisContext
+    profiler.follow(pack)
+    n = 0
+    try:
+        for text in texts:
+            ctx = AnalysisContext(text)
+            views = (ctx.lower, ctx.decoded) if ctx.encoded else (ctx.lower,)
+            for view in views:
+                pack.sql.is_match(view)
+                pack.prompt.is_match(view)
+            n += 1
+    finally:
+        profiler.detach()
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a corpus through the detection rules and rank them by cost and hits")
+    parser.add_argument("corpus", nargs="?", help="CSV with a text column (default: the samples in corpus.py)")
+    parser.add_argument("--column", help="text column (default: query/text/prompt/... as in ml/prepare_data.py)")
+    parser.add_argument("--limit", type=int, help="replay at most this many rows")
+    parser.add_argument("--pack", help="rule pack file to profile (default: the built-in rules)")
+    parser.add_argument("--sort", choices=tuple(SORT_KEYS), default='time')
+    parser.add_argument("--top", type=int, default=25, help="rows to print (the CSV gets all)")
+    parser.add_argument("--csv", metavar="PATH", help="write the full report as CSV ('-' for stdout)")
+    args = parser.parse_args()
+
+    from .rulepacks import builtin_pack, load_pack
+    pack = load_pack(args.pack) if args.pack else builtin_pack()
+    profiler = RuleProfiler()
+    start = perf_counter()
+    n = replay(iter_corpus(args.corpus, args.column, args.limit), pack, profiler)
+    elapsed = perf_counter() - start
+    rows = profiler.report(args.sort)
+
+    if args.csv == '-':
+        write_csv(rows, sys.stdout)
+        return
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            write_csv(rows, f)
+    print(f"{n} inputs against {pack.version} ({len(pack.sql)} SQL + {len(pack.prompt)} prompt rules) "
+          f"in {elapsed:.1f} s, sorted by {args.sort}\n")
+    print(f"{'rule':<12} {'hits':>7} {'first':>7} {'cands':>7} {'total ms':>10} {'mean us':>8} "
+          f"{'max us':>9} {'share':>6}  pattern")
+    for r in rows[:args.top]:
+        pattern = r['pattern'] if len(r['pattern']) <= 60 else r['pattern'][:57] + '...'
+        print(f"{r['rule_id']:<12} {r['hits']:>7} {r['first_hits']:>7} {r['candidates']:>7} {r['total_ms']:>10.2f} "
+              f"{r['mean_us']:>8.2f} {r['max_us']:>9.1f} {r['time_share']:>6.1%}  {pattern}")
+    dead = profiler.dead_rules()
+    print(f"\n{len(dead)} rule(s) never matched: {', '.join(dead) if dead else '-'}")
+    if args.csv:
+        print(f"full report written to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Rate-limit backends for ``limit_requests``.
+
+Every backend enforces the same sliding-window budget: at most ``limit``
+requests per key within any ``window`` seconds. ``MemoryBackend`` keeps state
+in the current process (the original behaviour); ``SQLiteBackend`` keeps it in
+a WAL-mode SQLite file so every worker process on the node shares one budget
+per key, which makes ``gunicorn -w N`` safe.
+
+Async callers use ``ahit``: the in-memory check is a few microseconds under a
+lock and runs inline; the SQLite one may wait on the file lock, so it runs on
+a thread instead of stalling the event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from time import time
+
+from .db import ConnectionPool
+
+
+class RateLimitBackend:
+    """Interface: ``hit`` records a request for ``key`` and says whether it is allowed."""
+
+    name = 'base'
+    # True if ``hit`` can block on I/O; ``ahit`` then runs it on a thread
+    blocking = False
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+
+    def hit(self, key: str, now: float | None = None) -> bool:
+        raise NotImplementedError
+
+    async def ahit(self, key: str, executor=None) -> bool:
+        """``hit`` for async callers; a blocking backend runs on ``executor`` (default: the loop's)."""
+        if not self.blocking:
+            return self.hit(key)
+        return await asyncio.get_running_loop().run_in_executor(executor, self.hit, key)
+
+    def reset(self):
+        """Forget all recorded requests."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "limit": self.limit, "window": self.window}
+
+
+# Per-key state is one list: [last_seen, ring_head, stamp, stamp, ...] with at most
+# ``limit`` stamps (the allowed requests). A single list keeps idle one-off keys small.
+_SEEN, _HEAD, _FIRST = 0, 1, 2
+
+# Rough per-key cost: OrderedDict entry + node, key string, state list and its floats
+_KEY_OVERHEAD = 230
+
+
+class MemoryBackend(RateLimitBackend):
+    """Per-process sliding window (not shared between worker processes), O(1) per request.
+
+    Only the last ``limit`` allowed timestamps are kept per key, as a ring: a
+    request is allowed iff fewer than ``limit`` were allowed in the past
+    ``window`` seconds, i.e. iff the oldest of those is out of the window.
+    That is the same budget as pruning a full timestamp list, without the
+    O(limit) rebuild.
+
+    Keys are kept in least-recently-seen order. Every ``evict_every`` hits,
+    keys idle for a whole window (all their timestamps expired) are evicted
+    from the front, so memory tracks the set of currently active clients.
+    """
+
+    name = 'memory'
+
+    def __init__(self, limit: int, window: float, evict_every: int = 64):
+        super().__init__(limit, window)
+        self.evict_every = evict_every
+        self._keys: OrderedDict[str, list] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._stamps = 0
+        self.evicted = 0
+
+    def hit(self, key: str, now: float | None = None) -> bool:
+        now = time() if now is None else now
+        with self._lock:
+            keys = self._keys
+            state = keys.get(key)
+            if state is None:
+                keys[key] = [now, 0, now]
+                self._stamps += 1
+                allowed = True
+            else:
+                keys.move_to_end(key)
+                state[_SEEN] = now
+                if len(state) - _FIRST < self.limit:
+                    state.append(now)
+                    self._stamps += 1
+                    allowed = True
+                else:
+                    head = state[_HEAD]
+                    allowed = now - state[_FIRST + head] >= self.window
+                    if allowed:
+                        state[_FIRST + head] = now
+                        state[_HEAD] = (head + 1) % self.limit
+            self._hits += 1
+            if self._hits % self.evict_every == 0:
+                # Amortized: each key is evicted once, at most 2x evict_every per sweep
+                self._evict_idle(now, 2 * self.evict_every)
+            return allowed
+
+    def _evict_idle(self, now: float, budget: int | None):
+        keys = self._keys
+        while keys and budget != 0:
+            key, state = next(iter(keys.items()))
+            if now - state[_SEEN] < self.window:
+                break
+            del keys[key]
+            self._stamps -= len(state) - _FIRST
+            self.evicted += 1
+            if budget is not None:
+                budget -= 1
+
+    def sweep(self, now: float | None = None):
+        """Evict every idle key now (``hit`` does this incrementally)."""
+        with self._lock:
+            self._evict_idle(time() if now is None else now, None)
+
+    def reset(self):
+        with self._lock:
+            self._keys.clear()
+            self._stamps = 0
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "keys": len(self._keys),
+            "timestamps": self._stamps,
+            "approx_bytes": len(self._keys) * _KEY_OVERHEAD + self._stamps * 32,
+            "evicted": self.evicted,
+        }
+
+
+class SQLiteBackend(RateLimitBackend):
+    """Sliding-window log in a SQLite WAL file shared by all processes on the node.
+
+    Each check runs in a ``BEGIN IMMEDIATE`` transaction, so concurrent workers
+    serialize on the file's write lock and the per-key budget stays exact.
+    Rows of idle keys are purged every ``purge_every`` hits.
+    """
+
+    name = 'sqlite'
+    blocking = True
+
+    def __init__(self, limit: int, window: float, path: str, purge_every: int = 1000):
+        super().__init__(limit, window)
+        self.path = path
+        self.purge_every = purge_every
+        self._pool = ConnectionPool(path, cached_statements=32, cache_size_kib=2048)
+        self._hits = 0
+        with self._pool.connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_hits (key TEXT NOT NULL, ts REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS rate_hits_key_ts ON rate_hits (key, ts)")
+
+    def hit(self, key: str, now: float | None = None) -> bool:
+        now = time() if now is None else now
+        cutoff = now - self.window
+        conn = self._pool.connection()
+        self._hits += 1
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if self._hits % self.purge_every == 0:
+                conn.execute("DELETE FROM rate_hits WHERE ts <= ?", (cutoff,))
+            else:
+                conn.execute("DELETE FROM rate_hits WHERE key = ? AND ts <= ?", (key, cutoff))
+            count = conn.execute("SELECT COUNT(*) FROM rate_hits WHERE key = ?", (key,)).fetchone()[0]
+            allowed = count < self.limit
+            if allowed:
+                conn.execute("INSERT INTO rate_hits (key, ts) VALUES (?, ?)", (key, now))
+            conn.commit()
+            return allowed
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+    def reset(self):
+        with self._pool.connection() as conn:
+            conn.execute("DELETE FROM rate_hits")
+
+    def stats(self) -> dict:
+        conn = self._pool.connection()
+        keys, rows = conn.execute("SELECT COUNT(DISTINCT key), COUNT(*) FROM rate_hits").fetchone()
+        return {**super().stats(), "path": self.path, "keys": keys, "rows": rows}
+
+
+BACKENDS = {
+    MemoryBackend.name: MemoryBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+
+def make_backend(name: str, limit: int, window: float, path: str | None = None) -> RateLimitBackend:
+    """Build a backend by name ('memory' or 'sqlite'; the latter needs ``path``)."""
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown rate limit backend {name!r}; expected one of {sorted(BACKENDS)}") from None
+    if cls is SQLiteBackend:
+        if not path:
+            raise ValueError("The sqlite rate limit backend needs a database path")
+        return cls(limit, window, path)
+    return cls(limit, window)
@@ -0,0 +1,309 @@
+"""
+Versioned rule packs, swapped in at runtime without restarting workers.
+
+A rule pack is a JSON (or, where ``tomllib`` is available, TOML) file::
+
+    {
+      "version": "2026.10.18",
+      "sql":    [{"id": "sql-001", "pattern": "...", "category": "tautology", "severity": "high"}, ...],
+      "prompt": [{"id": "prompt-001", "pattern": "...", "category": "prompt-leak", "severity": "medium"}, ...]
+    }
+
+``id`` defaults to the rule's position (``sql-001``...), ``category`` to
+``uncategorized`` and ``severity`` to ``medium``. SQL rules are matched
+case-insensitively, like the built-in ones.
+
+``RulePackManager`` holds the active pack. When the file changes (checked at
+most every ``poll_interval`` seconds, from ``maybe_reload`` on the request
+path) or on ``reload()``, the new pack is compiled on a background thread and
+checked against the golden corpus (``corpus.py``: every SQL / prompt injection
+sample flagged, no benign sample flagged). Only then does it replace the
+active pack, in a single reference assignment: requests already running keep
+the pack they started with, and the verdict cache, keyed on the pack
+fingerprint, is dropped once on the first lookup after the swap. A pack that
+fails to load or validate is rejected and the active one stays.
+
+Every worker process polls the file itself, so one edit reaches all of them.
+
+Export the built-in rules as a starting point, or check a pack offline:
+  python -m sentinelgate_lab.rulepacks --export rules.json
+  python -m sentinelgate_lab.rulepacks --check rules.json
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from time import monotonic, perf_counter
+
+from . import rules as builtin_rules
+from .corpus import BENIGN_SAMPLES, PROMPT_INJECTION_SAMPLES, SQL_INJECTION_SAMPLES
+from .rules import build_rules
+
+try:
+    import tomllib  # Python 3.11+
+except ImportError:  # pragma: no cover - older interpreters: JSON packs only
+    tomllib = None
+
+logger = logging.getLogger(__name__)
+
+BUILTIN_VERSION = 'builtin'
+
+# Rule kinds in a pack: (regex flags, default ID prefix)
+KINDS = {
+    'sql': (re.IGNORECASE, 'sql'),
+    'prompt': (0, 'prompt'),
+}
+
+
+class RulePack:
+    """One compiled rule set: a detector per kind, rule metadata by ID and load information."""
+
+    def __init__(self, version: str, sql, prompt, rules, source: str = BUILTIN_VERSION,
+                 compile_ms: float = 0.0):
+        self.version = version
+        self.source = source
+        self.sql = sql
+        self.prompt = prompt
+        self.rules = {}
+        for rule in rules:
+            if rule.id in self.rules:
+                raise ValueError(f"Duplicate rule ID {rule.id!r}")
+            self.rules[rule.id] = rule
+        self.fingerprint = hashlib.sha1(repr(
+            (version, sql.ids, sql.fingerprint, prompt.ids, prompt.fingerprint)
+        ).encode('utf-8')).hexdigest()[:16]
+        self.compile_ms = compile_ms
+        self.loaded_at = time.time()
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "fingerprint": self.fingerprint,
+            "rules": {"sql": len(self.sql), "prompt": len(self.prompt)},
+            "compile_ms": round(self.compile_ms, 2),
+            "loaded_at": self.loaded_at,
+            "unguarded_rules": list(self.unguarded),
+        }
+
+    @property
+    def unguarded(self) -> tuple:
+        """IDs of rules that can backtrack and do not run on the linear-time path (only the scan budget bounds them)."""
+        return self.sql.unguarded + self.prompt.unguarded
+
+
+def compile_pack(version: str, entries: dict, source: str) -> RulePack:
+    """Compile ``{kind: [(id or None, pattern, category, severity), ...]}`` into a RulePack."""
+    start = perf_counter()
+    detectors, pack_rules = {}, []
+    for kind, (flags, prefix) in KINDS.items():
+        kind_entries = entries.get(kind, ())
+        ids = [e[0] or f"{prefix}-{i:03d}" for i, e in enumerate(kind_entries, 1)]
+        detectors[kind], kind_rules = build_rules([e[1:] for e in kind_entries], flags=flags, ids=ids)
+        pack_rules.extend(kind_rules)
+    return RulePack(version, detectors['sql'], detectors['prompt'], pack_rules, source=source,
+                    compile_ms=(perf_counter() - start) * 1000)
+
+
+def builtin_pack() -> RulePack:
+    """The rules from ``rules.py``, reusing the detectors it compiled at import."""
+    return RulePack(BUILTIN_VERSION, builtin_rules.SQL_DETECTOR, builtin_rules.PROMPT_DETECTOR,
+                    builtin_rules.SQL_RULES + builtin_rules.PROMPT_RULES)
+
+
+def parse_pack(doc, source: str) -> RulePack:
+    """Compile a decoded pack document; raises ValueError (or re.error) if it is malformed."""
+    if not isinstance(doc, dict):
+        raise ValueError("Rule pack must be an object")
+    version = doc.get('version')
+    if not isinstance(version, str) or not version:
+        raise ValueError("Rule pack needs a non-empty 'version' string")
+    unknown = set(doc) - {'version', *KINDS}
+    if unknown:
+        raise ValueError(f"Unknown rule pack keys: {sorted(unknown)}")
+    entries = {}
+    for kind in KINDS:
+        items = doc.get(kind, [])
+        if not isinstance(items, list):
+            raise ValueError(f"'{kind}' must be a list of rules")
+        kind_entries = []
+        for i, item in enumerate(items, 1):
+            if not isinstance(item, dict) or not isinstance(item.get('pattern'), str):
+                raise ValueError(f"{kind} rule #{i} needs a 'pattern' string")
+            if not isinstance(item.get('id', ''), str):
+                raise ValueError(f"{kind} rule #{i}: 'id' must be a string")
+            kind_entries.append((
+                item.get('id'), item['pattern'],
+                item.get('category', 'uncategorized'), item.get('severity', 'medium'),
+            ))
+        entries[kind] = kind_entries
+    return compile_pack(version, entries, source)
+
+
+def load_pack(path: str) -> RulePack:
+    """Read and compile the pack at ``path`` (``.toml`` or JSON)."""
+    if path.endswith('.toml'):
+        if tomllib is None:
+            raise ValueError("TOML rule packs need Python 3.11+ (tomllib); use JSON")
+        with open(path, 'rb') as f:
+            doc = tomllib.load(f)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            doc = json.load(f)
+    return parse_pack(doc, source=path)
+
+
+def check_golden(pack: RulePack) -> list:
+    """Golden-corpus failures for ``pack``; an empty list means it may go live."""
+    failures = []
+    for text in SQL_INJECTION_SAMPLES:
+        if not pack.sql.is_match(text.lower().strip()):
+            failures.append(f"SQL injection sample not flagged: {text!r}")
+    for text in PROMPT_INJECTION_SAMPLES:
+        if not pack.prompt.is_match(text.lower().strip()):
+            failures.append(f"prompt injection sample not flagged: {text!r}")
+    for text in BENIGN_SAMPLES:
+        text_lower = text.lower().strip()
+        matched = pack.sql.scan(text_lower) + pack.prompt.scan(text_lower)
+        if matched:
+            failures.append(f"benign sample flagged by {', '.join(matched)}: {text!r}")
+    return failures
+
+
+class RulePackManager:
+    """The active rule pack, reloaded from ``path`` in the background when it changes.
+
+    ``active`` is read once per request and never mutated, only replaced.
+    """
+
+    def __init__(self, path: str | None = None, poll_interval: float = 5.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.active = builtin_pack()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stat = None
+        self._next_check = 0.0
+        self.swaps = 0
+        self.rejected = 0
+        self.last_error = None
+        self.last_attempt = None
+        if path:
+            self._reload()
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def maybe_reload(self):
+        """Start a background reload if the pack file changed; cheap enough to call on every request."""
+        if not self.path or self.poll_interval <= 0:
+            return
+        now = monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.poll_interval
+        stat = self._file_stat()
+        if stat is not None and stat != self._stat:
+            self.reload()
+
+    def reload(self, wait: bool = False) -> bool:
+        """Compile, validate and swap in the pack file on a background thread.
+
+        Returns False if there is no pack file or a reload is already running.
+        With ``wait`` the call blocks until that reload has finished.
+        """
+        if not self.path:
+            return False
+        with self._lock:
+            running = self._thread is not None and self._thread.is_alive()
+            if not running:
+                self._thread = threading.Thread(target=self._reload, name='rule-pack-reload', daemon=True)
+                self._thread.start()
+            thread = self._thread
+        if wait:
+            thread.join()
+        return not running
+
+    def _reload(self):
+        stat = self._file_stat()
+        self.last_attempt = time.time()
+        try:
+            pack = load_pack(self.path)
+            failures = check_golden(pack)
+            if failures:
+                raise ValueError(f"{len(failures)} golden corpus failure(s): " + '; '.join(failures[:5]))
+        except Exception as e:
+            # Anything (e.g. OverflowError from re on a huge repeat count) rejects the pack. Remember
+            # the file anyway so a broken pack is not retried on every poll
+            self._stat = stat
+            self.rejected += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.exception("Rule pack %s rejected, keeping %s", self.path, self.active.version)
+            return
+        self._stat = stat
+        if pack.fingerprint != self.active.fingerprint:
+            self.active = pack
+            self.swaps += 1
+            logger.warning("Rule pack %s (version %s) active, compiled in %.1f ms",
+                           self.path, pack.version, pack.compile_ms)
+            if pack.unguarded:
+                logger.warning("Rule pack %s: rules %s can backtrack on crafted input and are only bounded "
+                               "by the scan budget", self.path, ', '.join(pack.unguarded))
+        self.last_error = None
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active.info(),
+            "path": self.path,
+            "poll_interval": self.poll_interval,
+            "reloading": self._thread is not None and self._thread.is_alive(),
+            "swaps": self.swaps,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+            "last_attempt": self.last_attempt,
+        }
+
+
+def export_builtin(path: str):
+    """Write the built-in rules as a JSON rule pack."""
+    doc = {"version": BUILTIN_VERSION}
+    for kind, kind_rules in (('sql', builtin_rules.SQL_RULES), ('prompt', builtin_rules.PROMPT_RULES)):
+        doc[kind] = [
+            {"id": r.id, "pattern": r.pattern, "category": r.category, "severity": r.severity}
+            for r in kind_rules
+        ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(doc, f, indent=2)
+        f.write('\n')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or validate SentinelGate rule packs")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--export", metavar="PATH", help="write the built-in rules as a JSON pack")
+    group.add_argument("--check", metavar="PATH", help="compile a pack and run the golden corpus")
+    args = parser.parse_args()
+
+    if args.export:
+        export_builtin(args.export)
+        print(f"Built-in rules written to {args.export}")
+    else:
+        pack = load_pack(args.check)
+        failures = check_golden(pack)
+        print(f"{pack.version}: {len(pack.sql)} SQL + {len(pack.prompt)} prompt rules, "
+              f"compiled in {pack.compile_ms:.1f} ms")
+        for failure in failures:
+            print(f"  FAIL {failure}")
+        for rule_id in pack.unguarded:
+            print(f"  WARN {rule_id} can backtrack on crafted input (nested repeats?); only the scan budget bounds it")
+        raise SystemExit(1 if failures else 0)
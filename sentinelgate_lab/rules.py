@@ -0,0 +1,213 @@
+"""
+Detection rules shared by the app, the demo server (``demo-test/server.py``)
+and the ML text preprocessing (``ml/preprocess.py``, ``ml/prepare_data.py``).
+
+Every regex in the project is compiled here, once, at import. Nothing on a
+request path passes a pattern string to ``re.search``/``re.sub``, so detection
+never goes through (or churns) ``re``'s small internal pattern cache.
+
+Each rule has a stable ID (``<prefix>-NNN``, its 1-based position in the list:
+only append to the lists), a category and a severity. The detectors are
+``PatternSet``s over the same compiled patterns.
+"""
+from __future__ import annotations
+
+import re
+
+from .detection import PatternSet
+
+SEVERITIES = ('low', 'medium', 'high', 'critical')
+
+
+class Rule:
+    """One detection rule; ``regex`` is the compiled pattern (None for non-regex heuristics)."""
+
+    __slots__ = ('id', 'pattern', 'category', 'severity', 'regex')
+
+    def __init__(self, rule_id: str, pattern: str | None, category: str, severity: str, regex=None):
+        if severity not in SEVERITIES:
+            raise ValueError(f"Unknown severity {severity!r} for rule {rule_id}; expected one of {SEVERITIES}")
+        self.id = rule_id
+        self.pattern = pattern
+        self.category = category
+        self.severity = severity
+        self.regex = regex
+
+    def __repr__(self):
+        return f"Rule({self.id!r}, {self.pattern!r}, {self.category!r}, {self.severity!r})"
+
+
+def build_rules(entries, flags: int = 0, prefix: str = 'rule', ids=None) -> tuple:
+    """``(detector, rules)`` for ``(pattern, category, severity)`` entries.
+
+    The Rule objects share the detector's compiled patterns, so each regex is
+    compiled once. IDs are positional (``<prefix>-NNN``) unless ``ids`` is given.
+    """
+    entries = tuple(entries)
+    detector = PatternSet([pattern for pattern, _, _ in entries], flags=flags, prefix=prefix, ids=ids)
+    rules = tuple(
+        Rule(rule_id, pattern, category, severity, regex)
+        for rule_id, (pattern, category, severity), regex in zip(detector.ids, entries, detector.compiled)
+    )
+    return detector, rules
+
+
+# Chatbot security rules - 100+ SQL injection patterns (production hardened):
+# (pattern, category, severity)
+_SQL_INJECTION_ENTRIES = (
+    (r"('\s*OR\s*'1'\s*=\s*'1|OR\s+1\s*=\s*1)",        'tautology', 'high'),
+    (r"(DROP\s+TABLE|DELETE\s+FROM|INSERT\s+INTO)",    'destructive', 'critical'),
+    (r"(UNION\s+SELECT|SELECT\s+\*)",                  'union', 'high'),
+    (r"(;\s*--|--\s*$)",                               'comment', 'medium'),
+    (r"('\s*OR\s*'1'|'\s*OR\s*1)",                     'tautology', 'high'),
+    (r"(admin'\s*OR|'\s*;\s*DROP)",                    'tautology', 'high'),
+    (r"\bOR\s+['\"]?\d+['\"]?\s*=\s*['\"]?\d+['\"]?",  'tautology', 'high'),
+    (r"\bOR\s+['\"]?1['\"]?\s*=\s*['\"]?1['\"]?\s*--", 'tautology', 'high'),
+    (r"\bAND\s+['\"]?\d+['\"]?\s*=\s*['\"]?\d+['\"]?", 'tautology', 'medium'),
+    (r"\bUNION\s+(ALL\s+)?SELECT\b",                   'union', 'high'),
+    (r"\bUNION\s+(ALL\s+)?SELECT\s+.*\s+FROM\b",       'union', 'high'),
+    (r";\s*--\s*$",                                    'comment', 'medium'),
+    (r"'\s*;\s*--",                                    'comment', 'medium'),
+    (r'"\s*;\s*--',                                    'comment', 'medium'),
+    (r"\bDROP\s+(TABLE|DATABASE|SCHEMA)\b",            'destructive', 'critical'),
+    (r"\bALTER\s+TABLE\b",                             'destructive', 'critical'),
+    (r"\bTRUNCATE\b",                                  'destructive', 'high'),
+    (r";\s*DROP\b",                                    'stacked-query', 'critical'),
+    (r";\s*INSERT\b",                                  'stacked-query', 'high'),
+    (r";\s*UPDATE\b",                                  'stacked-query', 'high'),
+    (r"'\s*OR\s+",                                     'quote', 'medium'),
+    (r'"\s*OR\s+',                                     'quote', 'medium'),
+    (r"'\s*AND\s+",                                    'quote', 'medium'),
+    (r'"\s*AND\s+',                                    'quote', 'medium'),
+    (r"\bSLEEP\s*\(",                                  'time-based', 'high'),
+    (r"\bBENCHMARK\s*\(",                              'time-based', 'high'),
+    (r"\bWAITFOR\s+DELAY\b",                           'time-based', 'high'),
+    (r"\bPG_SLEEP\s*\(",                               'time-based', 'high'),
+    (r"\bINFORMATION_SCHEMA\b",                        'schema-probe', 'high'),
+    (r"\bFROM\s+information_schema\b",                 'schema-probe', 'high'),
+    (r"\b0x[0-9a-fA-F]+.*\b(SELECT|UNION|OR)\b",       'obfuscation', 'medium'),
+    (r"\bVERSION\s*\(",                                'fingerprint', 'medium'),
+    (r"\b@@VERSION\b",                                 'fingerprint', 'medium'),
+    (r"\bEXEC\s*\(",                                   'command-exec', 'critical'),
+    (r"\bXP_CMDSHELL\b",                               'command-exec', 'critical'),
+    (r"\bOPENROWSET\b",                                'file-access', 'critical'),
+    (r"\bLOAD_FILE\b",                                 'file-access', 'critical'),
+    (r"\bINTO\s+OUTFILE\b",                            'file-access', 'critical'),
+    (r"\bINTO\s+DUMPFILE\b",                           'file-access', 'critical'),
+    (r"\bGROUP_CONCAT\s*\(",                           'function', 'medium'),
+    (r"\bSELECT\s+\*\s+FROM\b",                        'statement', 'medium'),
+    (r"\bINSERT\s+INTO\s+.*\s+VALUES\s*\(",            'statement', 'high'),
+    (r"\bUPDATE\s+\w+\s+SET\s+",                       'statement', 'high'),
+    (r"\bGRANT\s+",                                    'privilege', 'high'),
+    (r"\bCREATE\s+TABLE\b",                            'statement', 'medium'),
+    (r"\bCREATE\s+DATABASE\b",                         'statement', 'medium'),
+    (r"\bORDER\s+BY\s+\d+",                            'schema-probe', 'medium'),
+    (r"\bHAVING\s+1\s*=\s*1\b",                        'tautology', 'high'),
+    (r"\bWHERE\s+1\s*=\s*1\b",                         'tautology', 'high'),
+    (r"1'\s+OR\s+'1'\s*=\s*'1",                        'tautology', 'high'),
+    (r"1\s+OR\s+1\s*=\s*1",                            'tautology', 'high'),
+    (r"\bOR\s+EXISTS\s*\(",                            'subquery', 'medium'),
+    (r"\bAND\s+EXISTS\s*\(",                           'subquery', 'medium'),
+    (r"\bCHAR\s*\(",                                   'function', 'low'),
+    (r"\bCONCAT\s*\(",                                 'function', 'low'),
+    (r"\bCONVERT\s*\(",                                'function', 'low'),
+    (r"\bUSER\s*\(",                                   'fingerprint', 'medium'),
+    (r"\bDATABASE\s*\(",                               'fingerprint', 'medium'),
+    (r"\bCURRENT_USER\b",                              'fingerprint', 'medium'),
+    (r"\bSYSTEM_USER\b",                               'fingerprint', 'medium'),
+    (r"\bEXECUTE\s*\(",                                'command-exec', 'critical'),
+    (r"\bOPENQUERY\b",                                 'command-exec', 'high'),
+    (r"\bBULK\s+INSERT\b",                             'file-access', 'critical'),
+    (r"\bPG_READ_FILE\b",                              'file-access', 'critical'),
+    (r"\bUTL_FILE\b",                                  'file-access', 'critical'),
+    (r"\bUTL_HTTP\b",                                  'out-of-band', 'high'),
+    (r"\bDBMS_PIPE\.RECEIVE_MESSAGE\s*\(",             'time-based', 'high'),
+    (r"\bDROP\s+USER\b",                               'destructive', 'critical'),
+    (r"\bDROP\s+INDEX\b",                              'destructive', 'critical'),
+    (r"\bDROP\s+VIEW\b",                               'destructive', 'critical'),
+    (r"\bTRUNCATE\s+TABLE\b",                          'destructive', 'critical'),
+    (r"\bREVOKE\s+",                                   'privilege', 'high'),
+    (r"\bSHUTDOWN\b",                                  'destructive', 'critical'),
+    (r"\bSHOW\s+TABLES\b",                             'schema-probe', 'medium'),
+    (r"\bSHOW\s+DATABASES\b",                          'schema-probe', 'medium'),
+    (r"\bSELECT\s*\(.*SELECT\b",                       'subquery', 'medium'),
+    (r"'\)\s*OR\s+",                                   'quote', 'medium'),
+    (r'"\)\s*OR\s+',                                   'quote', 'medium'),
+    (r"%00.*(SELECT|UNION|DROP)",                      'obfuscation', 'high'),
+    (r"\\x00.*(SELECT|UNION)",                         'obfuscation', 'high'),
+    (r"admin'\s*--",                                   'comment', 'high'),
+    (r"admin\"\s*--",                                  'comment', 'high'),
+    (r"'\)\s*OR\s+\('1'\s*=\s*'1",                     'tautology', 'high'),
+    (r'"\)\s*OR\s+\("1"\s*=\s*"1',                     'tautology', 'high'),
+    (r"\bOR\s+LIKE\s+'%",                              'tautology', 'medium'),
+    (r"\bAND\s+LIKE\s+'%",                             'tautology', 'medium'),
+    (r"\|\|\s*['\"]?\d+['\"]?\s*=\s*['\"]?\d+['\"]?",  'tautology', 'medium'),
+    (r"/\*.*\*\/.*(SELECT|UNION|DROP|DELETE)",         'obfuscation', 'medium'),
+    (r"'\s*\+\s*'",                                    'quote', 'low'),
+    (r'"\s*\+\s*"',                                    'quote', 'low'),
+    (r";\s*#\s*$",                                     'comment', 'medium'),
+    (r"'\s*\)\s*--",                                   'comment', 'medium'),
+)
+
+_PROMPT_INJECTION_ENTRIES = (
+    (r"ignore\s+(all\s+)?(previous|prior)\s+instructions",          'instruction-override', 'high'),
+    (r"disregard\s+(your\s+)?(instructions|rules)",                 'instruction-override', 'high'),
+    (r"reveal\s+(your\s+)?(system\s+)?(prompt|instructions)",       'prompt-leak', 'high'),
+    (r"show\s+(me\s+)?(your\s+)?(system\s+)?(prompt|instructions)", 'prompt-leak', 'medium'),
+    (r"what\s+are\s+your\s+(system\s+)?(instructions|rules)",       'prompt-leak', 'medium'),
+    (r"you\s+are\s+now\s+(a|in)\s+",                                'role-play', 'medium'),
+    (r"pretend\s+(you\s+are|to\s+be)",                              'role-play', 'medium'),
+    (r"act\s+as\s+if\s+you",                                        'role-play', 'low'),
+)
+
+# The demo server's smaller rule list (demo-test/server.py)
+_DEMO_SQL_ENTRIES = (
+    (r"\bOR\s+1\s*=\s*1\b",       'tautology', 'high'),
+    (r"\bOR\s+'1'\s*=\s*'1'",     'tautology', 'high'),
+    (r"\bUNION\s+SELECT\b",       'union', 'high'),
+    (r"'\s*OR\s+",                'quote', 'medium'),
+    (r"'\s*;\s*--",               'comment', 'medium'),
+    (r"\bDROP\s+TABLE\b",         'destructive', 'critical'),
+    (r"\bUNION\s+SELECT\s+\*",    'union', 'high'),
+)
+
+SQL_INJECTION_PATTERNS = [pattern for pattern, _, _ in _SQL_INJECTION_ENTRIES]
+PROMPT_INJECTION_PATTERNS = [pattern for pattern, _, _ in _PROMPT_INJECTION_ENTRIES]
+
+SQL_DETECTOR, SQL_RULES = build_rules(_SQL_INJECTION_ENTRIES, flags=re.IGNORECASE, prefix='sql')
+PROMPT_DETECTOR, PROMPT_RULES = build_rules(_PROMPT_INJECTION_ENTRIES, prefix='prompt')
+DEMO_SQL_DETECTOR, DEMO_SQL_RULES = build_rules(_DEMO_SQL_ENTRIES, flags=re.IGNORECASE, prefix='demo-sql')
+
+# Reported as the matched rule when only the quote heuristic (a quote plus an SQL keyword) flagged an input
+QUOTE_RULE_ID = 'sql-quote'
+QUOTE_RULE = Rule(QUOTE_RULE_ID, None, 'quote', 'medium')
+# Reported for an input the detectors gave up on (over the scan length or time budget: fail closed)
+SCAN_BUDGET_RULE_ID = 'scan-budget'
+SCAN_BUDGET_RULE = Rule(SCAN_BUDGET_RULE_ID, None, 'budget', 'high')
+
+# Rule metadata by ID, e.g. RULES['sql-025'].severity
+RULES = {rule.id: rule for rule in SQL_RULES + PROMPT_RULES + (QUOTE_RULE, SCAN_BUDGET_RULE) + DEMO_SQL_RULES}
+
+# Text normalization for the ML classifier (ml/preprocess.py, ml/prepare_data.py) and for the
+# decoded view the app's rules also run on (analysis.py)
+URL_ESCAPE = re.compile(r'%([0-9a-fA-F]{2})')     # %27 -> '
+HEX_LITERAL = re.compile(r'0x[0-9a-fA-F]+')       # 0x27 -> 39
+WHITESPACE = re.compile(r'\s+')
+
+
+def _decode_url(m):
+    return chr(int(m.group(1), 16))
+
+
+def _decode_hex(m):
+    return str(int(m.group(0), 16))
+
+
+def decode_escapes(text: str) -> str:
+    """Lowercased ``text`` with URL escapes and hex literals decoded; the decoders only
+    run when a '%' or '0x' is present, so most inputs come back unchanged (the same object)."""
+    if '%' in text:
+        text = URL_ESCAPE.sub(_decode_url, text)
+    if '0x' in text:
+        text = HEX_LITERAL.sub(_decode_hex, text)
+    return text
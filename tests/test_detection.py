@@ -0,0 +1,74 @@
+"""
+The compiled detectors (PatternSet, with SegmentChain for the backtracking
+rules) against the original per-pattern ``re.search`` loop: the same verdicts
+on the sample corpus and on random variants of it, and the same matched rule
+IDs as running every rule's own regex.
+"""
+import random
+
+import pytest
+
+from benchmarks.bench_detection import legacy_is_prompt_injection, legacy_is_sql_injection
+from sentinelgate_lab.app import _detect_sql_injection, is_prompt_injection, is_sql_injection
+from sentinelgate_lab.corpus import BENIGN_SAMPLES, PROMPT_INJECTION_SAMPLES, SQL_INJECTION_SAMPLES
+from sentinelgate_lab.rules import PROMPT_DETECTOR, SQL_DETECTOR, decode_escapes
+
+FUZZ_TOKENS = [
+    "select", "union", "all", "from", "where", "or", "and", "1", "=", "'", '"', "--", ";", "#",
+    "drop", "table", "sleep(", "(", ")", "/*", "*/", "%00", "0x1f", "admin", "ignore", "previous",
+    "instructions", "you are now a", "hello", "data", "\n", "  ", "||", "+", "like", "'%", "exists",
+]
+
+
+def fuzz_inputs(n, seed=1234):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        parts = rng.choices(FUZZ_TOKENS, k=rng.randint(1, 8))
+        s = rng.choice([" ", "", "  ", "\t"]).join(parts)
+        if rng.random() < 0.3:
+            s = s.upper()
+        out.append(s)
+    return out
+
+
+CORPUS = BENIGN_SAMPLES + SQL_INJECTION_SAMPLES + PROMPT_INJECTION_SAMPLES
+INPUTS = CORPUS + [s.upper() for s in CORPUS] + [f"  {s}\n" for s in CORPUS] + fuzz_inputs(5000)
+
+
+def with_decoded(legacy):
+    """``legacy`` on the input, or on its decoded view when that differs (the app's semantics)."""
+    def check(text):
+        lower = text.lower().strip()
+        decoded = decode_escapes(lower)
+        return legacy(text) or (decoded != lower and legacy(decoded))
+    return check
+
+
+@pytest.mark.parametrize("kind,legacy,compiled", [
+    ("sql", legacy_is_sql_injection, lambda t: _detect_sql_injection(t, t.lower().strip())),
+    ("prompt", legacy_is_prompt_injection, lambda t: PROMPT_DETECTOR.is_match(t.lower().strip())),
+])
+def test_compiled_matches_legacy_loop(kind, legacy, compiled):
+    mismatches = [t for t in INPUTS if compiled(t) != legacy(t)]
+    assert not mismatches, f"{len(mismatches)} {kind} verdicts differ, e.g. {mismatches[:5]}"
+
+
+@pytest.mark.parametrize("kind,legacy,app_check", [
+    ("sql", legacy_is_sql_injection, is_sql_injection),
+    ("prompt", legacy_is_prompt_injection, is_prompt_injection),
+])
+def test_app_checks_match_legacy_loop_on_decoded_view(kind, legacy, app_check):
+    reference = with_decoded(legacy)
+    mismatches = [t for t in INPUTS if app_check(t) != reference(t)]
+    assert not mismatches, f"{len(mismatches)} {kind} verdicts differ, e.g. {mismatches[:5]}"
+
+
+@pytest.mark.parametrize("detector", [SQL_DETECTOR, PROMPT_DETECTOR], ids=["sql", "prompt"])
+def test_scan_matches_every_rule_regex(detector):
+    # Single-line inputs: across a line break a linear-path rule may over-match (see SegmentChain)
+    texts = {t.lower().strip() for t in INPUTS if '\n' not in t.strip()}
+    for text in sorted(texts):
+        expected = tuple(rule_id for rule_id, regex in zip(detector.ids, detector.compiled) if regex.search(text))
+        assert detector.scan(text) == expected, text
+    assert detector.scan_many(sorted(texts)) == [detector.scan(t) for t in sorted(texts)]
@@ -0,0 +1,42 @@
+"""SentinelGate (WSGI) on requests that carry a body content type but no body."""
+import io
+import json
+
+import pytest
+
+from sentinelgate_lab.middleware import SentinelGate
+
+MALICIOUS = "1' OR '1'='1' --"
+
+
+def echo(environ, start_response):
+    body = environ['wsgi.input'].read()
+    start_response('200 OK', [('Content-Type', 'text/plain'), ('Content-Length', str(len(body)))])
+    return [body]
+
+
+def call(method, body=b'', content_length=None, content_type='application/json'):
+    """One request as gunicorn presents it: wsgi.input_terminated set, whatever the framing."""
+    environ = {'REQUEST_METHOD': method, 'PATH_INFO': '/', 'QUERY_STRING': '', 'CONTENT_TYPE': content_type,
+               'wsgi.input': io.BytesIO(body), 'wsgi.input_terminated': True}
+    if content_length is not None:
+        environ['CONTENT_LENGTH'] = content_length
+    statuses = []
+    out = b''.join(SentinelGate(echo)(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+    return int(statuses[0].split()[0]), out
+
+
+@pytest.mark.parametrize('method', ['GET', 'DELETE', 'POST'])
+@pytest.mark.parametrize('content_length', ['0', '', None])
+@pytest.mark.parametrize('content_type', ['application/json', 'application/x-www-form-urlencoded'])
+def test_bodyless_request_reaches_the_app(method, content_length, content_type):
+    assert call(method, content_length=content_length, content_type=content_type) == (200, b'')
+
+
+@pytest.mark.parametrize('content_length', [True, False])
+def test_terminated_body_is_still_inspected(content_length):
+    body = json.dumps({"q": MALICIOUS}).encode()
+    status, out = call('POST', body, str(len(body)) if content_length else None)
+    assert status == 403 and json.loads(out)['field'] == '$.q'
+    body = b'{"a": '
+    assert call('POST', body, str(len(body)) if content_length else None)[0] == 400
@@ -0,0 +1,63 @@
+"""
+The classifier's batch preprocessing and compact export against their references:
+clean_texts / clean_series against clean_text, and CompactModel scores against
+the pickled sklearn pipeline's.
+"""
+import os
+import pickle
+import random
+import warnings
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from ml.compact import COMPACT_MODEL_PATH, CompactModel  # noqa: E402
+from ml.preprocess import clean_series, clean_text, clean_texts  # noqa: E402
+from sentinelgate_lab.corpus import BENIGN_SAMPLES, PROMPT_INJECTION_SAMPLES, SQL_INJECTION_SAMPLES  # noqa: E402
+
+PICKLE_PATH = os.path.join(os.path.dirname(COMPACT_MODEL_PATH), "classifier.pkl")
+ALPHABET = list("aAbBfFxXzZ0123456789%' \t\n\r\x0b\x0c\x1c\x85\xa0 　É") + ["%27", "%2", "0x", "0X", "0x4f", "%0a"]
+
+
+def random_cases(n, seed=7):
+    rng = random.Random(seed)
+    cases = ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 24))) for _ in range(n)]
+    cases += [None, 0x27, 3.5, float("nan"), True, ""]
+    return cases
+
+
+def corpus():
+    samples = BENIGN_SAMPLES + SQL_INJECTION_SAMPLES + PROMPT_INJECTION_SAMPLES
+    return samples + [s.upper() for s in samples] + [f"  {s}%27 0x41\n" for s in samples] + random_cases(500, 11)
+
+
+def test_clean_texts_matches_clean_text():
+    cases = random_cases(20_000)
+    assert clean_texts(cases) == [clean_text(t) for t in cases]
+
+
+def test_clean_series_matches_clean_text():
+    cases = random_cases(20_000)
+    series = pd.Series(cases, dtype=object, index=range(10, 10 + len(cases)), name="query")
+    cleaned = clean_series(series)
+    assert cleaned.tolist() == [clean_text(t) for t in cases]
+    assert cleaned.index.equals(series.index) and cleaned.name == "query"
+
+
+@pytest.mark.skipif(not (os.path.exists(PICKLE_PATH) and os.path.exists(COMPACT_MODEL_PATH)),
+                    reason="trained models not present (run ml/train.py and ml/compact.py)")
+def test_compact_model_scores_like_the_pickle():
+    pytest.importorskip("sklearn")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")   # sklearn version warnings on unpickling
+        with open(PICKLE_PATH, "rb") as f:
+            pipeline = pickle.load(f)
+    compact = CompactModel(COMPACT_MODEL_PATH)
+    texts = [clean_text(t) for t in corpus()]
+    expected = pipeline.predict_proba(texts)
+    np.testing.assert_allclose(compact.predict_proba(texts), expected, rtol=0, atol=1e-9)
+    # One at a time, as the ML stage scores a request
+    for text, row in zip(texts[:200], expected):
+        np.testing.assert_allclose(compact.predict_proba([text])[0], row, rtol=0, atol=1e-9)
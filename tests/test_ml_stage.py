@@ -0,0 +1,62 @@
+"""MLStage latency budget: skipping over budget, and recovering after a spike."""
+import time
+
+import pytest
+
+from sentinelgate_lab.ml_stage import MLStage, clean_text
+
+pytestmark = pytest.mark.skipif(clean_text is None, reason="ml dependencies not installed")
+
+
+class SlowModel:
+    """Stands in for the classifier: each predict_proba sleeps for the next of ``delays`` (seconds)."""
+
+    def __init__(self, delays):
+        self.delays = list(delays)
+
+    def predict_proba(self, texts):
+        if self.delays:
+            time.sleep(self.delays.pop(0))
+        return [[0.9, 0.1] for _ in texts]
+
+
+def stage_with(delays, budget_ms=25.0):
+    stage = MLStage("unused.npz", budget_ms=budget_ms)
+    stage._model = SlowModel(delays)
+    return stage
+
+
+def test_scores_within_budget():
+    stage = stage_with([])
+    assert stage.score("hello") == pytest.approx(0.1)
+    assert stage.stats()["calls"] == 1 and stage.stats()["skipped_budget"] == 0
+
+
+def test_skips_when_time_already_spent():
+    stage = stage_with([])
+    stage.score("hello")
+    assert stage.score("hello", spent_ms=30.0) is None
+    assert stage.stats()["skipped_budget"] == 1
+
+
+def test_resumes_scoring_after_a_spike():
+    stage = stage_with([0.06])     # one 60 ms call against a 25 ms budget, then fast ones
+    assert stage.score("slow") is not None
+    skipped = [stage.score("hello") for _ in range(MLStage.PROBE_EVERY)]
+    assert skipped == [None] * MLStage.PROBE_EVERY
+    # The next call is a probe; it is fast, so the estimate drops and scoring resumes
+    assert stage.score("hello") is not None
+    assert [stage.score("hello") for _ in range(5)] == [pytest.approx(0.1)] * 5
+    stats = stage.stats()
+    assert stats["probes"] == 1 and stats["skipped_budget"] == MLStage.PROBE_EVERY
+    assert stats["avg_ms"] < stage.budget_ms
+
+
+def test_stays_off_while_calls_stay_slow():
+    stage = stage_with([0.03] * 3)
+    stage.score("slow")
+    for _ in range(2 * MLStage.PROBE_EVERY + 2):
+        stage.score("hello")
+    stats = stage.stats()
+    assert stats["calls"] == 3 and stats["probes"] == 2
+    assert stats["skipped_budget"] == 2 * MLStage.PROBE_EVERY
@@ -0,0 +1,162 @@
+"""
+The shared rule registry and rule packs: the golden corpus against the built-in
+and loaded packs, the hot-reload path of RulePackManager, and no regex compiled
+by project code on the request path.
+"""
+import json
+import logging
+import os
+import re
+import sys
+from collections import Counter
+
+import pytest
+
+from sentinelgate_lab import rulepacks, rules
+from sentinelgate_lab.corpus import BENIGN_SAMPLES, PROMPT_INJECTION_SAMPLES, SQL_INJECTION_SAMPLES
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIRS = tuple(os.path.join(PROJECT_ROOT, d) + os.sep for d in ("sentinelgate_lab", "ml", "demo-test"))
+CANARY = "please run sg_canary_sig for me"
+
+
+@pytest.fixture
+def exported(tmp_path):
+    """Path of the built-in rules exported as a JSON pack, and the decoded document."""
+    path = tmp_path / "rules.json"
+    rulepacks.export_builtin(str(path))
+    return path, json.loads(path.read_text(encoding='utf-8'))
+
+
+def write_pack(path, doc):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(doc, f)
+    os.replace(tmp, path)
+
+
+def test_builtin_pack_passes_golden_corpus():
+    assert rulepacks.check_golden(rulepacks.builtin_pack()) == []
+
+
+def test_exported_pack_loads_as_the_builtin_rules(exported):
+    path, _ = exported
+    pack = rulepacks.load_pack(str(path))
+    builtin = rulepacks.builtin_pack()
+    assert rulepacks.check_golden(pack) == []
+    assert (pack.sql.fingerprint, pack.prompt.fingerprint) == (builtin.sql.fingerprint, builtin.prompt.fingerprint)
+    assert pack.sql.ids == builtin.sql.ids and pack.prompt.ids == builtin.prompt.ids
+    for text in BENIGN_SAMPLES + SQL_INJECTION_SAMPLES + PROMPT_INJECTION_SAMPLES:
+        text = text.lower().strip()
+        assert pack.sql.scan(text) == builtin.sql.scan(text)
+        assert pack.prompt.scan(text) == builtin.prompt.scan(text)
+
+
+def test_golden_corpus_catches_a_noisy_pack(exported):
+    _, doc = exported
+    noisy = rulepacks.parse_pack(dict(doc, version="noisy", prompt=doc["prompt"] + [{"pattern": "hello"}]), "test")
+    assert any(f.startswith("benign sample flagged") for f in rulepacks.check_golden(noisy))
+    quiet = rulepacks.parse_pack(dict(doc, version="quiet", sql=doc["sql"][:1]), "test")
+    assert any(f.startswith("SQL injection sample not flagged") for f in rulepacks.check_golden(quiet))
+
+
+def test_hot_reload(exported, monkeypatch):
+    path, doc = exported
+    loads = []
+    original_load = rulepacks.load_pack
+
+    def counting_load(p):
+        loads.append(p)
+        return original_load(p)
+    monkeypatch.setattr(rulepacks, 'load_pack', counting_load)
+
+    manager = rulepacks.RulePackManager(str(path), poll_interval=0)
+    assert manager.active.version == rulepacks.BUILTIN_VERSION and manager.swaps == 0
+    assert not manager.active.sql.is_match(CANARY)
+
+    good = dict(doc, version="v2", sql=doc["sql"] + [
+        {"id": "sql-canary", "pattern": r"\bsg_canary_sig\b", "category": "custom", "severity": "high"}])
+    write_pack(path, good)
+    assert manager.reload(wait=True)
+    assert manager.active.version == "v2" and manager.swaps == 1
+    assert manager.active.sql.scan(CANARY) == ("sql-canary",)
+    assert rulepacks.check_golden(manager.active) == []
+
+    bad = [
+        dict(good, version="v3-broken", sql=good["sql"] + [{"pattern": "(unclosed"}]),
+        dict(good, version="v3-overflow", sql=good["sql"] + [{"pattern": "a{99999999999}"}]),
+        dict(good, version="v4-noisy", prompt=good["prompt"] + [{"pattern": "hello"}]),
+        {"version": "v5-shape", "sql": "not a list"},
+    ]
+    for rejected, pack_doc in enumerate(bad, 1):
+        write_pack(path, pack_doc)
+        manager.reload(wait=True)
+        assert manager.active.version == "v2", pack_doc["version"]
+        assert manager.rejected == rejected and manager.last_error
+    path.write_text("{not json", encoding='utf-8')
+    manager.reload(wait=True)
+    assert manager.active.version == "v2" and manager.rejected == len(bad) + 1
+    # One compile per reload: the initial pack, v2 and every rejected one
+    assert len(loads) == len(bad) + 3
+
+
+def test_maybe_reload_polls_the_file(exported):
+    path, doc = exported
+    manager = rulepacks.RulePackManager(str(path), poll_interval=0.001)
+    manager.maybe_reload()     # file unchanged since the initial load: nothing to do
+    assert manager._thread is None
+    write_pack(path, dict(doc, version="v2", sql=doc["sql"] + [{"pattern": r"\bsg_canary_sig\b"}]))
+    os.utime(path, ns=(0, 0))  # a different mtime even on coarse timestamps
+    manager._next_check = 0.0
+    manager.maybe_reload()
+    manager._thread.join()
+    assert manager.active.version == "v2" and manager.active.sql.is_match(CANARY)
+    assert manager.last_error is None and manager._stat == manager._file_stat()
+
+
+def _caller_outside_re():
+    frame = sys._getframe(2)
+    while frame is not None and os.sep + "re" + os.sep in frame.f_code.co_filename:
+        frame = frame.f_back
+    return frame.f_code.co_filename if frame else "?"
+
+
+@pytest.mark.skipif(not hasattr(re, '_compiler'), reason="traces re internals of Python 3.11+")
+def test_request_path_compiles_no_regex(monkeypatch):
+    from benchmarks.common import UnlimitedBackend
+    from sentinelgate_lab import app as app_module
+    monkeypatch.setattr(app_module, 'RATE_LIMITER', UnlimitedBackend())
+    app_module.app.logger.setLevel(logging.CRITICAL)   # the vulnerable endpoints log every SQL error
+    client = app_module.app.test_client()
+    samples = BENIGN_SAMPLES + SQL_INJECTION_SAMPLES + PROMPT_INJECTION_SAMPLES
+    requests = [
+        ('/chat/secured', lambda t: {"message": t}),
+        ('/chat/unsecured', lambda t: {"message": t}),
+        ('/query/secure', lambda t: {"chat_input": t}),
+        ('/query/vulnerable', lambda t: {"chat_input": t}),
+        ('/scan/batch', lambda t: [t, {"nested": t}]),
+    ]
+    # Warm up Flask/werkzeug (their own lazily compiled regexes are not ours to check)
+    for url, body in requests:
+        client.post(url, json=body("warm up"))
+
+    from_project = Counter()
+    original_compile = re._compile
+
+    def traced_compile(pattern, flags):
+        filename = _caller_outside_re()
+        if filename.startswith(PROJECT_DIRS):
+            from_project[os.path.relpath(filename, PROJECT_ROOT)] += 1
+        return original_compile(pattern, flags)
+    monkeypatch.setattr(re, '_compile', traced_compile)
+    for i in range(len(samples) * 2):
+        url, body = requests[i % len(requests)]
+        client.post(url, json=body(f"{samples[(i * 7) % len(samples)]} {i}"))
+    monkeypatch.undo()
+    assert not from_project, f"project code compiles regexes on the request path: {dict(from_project)}"
+
+
+def test_registry_is_shared():
+    from ml import preprocess
+    assert preprocess.WHITESPACE is rules.WHITESPACE
+    assert rulepacks.builtin_pack().sql is rules.SQL_DETECTOR